@@ -1,23 +1,24 @@
-import bcrypt
-import io
+import perfil_importacao  # primeiro de tudo: cronometra as importações do arranque
 import os
+import secrets
 import sys
 import time
-import matplotlib.patches as patches
-import pandas as pd
-import requests
 import streamlit as st
 
 from datetime import datetime, timedelta, timezone
 from loguru import logger
 from pathlib import Path
-from sqlalchemy import select
+from sqlalchemy import select, update
 from streamlit_cookies_controller import CookieController
 
-from database import Contract, User, Session
-
+from aprovacao import fila_aprovacao
+from auth import ERROS_POOL_HASH, limitador_login, pool_hash
+from database import Contract, User, Session, escritor
 from feedback import salvar_feedback
-from log import salvar_log_no_sqlite
+from log import contagem_por_hora, salvar_log_no_sqlite, ultimos_logs
+from sessao import gerar_token, precisa_renovar, validar_token
+
+perfil_importacao.perfil.iniciar_execucao()
 
 # Versão do SigmaOPS
 version = "1.3.5"
@@ -79,6 +80,22 @@ API_URL = get_secret("api", "url") or ""
 API_URL_OFENSORES = get_secret("api", "url_ofensores") or ""
 API_URL_DMINUSONE = get_secret("api", "d_minus_one") or ""
 
+
+@st.cache_resource
+def obter_segredo_sessao() -> str:
+    """Chave HMAC dos tokens de sessão (gera uma temporária se não configurada)."""
+    segredo = get_secret("auth", "session_secret") or os.environ.get(
+        "SIGMAOPS_SESSION_SECRET"
+    )
+    if not segredo:
+        logger.warning("Segredo de sessão não configurado; usando chave temporária.")
+        segredo = secrets.token_urlsafe(32)
+    return segredo
+
+
+SEGREDO_SESSAO = obter_segredo_sessao()
+VALIDADE_SESSAO_S = 30 * 60
+
 # ==============================================================================
 # 🚪 LÓGICA DE LOGIN
 # ==============================================================================
@@ -88,7 +105,28 @@ cookie_controller = CookieController()
 
 def obter_validade() -> datetime:
     """Retorna o tempo de expiração para o cookie."""
-    return datetime.now() + timedelta(minutes=30)
+    return datetime.now() + timedelta(seconds=VALIDADE_SESSAO_S)
+
+
+def gravar_token_sessao(claims: dict) -> None:
+    token = gerar_token(claims, SEGREDO_SESSAO, VALIDADE_SESSAO_S)
+    cookie_controller.set("session_token", token, expires=obter_validade())
+
+
+def claims_atuais(email: str) -> dict | None:
+    """Claims do utilizador tal como estão no banco; None se já não pode entrar."""
+    with Session() as session:
+        user_ref = session.execute(
+            select(User).where(User.email == email)
+        ).scalar_one_or_none()
+        if user_ref is None or not user_ref.approved:
+            return None
+        return {
+            "name": user_ref.name,
+            "email": user_ref.email,
+            "role": user_ref.role,
+            "contract": user_ref.contract_rel.name,
+        }
 
 
 def logout():
@@ -102,10 +140,10 @@ def logout():
     st.rerun()
 
 
-def confirm_login(
+def aplicar_sessao(
     user_name: str, email: str, role: str, contract: str | list[str]
 ) -> None:
-    """Atualiza o estado de sessão para refletir o login bem-sucedido e recarrega a aplicação."""
+    """Preenche o estado de sessão com os dados do utilizador autenticado."""
     if isinstance(contract, list):
         default = contract[0]
     else:
@@ -124,15 +162,50 @@ def confirm_login(
             "contract": default,
         }
     )
-    cookie_controller.set(
-        "session_token",
-        email,
-        expires=obter_validade(),
+
+
+def confirm_login(
+    user_name: str, email: str, role: str, contract: str | list[str]
+) -> None:
+    """Atualiza o estado de sessão para refletir o login bem-sucedido e recarrega a aplicação."""
+    aplicar_sessao(user_name, email, role, contract)
+    gravar_token_sessao(
+        {"name": user_name, "email": email, "role": role, "contract": contract}
     )
     logger.info(f"Login bem-sucedido: {email} | Contrato: {contract} | Perfil: {role}")
     st.rerun()
 
 
+# Proxies, além do próprio host (onde roda o cloudflared), autorizados a
+# informar o IP do cliente por cabeçalho
+PROXIES_CONFIAVEIS = {
+    p.strip()
+    for p in os.environ.get("SIGMAOPS_PROXIES_CONFIAVEIS", "").split(",")
+    if p.strip()
+}
+
+
+MSG_SERVIDOR_OCUPADO = "Servidor ocupado; tente novamente em instantes."
+
+
+def ip_cliente() -> str | None:
+    """IP real do cliente (o app roda atrás do túnel da Cloudflare).
+
+    Os cabeçalhos só valem numa ligação do localhost (o Streamlit devolve
+    None) ou de um proxy confiável; vindos de outro lugar seriam forjados.
+    """
+    ip = st.context.ip_address
+    if ip is not None and ip not in PROXIES_CONFIAVEIS:
+        return ip
+    headers = st.context.headers
+    if cloudflare := headers.get("Cf-Connecting-Ip"):
+        return cloudflare.strip()
+    if encaminhado := headers.get("X-Forwarded-For"):
+        # O último endereço é o que o proxy acrescentou; os outros vêm do cliente
+        return encaminhado.split(",")[-1].strip()
+    return ip
+
+
 def atualizar_contrato_callback():
     st.session_state.contract = st.session_state.contrato_ofensor
 
@@ -140,21 +213,38 @@ def atualizar_contrato_callback():
 cookie_session = cookie_controller.get("session_token")
 
 if cookie_session:
-    logger.debug(f"cookie encontrado {cookie_session}")
-    if "logged_in" not in st.session_state:
-        with Session() as conn:
-            stmt = select(User).where(User.email == cookie_session)
-            user = conn.execute(stmt).scalar_one_or_none()
-            if user:
-                st.session_state.logged_in = True
-                confirm_login(user.name, user.email, user.role, user.contract_rel.name)
-
-    # RENOVAÇÃO AUTOMÁTICA: O usuário agiu na página, gera um novo tempo
-    nova_validade = obter_validade()
-
-    # Sobrescreve o cookie atualizando a validade para mais 30 minutos
-    cookie_controller.set("session_token", cookie_session, expires=nova_validade)
-    logger.debug("cookie atualizado")
+    # O token assinado já traz nome, perfil e contrato: só consulta o banco ao renovar
+    claims = validar_token(cookie_session, SEGREDO_SESSAO)
+    if claims is None:
+        logger.debug("cookie inválido ou expirado")
+        if "logged_in" not in st.session_state:
+            cookie_controller.remove("session_token")
+    else:
+        if "logged_in" not in st.session_state:
+            aplicar_sessao(
+                claims["name"], claims["email"], claims["role"], claims["contract"]
+            )
+
+        # RENOVAÇÃO: só reemite o token quando está perto de expirar, e com os
+        # dados atuais do banco (aprovação revogada, perfil ou contrato mudados)
+        if precisa_renovar(claims):
+            atuais = claims_atuais(claims["email"])
+            if atuais is None:
+                logger.warning(
+                    f"Renovação recusada: {claims['email']} removido ou não aprovado."
+                )
+                cookie_controller.remove("session_token")
+                st.session_state.clear()
+                st.rerun()
+            if any(atuais[k] != claims[k] for k in atuais):
+                aplicar_sessao(
+                    atuais["name"], atuais["email"], atuais["role"], atuais["contract"]
+                )
+                logger.info(
+                    f"Sessão atualizada com os dados do banco: {atuais['email']}"
+                )
+            gravar_token_sessao(atuais)
+            logger.debug("cookie renovado")
 else:
     logger.debug("cookie é nulo")
 
@@ -189,11 +279,23 @@ if "logged_in" not in st.session_state:
                 email = st.text_input("E-mail", icon="📧").strip().lower()
                 passwd = st.text_input("Senha", type="password", icon="🔐")
                 if st.form_submit_button("Entrar"):
-                    if email and passwd:
+                    chaves = [("email", email)]
+                    if ip := ip_cliente():
+                        chaves.append(("ip", ip))
+                    espera = limitador_login.bloqueado(*chaves)
+                    if email and passwd and espera:
+                        st.error(
+                            f"Muitas tentativas falhadas. Tente novamente em {int(espera // 60) + 1} min."
+                        )
+                        logger.warning(
+                            f"Login bloqueado por excesso de tentativas: {email}"
+                        )
+                    elif email and passwd:
                         with Session() as session:
                             stmt = select(User).where(User.email == email)
                             user_ref = session.execute(stmt).scalar_one_or_none()
                             if user_ref is None:
+                                limitador_login.registrar_falha(*chaves)
                                 st.error("Utilizador não encontrado!")
                                 logger.error(
                                     f"Falha de login: email {email} não encontrado."
@@ -207,17 +309,23 @@ if "logged_in" not in st.session_state:
                                         f"Login pendente: {email} ainda não aprovado."
                                     )
                                 else:
-                                    senha_hash = user_ref.password.encode("utf-8")
-                                    if bcrypt.checkpw(
-                                        passwd.encode("utf-8"), senha_hash
-                                    ):
+                                    try:
+                                        senha_ok = pool_hash.verificar_senha(
+                                            passwd, user_ref.password
+                                        )
+                                    except ERROS_POOL_HASH:
+                                        senha_ok = None
+                                        st.error(MSG_SERVIDOR_OCUPADO)
+                                    if senha_ok:
+                                        limitador_login.limpar(*chaves)
                                         confirm_login(
                                             user_ref.name,
                                             user_ref.email,
                                             user_ref.role,
                                             user_ref.contract_rel.name,
                                         )
-                                    else:
+                                    elif senha_ok is False:
+                                        limitador_login.registrar_falha(*chaves)
                                         st.error("Senha incorreta!")
                                         logger.error(
                                             f"Falha de login: senha incorreta para o email {email}."
@@ -231,10 +339,16 @@ if "logged_in" not in st.session_state:
                 email = st.text_input("Email", icon="📧").strip()
                 contract = st.selectbox("Área", CONTRATOS_VALIDOS)
                 passwd = st.text_input("Senha", type="password", icon="🔐")
-                hashed = bcrypt.hashpw(passwd.encode("utf-8"), bcrypt.gensalt())
                 if st.form_submit_button("Solicitar Acesso"):
                     if name and email and passwd:
-                        with Session() as session:
+                        # Só calcula o hash quando o formulário é enviado
+                        try:
+                            hashed = pool_hash.hash_senha(passwd)
+                        except ERROS_POOL_HASH:
+                            st.error(MSG_SERVIDOR_OCUPADO)
+                            st.stop()
+
+                        def registrar(session) -> bool:
                             stmt = select(User.email).where(User.email == email)
                             stmt_contract = select(Contract.id_contract).where(
                                 Contract.name == contract
@@ -242,25 +356,26 @@ if "logged_in" not in st.session_state:
                             id_contract = session.execute(
                                 stmt_contract
                             ).scalar_one_or_none()
-                            if session.execute(stmt).scalar_one_or_none() is None:
-                                user = User(
-                                    name=name,
-                                    email=email,
-                                    contract=id_contract,
-                                    password=hashed.decode("utf-8"),
-                                )
-                                session.add(user)
-                                session.commit()
-                            else:
-                                st.error("O utilizador já existe!")
-                                logger.error(
-                                    f"Falha no registro: email {email} já existe."
-                                )
-
-                            st.success("Solicitação enviada. Aguarde libertação.")
-                            logger.info(
-                                f"Novo registro: {email} solicitou acesso ao contrato {contract}."
+                            if session.execute(stmt).scalar_one_or_none() is not None:
+                                return False
+                            user = User(
+                                name=name,
+                                email=email,
+                                contract=id_contract,
+                                password=hashed,
                             )
+                            session.add(user)
+                            return True
+
+                        if not escritor.executar(registrar):
+                            st.error("O utilizador já existe!")
+                            logger.error(f"Falha no registro: email {email} já existe.")
+                        fila_aprovacao.invalidar()
+
+                        st.success("Solicitação enviada. Aguarde libertação.")
+                        logger.info(
+                            f"Novo registro: {email} solicitou acesso ao contrato {contract}."
+                        )
                     else:
                         st.error("Preencha todos os campos.")
     st.stop()
@@ -269,6 +384,34 @@ else:
     # ==============================================================================
     # 🚀 APLICAÇÃO PRINCIPAL
     # ==============================================================================
+    # pandas, numpy, requests e Pillow só entram depois do login: a página de
+    # login não os usa e o primeiro acesso fica bem mais leve.
+    import pandas as pd
+
+    from exportacao import (
+        cache_exportacao,
+        chave_exportacao,
+        contar_paginas,
+        empacotar_pdf,
+        empacotar_zip,
+        gerar_cards,
+        gerar_dashboard_gerencial,
+        gerar_lista,
+        gerar_lista_paralela,
+    )
+    from cubos import CubosSLA
+    from fetch import BuscadorAPIs
+    from grade import LINHAS_POR_PAGINA, exibir_grade
+    from historico import HistoricoOcorrencias
+    from http_client import cliente as cliente_http
+    from indice import IndiceSnapshot
+    from ofensores import LIMITE_RANKING, RANGE_MAXIMO
+    from ocorrencias import carregar_dados_api
+    from poller import SnapshotPoller
+    from renderizador import FORMATOS
+    from share import IndiceShare, localizar_share
+    from sla import MEDIDAS_SLA, formatar_exibicao, medidas_sla, sigla_at
+
     USUARIO = st.session_state["username"]
     PERFIL = st.session_state["role"]
     CONTRATO = st.session_state["allowed_contract"]
@@ -308,7 +451,57 @@ else:
         unsafe_allow_html=True,
     )
 
-    hora_atual = (datetime.now(timezone.utc) - timedelta(hours=3)).strftime("%H:%M")
+    @st.cache_resource
+    def iniciar_historico():
+        return HistoricoOcorrencias()
+
+    historico = iniciar_historico()
+
+    @st.cache_resource
+    def iniciar_cubos_sla():
+        # Mesmo arquivo e mesma fila de escrita do histórico de snapshots
+        return CubosSLA(historico.engine, historico.escritor)
+
+    cubos_sla = iniciar_cubos_sla()
+
+    def preparar_snapshot(df, anterior=None, diff=None):
+        """Índice do snapshot; o mesmo DataFrame processado alimenta os cubos."""
+        indice = IndiceSnapshot.construir(df, anterior, diff)
+        try:
+            cubos_sla.registrar(indice.df, datetime.now())
+        except Exception as e:
+            logger.error(f"Erro ao somar o snapshot nos cubos de SLA: {e}")
+        return indice
+
+    @st.cache_resource
+    def iniciar_poller_ocorrencias():
+        """Poller único do processo: todas as sessões leem o mesmo snapshot."""
+        poller = SnapshotPoller(
+            lambda: carregar_dados_api(API_URL),
+            intervalo=60,
+            preparar=preparar_snapshot,
+            registrar=historico.registrar,
+        )
+        poller.iniciar()
+        return poller
+
+    @st.cache_resource
+    def iniciar_buscador_apis():
+        return BuscadorAPIs(API_URL_OFENSORES, API_URL_DMINUSONE, CONTRATOS_VALIDOS)
+
+    buscador_apis = iniciar_buscador_apis()
+    # Dispara ofensores e D-1 de todos os contratos em paralelo com o snapshot
+    buscador_apis.prefetch(CONTRATOS_VALIDOS)
+
+    poller_ocorrencias = iniciar_poller_ocorrencias()
+    snapshot = poller_ocorrencias.snapshot()
+
+    hora_atual = "--:--"
+    idade_snapshot = ""
+    if snapshot.atualizado_em is not None:
+        hora_atual = (snapshot.atualizado_em - timedelta(hours=3)).strftime("%H:%M")
+        idade = int(snapshot.idade_segundos())
+        idade_snapshot = f"há {idade}s" if idade < 60 else f"há {idade // 60}min"
     st.markdown(
         f"""<div class="sigma-header">
                 <div class="sigma-title">
@@ -318,6 +511,7 @@ else:
                 <div style="text-align:center;">
                     <span class="sigma-label">Última Atualização</span>
                     <span class="sigma-time">{hora_atual}</span>
+                    <span class="sigma-label" style="text-align:center; margin-top:4px;">{idade_snapshot}</span>
                 </div>
             </div>""",
         unsafe_allow_html=True,
@@ -364,17 +558,28 @@ else:
 
                                 if CurrentUser:
                                     user_hash = CurrentUser.password
-                                    if bcrypt.checkpw(
-                                        current_pass.encode("utf-8"),
-                                        user_hash.encode("utf-8"),
-                                    ):
-                                        new_hashed = bcrypt.hashpw(
-                                            new_pass.encode("utf-8"), bcrypt.gensalt()
+                                    try:
+                                        senha_ok = pool_hash.verificar_senha(
+                                            current_pass, user_hash
+                                        )
+                                        new_hashed = (
+                                            pool_hash.hash_senha(new_pass)
+                                            if senha_ok
+                                            else None
                                         )
-                                        CurrentUser.password = new_hashed.decode(
-                                            "utf-8"
+                                    except ERROS_POOL_HASH:
+                                        senha_ok = None
+                                        st.error(MSG_SERVIDOR_OCUPADO)
+                                    if senha_ok:
+                                        escritor.executar(
+                                            lambda s: s.execute(
+                                                update(User)
+                                                .where(
+                                                    User.id_user == CurrentUser.id_user
+                                                )
+                                                .values(password=new_hashed)
+                                            )
                                         )
-                                        session.commit()
                                         st.success(
                                             "Senha atualizada com sucesso!", icon="✅"
                                         )
@@ -384,7 +589,7 @@ else:
                                         time.sleep(2)
                                         st.session_state.mostrar_form_senha = False
                                         placeholder.empty()
-                                    else:
+                                    elif senha_ok is False:
                                         st.error("Senha atual incorreta.")
                     if btn_cancelar:
                         st.session_state.mostrar_form_senha = False
@@ -396,42 +601,134 @@ else:
         if PERFIL in ["master", "admin"]:
             st.divider()
             st.markdown("#### 🛡️ Aprovação de Acessos")
-            with Session() as session:
-                stmt = select(User).where(User.approved == False)
-                users_pendent_approves = session.execute(stmt).mappings().all()
-                if users_pendent_approves:
-                    st.warning(f"🔔 {len(users_pendent_approves)} Pendente(s)")
-                    for user in users_pendent_approves:
-                        row = user.get("User", {})
+            pendentes = fila_aprovacao.contar()
+            if pendentes:
+                st.warning(f"🔔 {pendentes} Pendente(s)")
+                # Keyset: guarda o último id_user de cada página já vista
+                cursores = st.session_state.setdefault("aprovacao_cursores", [None])
+                pagina, tem_mais = fila_aprovacao.pagina(cursores[-1])
+                if not pagina and len(cursores) > 1:
+                    # A página ficou vazia depois de aprovar/recusar: volta uma
+                    cursores.pop()
+                    st.rerun()
+                with st.form("form_aprovacao"):
+                    todos = st.checkbox("Todos desta página")
+                    perfis = {}
+                    for row in pagina:
                         with st.container(border=True):
-                            st.markdown(f"**{row.name}** | {row.contract_rel.name}")
-                            r_sel = st.selectbox(
+                            marcado = st.checkbox(
+                                f"**{row.name}** | {row.contrato}",
+                                key=f"sel_{row.id_user}",
+                            )
+                            perfil_sel = st.selectbox(
                                 "Perfil:",
                                 ["user", "admin"],
                                 key=f"r_{row.id_user}",
                                 label_visibility="collapsed",
                             )
-                            c1, c2 = st.columns(2)
-                            if c1.button(
-                                "✅ Aprovar", key=f"y_{row.id_user}", width="stretch"
-                            ):
-                                row.approved = True
-                                session.commit()
-                                logger.info(f"Utilizador aprovado: {row.name}")
-                                st.toast(f"Utilizador {row.name} aprovado!")
-                                time.sleep(1)
-                                st.rerun()
-                            if c2.button(
-                                "❌ Recusar", key=f"n_{row.id_user}", width="stretch"
-                            ):
-                                session.delete(row)
-                                session.commit()
-                                logger.info(f"Utilizador removido: {row.name}")
-                                st.toast(f"Utilizador {row.name} removido!")
-                                time.sleep(1)
-                                st.rerun()
+                            if marcado or todos:
+                                perfis[row.id_user] = perfil_sel
+                    c1, c2 = st.columns(2)
+                    aprovar = c1.form_submit_button(
+                        "✅ Aprovar selecionados", width="stretch"
+                    )
+                    recusar = c2.form_submit_button(
+                        "❌ Recusar selecionados", width="stretch"
+                    )
+                nomes = ", ".join(r.name for r in pagina if r.id_user in perfis)
+                if (aprovar or recusar) and not perfis:
+                    st.toast("Nenhum utilizador selecionado.")
+                elif aprovar:
+                    n = fila_aprovacao.aprovar(perfis)
+                    logger.info(f"Utilizadores aprovados: {nomes}")
+                    st.toast(f"{n} utilizador(es) aprovado(s)!")
+                    time.sleep(1)
+                    st.rerun()
+                elif recusar:
+                    n = fila_aprovacao.recusar(perfis)
+                    logger.info(f"Utilizadores removidos: {nomes}")
+                    st.toast(f"{n} utilizador(es) removido(s)!")
+                    time.sleep(1)
+                    st.rerun()
+                c1, c2 = st.columns(2)
+                if c1.button("◀", disabled=len(cursores) == 1, width="stretch"):
+                    cursores.pop()
+                    st.rerun()
+                if c2.button("▶", disabled=not tem_mais, width="stretch"):
+                    cursores.append(pagina[-1].id_user)
+                    st.rerun()
+            else:
+                st.session_state.aprovacao_cursores = [None]
+                st.success("Tudo limpo! ✅")
+
+            with st.expander("📡 Saúde das APIs"):
+                st.dataframe(cliente_http.metricas(), hide_index=True)
+
+            with st.expander("⏱️ Arranque e importações"):
+                perfil = perfil_importacao.perfil
+                if not perfil.instalado:
+                    st.caption(
+                        "Desligado. Para medir, reinicie o app com "
+                        "SIGMAOPS_PERFIL_IMPORTACAO=1."
+                    )
                 else:
-                    st.success("Tudo limpo! ✅")
+                    st.metric(
+                        "Arranque a frio (importações)",
+                        f"{perfil.arranque_ms:.0f} ms",
+                    )
+                    st.caption("Por execução do script (mais recente primeiro)")
+                    st.dataframe(perfil.historico(), hide_index=True)
+                    st.caption("Módulos mais caros")
+                    st.dataframe(perfil.modulos(), hide_index=True)
+
+            with st.expander("🗄️ Histórico de snapshots"):
+                st.json(historico.resumo())
+
+            with st.expander("🧾 Logs do sistema"):
+
+                def hora_local(serie: pd.Series) -> pd.Series:
+                    # Os logs são gravados em UTC
+                    return (
+                        pd.to_datetime(serie)
+                        .dt.tz_localize("UTC")
+                        .dt.tz_convert(os.environ["TZ"])
+                        .dt.tz_localize(None)
+                    )
+
+                agora_utc = datetime.now(timezone.utc).replace(tzinfo=None)
+                por_hora = pd.DataFrame(
+                    contagem_por_hora(agora_utc - timedelta(hours=48)),
+                    columns=["Hora", "Nível", "Quantidade"],
+                )
+                if not por_hora.empty:
+                    por_hora["Hora"] = hora_local(por_hora["Hora"])
+                    st.bar_chart(
+                        por_hora.pivot_table(
+                            index="Hora",
+                            columns="Nível",
+                            values="Quantidade",
+                            aggfunc="sum",
+                            fill_value=0,
+                        )
+                    )
+                st.caption("Logs por hora nas últimas 48 h")
+                recentes = pd.DataFrame(
+                    ultimos_logs(["WARNING", "ERROR", "CRITICAL"], limite=20),
+                    columns=["Quando", "Nível", "Mensagem"],
+                )
+                recentes["Quando"] = hora_local(recentes["Quando"])
+                st.dataframe(recentes, hide_index=True)
+                resumo_logs = salvar_log_no_sqlite.retencao.resumo()
+                st.json(resumo_logs)
+                if not resumo_logs["auto_vacuum_incremental"]:
+                    st.caption(
+                        "O user.db ainda não devolve espaço ao disco: compacte "
+                        "uma vez, fora do horário de pico (bloqueia as escritas)."
+                    )
+                    if st.button("🗜️ Compactar user.db"):
+                        with st.spinner("A compactar o user.db..."):
+                            salvar_log_no_sqlite.retencao.compactar()
+                        st.rerun()
 
         st.markdown("---")
         with st.container():
@@ -442,345 +739,17 @@ else:
     # 🧠 DADOS E LÓGICA
     # ==============================================================================
 
-    @st.cache_data(ttl=60, show_spinner=False)
-    def carregar_dados_api():
-        df_api = pd.DataFrame()
-        erro_msg = None
-
-        if API_URL:
-            try:
-                response = requests.get(API_URL, timeout=25)
-                if response.status_code == 200:
-                    data = response.json()
-                    if "ocorrencias" in data:
-                        df_api = pd.DataFrame(data["ocorrencias"])
-                else:
-                    erro_msg = f"Erro API: {response.status_code}"
-            except Exception as e:
-                logger.error(f"Erro ao carregar dados da API: {str(e)}")
-                erro_msg = str(e)
-
-        if df_api.empty:
-            return None, erro_msg or "Sem dados disponíveis."
-
-        if "ocorrencia" in df_api.columns:
-            df_api["ocorrencia"] = df_api["ocorrencia"].astype(int)
-            df_api = df_api.drop_duplicates(subset=["ocorrencia"], keep="last")
-
-        rename_map = {
-            "ocorrencia": "Ocorrência",
-            "data_abertura": "Abertura",
-            "contrato": "Contrato",
-            "cnl": "CNL",
-            "at": "AT",
-            "afetacao": "Afetação",
-            "vip": "VIP",
-            "cond_alto_valor": "Cond. Alto Valor",
-            "b2b_avancado": "B2B",
-            "tecnicos": "Técnicos",
-            "origem": "Origem",
-            "cabo": "Cabo",
-            "primarias": "Primárias",
-            "bd": "BD",
-            "propenso_anatel": "Propensos - Anatel",
-            "reclamado_anatel": "Reclamados - Anatel",
-            "reincidencia": "Reincidência",
-        }
-        df_api.rename(columns=rename_map, inplace=True)
-
-        if "Reincidência" in df_api.columns:
-
-            def format_reinc(x):
-                try:
-                    if pd.isna(x) or str(x).strip() in ["", "nan", "None"]:
-                        return ""
-                    return str(int(float(x)))
-                except:
-                    return ""
-
-            df_api["Reincidência"] = df_api["Reincidência"].apply(format_reinc)
-        else:
-            df_api["Reincidência"] = ""
-
-        if "equipamentos" in df_api.columns:
-            df_api["Cabo/Primária"] = df_api["equipamentos"].apply(
-                lambda x: (
-                    str(x[0]).strip() if isinstance(x, list) and len(x) > 0 else "-"
-                )
-            )
-        else:
-            df_api["Cabo/Primária"] = "-"
-
-        df_api["Abertura_dt"] = pd.to_datetime(df_api["Abertura"], errors="coerce")
-
-        if "Técnicos" in df_api.columns:
-            df_api["Técnicos"] = df_api["Técnicos"].apply(
-                lambda x: len(x) if isinstance(x, list) else 0
-            )
-
-        if "Afetação" in df_api.columns:
-            df_api["Afetação"] = (
-                pd.to_numeric(df_api["Afetação"], errors="coerce").fillna(0).astype(int)
-            )
-
-        def formatar_flag(val):
-            if pd.isna(val):
-                return "NÃO"
-            s = str(val).upper().strip()
-            if s in ["TRUE", "SIM", "S", "YES"]:
-                return "SIM"
-            try:
-                return "SIM" if float(val) > 0 else "NÃO"
-            except:
-                return "NÃO"
-
-        for col in ["VIP", "Cond. Alto Valor", "B2B"]:
-            if col in df_api.columns:
-                df_api[col] = df_api[col].apply(formatar_flag)
-
-        if "municipio" in df_api.columns:
-            df_api.rename(columns={"municipio": "Cidade_Real"}, inplace=True)
-
-        return df_api, None
-
-    @st.cache_data(ttl=300, show_spinner=False)
-    def carregar_dados_ofensores(contrato_ofensor, range=30):
-        """Carrega a lista de ofensores da API, com cache de 5 minutos."""
-        if not API_URL_OFENSORES:
-            return None, "URL de Ofensores não configurada no secrets.toml."
+    @st.cache_resource(max_entries=1)
+    def carregar_indice_share(caminho: Path, mtime_ns: int) -> IndiceShare | None:
+        """Compila a base de share uma vez por versão do ficheiro (mtime na chave)."""
         try:
-            response = requests.get(
-                API_URL_OFENSORES,
-                params={"contrato": contrato_ofensor, "range": range},
-                # headers=API_HEADERS,
-                timeout=25,
-            )
-
-            if response.status_code == 200:
-                logger.debug(f"{len(response.json())} primárias encontradas.")
-                return response.json(), None
-            return None, f"Erro {response.status_code}"
+            return IndiceShare.ler(caminho)
         except Exception as e:
-            logger.error(f"Erro ao carregar dados de ofensores: {str(e)}")
-            return None, str(e)
-
-    @st.cache_data(ttl=300, show_spinner=False)
-    def carregar_dMinusOne(contrato_ofensor):
-        from util import oc_vencida
-
-        logger.debug(API_URL_DMINUSONE)
-        try:
-            response = requests.get(
-                API_URL_DMINUSONE, params={"contrato": contrato_ofensor}
-            )
-            count = len(response.json())
-            logger.debug(f"{count=} {contrato_ofensor=}")
-            reincidencia = sum([1 if x["reincidencia"] else 0 for x in response.json()])
-            prazo = sum(
-                [
-                    1
-                    if not oc_vencida(x["data_ocorrencia"], x["data_ocorrencia_final"])[
-                        "expired"
-                    ]
-                    else 0
-                    for x in response.json()
-                ]
-            )
-            return {"ocorrencias": count, "prazo": prazo, "reincidencia": reincidencia}
-        except Exception as e:
-            logger.error(e)
-
-    def processar_json_ofensores(
-        dados_json, at_sel: list[str] | None = None
-    ) -> pd.DataFrame:
-        """Processa a estrutura JSON dos ofensores e retorna um DataFrame formatado."""
-        linhas = []
-
-        for item in dados_json:
-            if at_sel is not None and isinstance(at_sel, list) and at_sel != [""]:
-                if item.get("ocorrencias")[0].get("at") not in at_sel:
-                    continue
-            cod_primaria = item.get("primaria", "")
-            volume = item.get("count", 0)
-            linhas.append(
-                {
-                    "Primária": cod_primaria,
-                    "Município": item.get("ocorrencias")[0].get("municipio", ""),
-                    "Volume (Falhas)": volume,
-                    "Ocorrências": ", ".join(
-                        [
-                            str(dado.get("id_ocorrencia"))
-                            for dado in item.get("ocorrencias", [])
-                        ]
-                    ),
-                }
-            )
-
-        if linhas:
-            return pd.DataFrame(linhas).sort_values(
-                by="Volume (Falhas)", ascending=False
-            )
-
-        return pd.DataFrame()
-
-    def carregar_base_share():
-        print("\n--- INÍCIO DA LEITURA DO SHARE ---")
-        file_options = [
-            "share_at_sj.csv",
-            "SHARE_AT_SJ.csv",
-            "SHARE_AT_SJC_JAI.xlsx",
-            "SHARE_AT_SJC_JAI.xlsx - SHARE_AT_SJ.csv",
-            "SHARE_AT_SJC_JAI.xlsx - SHARE_AT _JAI.csv",
-        ]
-
-        for file in file_options:
-            filepath = Path.cwd().joinpath(file)
-            st.markdown(filepath)
-            if os.path.exists(filepath):
-                print(f"⏳ Ficheiro encontrado: {file}. A tentar ler...")
-                try:
-                    if file.endswith(".xlsx"):
-                        df = pd.read_excel(filepath)
-                    else:
-                        df = pd.read_csv(filepath, sep=";")
-
-                    print(
-                        f"✅ Ficheiro {file} lido com sucesso. Linhas totais: {len(df)}"
-                    )
-                    df.columns = df.columns.str.strip()
-
-                    if (
-                        "nom_AreaTelefonica" in df.columns
-                        and "qtd_Acessos" in df.columns
-                    ):
-                        print(
-                            "⚙️ Colunas corretas encontradas. A processar matemática..."
-                        )
-                        df = df.dropna(
-                            subset=["num_MesAno", "nom_AreaTelefonica", "qtd_Acessos"]
-                        )
+            logger.error(f"Erro ao ler a base de share {caminho.name}: {e}")
+            return None
 
-                        df["num_MesAno"] = (
-                            df["num_MesAno"].astype(float).astype(int).astype(str)
-                        )
-                        df["year"] = df["num_MesAno"].str[-4:].astype(int)
-                        df["month"] = df["num_MesAno"].str[:-4].astype(int)
-                        df["date"] = pd.to_datetime(
-                            {"year": df["year"], "month": df["month"], "day": 1}
-                        )
-
-                        latest_date = df["date"].max()
-                        df_latest = df[df["date"] == latest_date]
-
-                        dict_share = (
-                            df_latest.groupby("nom_AreaTelefonica")["qtd_Acessos"]
-                            .sum()
-                            .to_dict()
-                        )
-                        print(
-                            f"🚀 Sucesso! Dicionário criado com {len(dict_share)} ATs."
-                        )
-                        return dict_share
-                    else:
-                        print(
-                            f"❌ Aviso: O ficheiro {file} não tem as colunas corretas."
-                        )
-                except Exception as e:
-                    print(f"❌ Erro ao ler {file}: {str(e)}")
-                    continue
-
-        print("--- FIM: NENHUM FICHEIRO VÁLIDO ENCONTRADO ---")
-        return {}
-
-    def processar_dados(df_raw, filtros_contrato):
-        agora = datetime.now().replace(tzinfo=None)
-
-        df = df_raw.copy()
-
-        df["Contrato_Padrao"] = df["Contrato"].astype(str).str.strip().str.upper()
-        if isinstance(filtros_contrato, str):
-            df = df[df["Contrato_Padrao"] == filtros_contrato.upper()].copy()
-        elif isinstance(filtros_contrato, list) and filtros_contrato:
-            df = df[
-                df["Contrato_Padrao"].isin([c.upper() for c in filtros_contrato])
-            ].copy()
-
-        df["Abertura_dt"] = pd.to_datetime(
-            df["Abertura"], errors="coerce"
-        ).dt.tz_localize(None)
-        df["diff_s"] = (agora - df["Abertura_dt"]).dt.total_seconds().clip(lower=0)
-        df["horas_float"] = df["diff_s"] / 3600
-
-        def formatar_hms(s):
-            val = int(s) if pd.notna(s) else 0
-            m, s_res = divmod(val, 60)
-            h, m_res = divmod(m, 60)
-            return f"{int(h):02d}:{int(m_res):02d}:{int(s_res):02d}"
-
-        df["Horas Corridas"] = df["diff_s"].apply(formatar_hms)
-
-        def calc_sla_status(row):
-            h = row["horas_float"]
-            is_b2b = str(row.get("B2B", "NÃO")).upper() == "SIM"
-            limite_fora = 4 if is_b2b else 8
-            if h > 24:
-                return "Crítico"
-            elif h > limite_fora:
-                return "Fora do Prazo"
-            else:
-                return "No Prazo"
-
-        df["Status SLA"] = df.apply(calc_sla_status, axis=1)
-
-        # --- NOVA REGRA DE ANTECIPAÇÃO E COBRANÇA DA EPS ---
-        def calc_criticidade_eps(row):
-            h = row["horas_float"]
-            if h >= 7:
-                return "🚨 E-MAIL(EPS)"
-            elif h >= 6:
-                return "🟠 GERÊNCIA(EPS)"
-            elif h >= 4:
-                return "🟡 COORDENADOR (EPS)"
-            else:
-                return "🟢 SUPERVISOR (EPS)"
-
-        df["Criticidade EPS"] = df.apply(calc_criticidade_eps, axis=1)
-
-        def def_area(row):
-            if str(row["Contrato_Padrao"]) == "ABILITY_SJ" and pd.notna(row.get("AT")):
-                return (
-                    "Litoral"
-                    if str(row["AT"]).split("-")[0].strip().upper()
-                    in [
-                        "TG",
-                        "PG",
-                        "LZ",
-                        "MK",
-                        "MG",
-                        "PN",
-                        "AA",
-                        "BV",
-                        "FM",
-                        "RP",
-                        "AC",
-                        "FP",
-                        "BA",
-                        "TQ",
-                        "BO",
-                        "BU",
-                        "BC",
-                        "PJ",
-                        "PB",
-                        "MR",
-                        "MA",
-                    ]
-                    else "Vale"
-                )
-            return "Geral"
-
-        df["Area"] = df.apply(def_area, axis=1)
-
-        return df.sort_values("horas_float", ascending=False)
+    arquivo_share = localizar_share()
+    indice_share = carregar_indice_share(*arquivo_share) if arquivo_share else None
 
     def gerar_texto_gv(row, contrato):
         try:
@@ -824,252 +793,25 @@ else:
     DEFEITO:
     PRAZO:"""
 
-    def gerar_cards_mpl(kpis, contrato):
-        import matplotlib.pyplot as plt
-
-        C_BG, C_BORDER, C_TEXT, C_LABEL = "#ffffff", "#e2e8f0", "#1e293b", "#64748b"
-        C_RED, C_YELLOW, C_GREEN = "#dc2626", "#d97706", "#16a34a"
-        h_tot = 14 if contrato == "ABILITY_SJ" else 11
-        fig, ax = plt.subplots(figsize=(12, h_tot), dpi=200)
-        fig.patch.set_facecolor(C_BG)
-        ax.axis("off")
-        ax.set_xlim(0, 100)
-        ax.set_ylim(0, 100)
-
-        def draw(x, y, w, h, t, v, col=C_TEXT):
-            ax.add_patch(
-                patches.FancyBboxPatch(
-                    (x, y),
-                    w,
-                    h,
-                    boxstyle="round,pad=0,rounding_size=3",
-                    fc="white",
-                    ec=C_BORDER,
-                    lw=2,
-                )
-            )
-            ax.text(
-                x + w / 2,
-                y + h * 0.8,
-                t.upper(),
-                ha="center",
-                size=18,
-                color=C_LABEL,
-                weight="bold",
-            )
-            ax.text(
-                x + w / 2,
-                y + h * 0.4,
-                str(v),
-                ha="center",
-                size=55,
-                color=col,
-                weight="black",
-            )
-
-        ax.text(
-            50, 96, "SIGMA OPS", ha="center", size=32, weight="black", color="#7c3aed"
-        )
-        ax.text(
-            50,
-            92,
-            f"{contrato} • {datetime.now().strftime('%H:%M')}",
-            ha="center",
-            size=22,
-            weight="bold",
-            color="#475569",
-        )
-        draw(2, 68, 46, 18, "Total", kpis["total"])
-        draw(52, 68, 46, 18, "S/ Técnico", kpis["sem_tec"])
-        w = 30
-        g = 3
-        draw(2, 42, w, 18, "Crítico", kpis["critico"], C_RED)
-        draw(2 + w + g, 42, w, 18, "Fora do Prazo", kpis["fora"], C_YELLOW)
-        draw(2 + 2 * (w + g), 42, w, 18, "No Prazo", kpis["no_prazo"], C_GREEN)
-        if contrato == "ABILITY_SJ":
-            draw(2, 16, 46, 18, "Litoral", kpis["lit"])
-            draw(52, 16, 46, 18, "Vale", kpis["vale"])
-        buf = io.BytesIO()
-        plt.savefig(buf, format="jpg", dpi=200, bbox_inches="tight", facecolor=C_BG)
-        plt.close(fig)
-        return buf.getvalue()
-
-    def gerar_lista_mpl_from_view(df_view, col_order, contrato):
-        import matplotlib.pyplot as plt
-
-        ITENS_POR_PAGINA = 20
-        cols = [
-            c
-            for c in col_order
-            if c in df_view.columns
-            and c not in ["horas_float", "Status SLA", "Criticidade EPS"]
-        ]
-
-        df_p = (
-            df_view[cols]
-            .copy()
-            .rename(
-                columns={
-                    "Ocorrência": "ID",
-                    "Horas Corridas": "Tempo",
-                    "Cond. Alto Valor": "A.V",
-                    "Cabo/Primária": "Cabo/Prim.",
-                    "Reincidência": "Reinc.",
-                    "Afetação": "Afet.",
-                    "Técnicos": "Téc.",
-                }
-            )
-        )
-
-        lista_imagens = []
-        total_linhas = len(df_p)
-        if total_linhas == 0:
-            return lista_imagens
-
-        num_paginas = (total_linhas + ITENS_POR_PAGINA - 1) // ITENS_POR_PAGINA
-
-        for i in range(num_paginas):
-            inicio = i * ITENS_POR_PAGINA
-            fim = inicio + ITENS_POR_PAGINA
-            df_chunk = df_p.iloc[inicio:fim]
-            idx_chunk = df_view.iloc[inicio:fim]
-
-            fig, ax = plt.subplots(
-                figsize=(17, max(4, 3 + len(df_chunk) * 0.8)), dpi=180
-            )
-            ax.axis("off")
-            fig.patch.set_facecolor("white")
-
-            titulo = (
-                f"SIGMA OPS: {contrato}\n{datetime.now().strftime('%d/%m • %H:%M')}"
-            )
-            if num_paginas > 1:
-                titulo += f" (Pág {i + 1}/{num_paginas})"
-
-            plt.title(
-                titulo,
-                loc="center",
-                pad=40,
-                fontsize=28,
-                weight="black",
-                color="#1e293b",
-            )
-            tbl = ax.table(
-                cellText=df_chunk.values.tolist(),
-                colLabels=df_chunk.columns,
-                cellLoc="center",
-                loc="center",
-            )
-
-            tbl.auto_set_font_size(False)
-            tbl.set_fontsize(11)
-            tbl.scale(1.0, 3.0)
-
-            for j in range(len(df_chunk.columns)):
-                tbl[(0, j)].set_facecolor("#7c3aed")
-                tbl[(0, j)].set_text_props(color="white", weight="bold")
-
-            for r_idx in range(len(df_chunk)):
-                row_orig = idx_chunk.iloc[r_idx]
-                h = row_orig.get("horas_float", 0)
-                is_b2b = str(row_orig.get("B2B", "NÃO")).upper() == "SIM"
-                limite_fora = 4 if is_b2b else 8
-
-                c = "#16a34a"
-                if h > 24:
-                    c = "#dc2626"
-                elif h > limite_fora:
-                    c = "#d97706"
-
-                if row_orig.get("Afetação", 0) >= 100:
-                    c = "#2563eb"
-
-                for j in range(len(df_chunk.columns)):
-                    tbl[(r_idx + 1, j)].set_text_props(color=c, weight="bold")
-                    tbl[(r_idx + 1, j)].set_edgecolor("#e2e8f0")
-
-            buf = io.BytesIO()
-            plt.savefig(
-                buf, format="jpg", dpi=180, bbox_inches="tight", facecolor="white"
-            )
-            plt.close(fig)
-            lista_imagens.append(buf.getvalue())
-        return lista_imagens
-
-    def gerar_dashboard_gerencial(df_geral, contratos_list):
-        import matplotlib.pyplot as plt
-
-        df_filtrado = df_geral.copy()
-        resumo = (
-            df_filtrado.groupby("Contrato_Padrao")
-            .agg(
-                Total=("Ocorrência", "count"),
-                No_Prazo=("Status SLA", lambda x: (x == "No Prazo").sum()),
-                Fora_Prazo=("Status SLA", lambda x: (x == "Fora do Prazo").sum()),
-                Grandes_Vultos=("Afetação", lambda x: (x >= 100).sum()),
-                VIPs=("VIP", lambda x: (x == "SIM").sum()),
-                Cond_Alto_Valor=("Cond. Alto Valor", lambda x: (x == "SIM").sum()),
-                B2B=("B2B", lambda x: (x == "SIM").sum()),
-                Criticos=("Status SLA", lambda x: (x == "Crítico").sum()),
-            )
-            .rename(
-                columns={
-                    "No_Prazo": "No Prazo",
-                    "Fora_Prazo": "Fora Prazo",
-                    "Grandes_Vultos": "G. Vulto",
-                    "Cond_Alto_Valor": "Alto Valor",
-                    "Criticos": "Críticos >24h",
-                }
-            )
-            .reset_index()
-            .sort_values("Total", ascending=False)
-        )
-
-        resumo.rename(columns={"Contrato_Padrao": "Contrato"}, inplace=True)
-
-        fig, ax = plt.subplots(figsize=(16, max(4, 3 + len(resumo) * 0.8)), dpi=200)
-        ax.axis("off")
-        fig.patch.set_facecolor("white")
-
-        hora = datetime.now().strftime("%d/%m • %H:%M")
-        plt.title(
-            f"VISÃO CLUSTER\nConsolidado SigmaOPS • {hora}",
-            loc="center",
-            pad=40,
-            fontsize=28,
-            weight="black",
-            color="#1e293b",
-        )
-
-        tbl = ax.table(
-            cellText=resumo.values.tolist(),
-            colLabels=resumo.columns,
-            cellLoc="center",
-            loc="center",
-        )
-        tbl.auto_set_font_size(False)
-        tbl.set_fontsize(11)
-        tbl.scale(1.2, 3.0)
-
-        for (i, j), cell in tbl.get_celld().items():
-            if i == 0:
-                cell.set_facecolor("#7c3aed")
-                cell.set_text_props(color="white", weight="bold")
-            else:
-                cell.set_edgecolor("#e2e8f0")
-                cell.set_text_props(color="#1e293b", weight="bold")
-                if i % 2 == 0:
-                    cell.set_facecolor("#f8fafc")
-
-        buf = io.BytesIO()
-        plt.savefig(buf, format="jpg", dpi=200, bbox_inches="tight", facecolor="white")
-        plt.close(fig)
-        return buf.getvalue()
-
     # ==============================================================================
     # 📊 CORPO DO DASHBOARD
     # ==============================================================================
-    df_raw, erro = carregar_dados_api()
+    df_raw, erro = snapshot.df, snapshot.erro
+    # Índice da coleta, partilhado pelas sessões: horas contadas na coleta, como
+    # o momento_snapshot que data as exportações
+    indice_coleta = snapshot.indice
+    if df_raw is not None and indice_coleta is None:
+        indice_coleta = IndiceSnapshot.construir(df_raw)
+    # Na tela, SLA e horas corridas andam com o relógio (ao minuto), não com a coleta
+    indice = (
+        indice_coleta.no_minuto(datetime.now()) if indice_coleta is not None else None
+    )
+    # Horário do snapshot (BRT) nas exportações: a mesma imagem vale até a próxima coleta
+    momento_snapshot = (
+        (snapshot.atualizado_em - timedelta(hours=3)).replace(tzinfo=None)
+        if snapshot.atualizado_em is not None
+        else datetime.now()
+    )
 
     if df_raw is not None:
         # --- ABAS DE PERFIS ---
@@ -1099,26 +841,27 @@ else:
                     )
             with c_ref:
                 if st.button("🔄 Atualizar", width="stretch"):
-                    carregar_dados_api.clear()
-                    carregar_dMinusOne.clear()
+                    poller_ocorrencias.atualizar_agora()
+                    buscador_apis.limpar("d1")
                     st.rerun()
 
-            df_view = processar_dados(df_raw, contrato_atual)
+            contratos_view = (
+                [contrato_atual] if isinstance(contrato_atual, str) else contrato_atual
+            )
+            filtro = indice.bitmap({"Contrato": [c.upper() for c in contratos_view]})
 
             c_f1, c_f2 = st.columns(2)
             with c_f1:
-                f_reg = st.multiselect("Região", df_view["Area"].unique())
+                f_reg = st.multiselect("Região", indice.valores("Area", filtro))
             with c_f2:
                 f_sla = st.multiselect("SLA", ["Crítico", "Fora do Prazo", "No Prazo"])
 
-            if f_reg:
-                df_view = df_view[df_view["Area"].isin(f_reg)]
-            if f_sla:
-                df_view = df_view[df_view["Status SLA"].isin(f_sla)]
+            filtro &= indice.bitmap({"Area": f_reg, "Status SLA": f_sla})
+            df_view = indice.selecionar(filtro)
 
             # KPIs HTML
-            t = len(df_view)
-            dados = carregar_dMinusOne(contrato_atual)
+            t = indice.contar(filtro)
+            dados = buscador_apis.aguardar(buscador_apis.d_minus_one(contrato_atual))
             ocorrencias, prazo, reincidencia = 0, 0, 0
             if dados:
                 ocorrencias = dados.get('ocorrencias')
@@ -1127,12 +870,12 @@ else:
 
             k = {
                 "total": t,
-                "sem_tec": len(df_view[df_view["Técnicos"] == 0]),
-                "critico": len(df_view[df_view["Status SLA"] == "Crítico"]),
-                "fora": len(df_view[df_view["Status SLA"] == "Fora do Prazo"]),
-                "no_prazo": len(df_view[df_view["Status SLA"] == "No Prazo"]),
-                "lit": len(df_view[df_view["Area"] == "Litoral"]),
-                "vale": len(df_view[df_view["Area"] == "Vale"]),
+                "sem_tec": indice.contar(filtro, {"Sem Técnico": True}),
+                "critico": indice.contar(filtro, {"Status SLA": "Crítico"}),
+                "fora": indice.contar(filtro, {"Status SLA": "Fora do Prazo"}),
+                "no_prazo": indice.contar(filtro, {"Status SLA": "No Prazo"}),
+                "lit": indice.contar(filtro, {"Area": "Litoral"}),
+                "vale": indice.contar(filtro, {"Area": "Vale"}),
             }
 
             c_style = "background:white;border:1px solid #e2e8f0;border-left:4px solid #7c3aed;padding:12px;border-radius:8px;box-shadow:0 1px 3px rgba(0,0,0,0.03);display:flex;flex-direction:column;justify-content:center;height:80px;"
@@ -1158,28 +901,51 @@ else:
             """
             st.markdown(html + "</div>", unsafe_allow_html=True)
 
-            gv = len(df_view[df_view["Afetação"] >= 100])
+            gv = indice.contar(filtro, {"Grande Vulto": True})
             if gv > 0:
                 st.markdown(
                     f"<div class='alert-box'>🚨 {gv} GRANDE(S) VULTO(S) EM ABERTO</div>",
                     unsafe_allow_html=True,
                 )
                 with st.expander("Ver Detalhes GV"):
-                    for _, row in df_view[df_view["Afetação"] >= 100].iterrows():
+                    df_gv = df_view[df_view["Afetação"] >= 100]
+                    for _, row in formatar_exibicao(df_gv, df_gv.columns).iterrows():
                         st.code(gerar_texto_gv(row, contrato_atual), language="text")
 
             with st.expander("📂 Opções de Exportação"):
+                formato = (
+                    "webp"
+                    if st.radio(
+                        "Formato",
+                        ["JPG", "WebP (menor, para WhatsApp)"],
+                        horizontal=True,
+                        key="formato_exportacao",
+                    ).startswith("WebP")
+                    else "jpeg"
+                )
+                _, mime_img, ext = FORMATOS[formato]
                 c1, c2 = st.columns(2)
-                try:
-                    c1.download_button(
-                        "Baixar Resumo",
-                        gerar_cards_mpl(k, contrato_atual),
-                        f"resumo_{nome_arq}.jpg",
-                        "image/jpeg",
-                        width="stretch",
-                    )
-                except:
-                    pass
+                # As imagens só são geradas no clique e ficam no cache por conteúdo
+                chave_resumo = chave_exportacao(
+                    "resumo",
+                    formato,
+                    contrato_atual,
+                    momento_snapshot,
+                    sorted(k.items()),
+                )
+                c1.download_button(
+                    "Baixar Resumo",
+                    lambda: cache_exportacao.obter(
+                        chave_resumo,
+                        lambda: gerar_cards(
+                            k, contrato_atual, momento_snapshot, formato
+                        ),
+                    ),
+                    f"resumo_{nome_arq}.{ext}",
+                    mime_img,
+                    on_click="ignore",
+                    width="stretch",
+                )
 
                 cols_export = [
                     "Ocorrência",
@@ -1195,32 +961,105 @@ else:
                     "B2B",
                     "Técnicos",
                 ]
-                try:
-                    imgs = gerar_lista_mpl_from_view(
-                        df_view, cols_export, contrato_atual
+                # A lista sai do índice da coleta, com as horas de momento_snapshot
+                # (o título): a mesma seleção no mesmo snapshot dá os mesmos bytes
+                # para qualquer sessão, e a chave não precisa ler as linhas
+                filtro_coleta = indice_coleta.bitmap(
+                    {
+                        "Contrato": [c.upper() for c in contratos_view],
+                        "Area": f_reg,
+                        "Status SLA": f_sla,
+                    }
+                )
+                selecao = (
+                    snapshot.versao,
+                    momento_snapshot,
+                    contrato_atual,
+                    sorted(f_reg),
+                    sorted(f_sla),
+                )
+                num_paginas = contar_paginas(indice_coleta.contar(filtro_coleta))
+
+                def baixar_pagina(pagina):
+                    chave = chave_exportacao(
+                        "lista", formato, *selecao, pagina, num_paginas
                     )
-                    if imgs:
-                        if len(imgs) == 1:
-                            c2.download_button(
-                                "Baixar Lista",
-                                imgs[0],
-                                f"lista_{nome_arq}.jpg",
-                                "image/jpeg",
-                                width="stretch",
+                    return cache_exportacao.obter(
+                        chave,
+                        lambda: gerar_lista(
+                            indice_coleta.selecionar(filtro_coleta),
+                            cols_export,
+                            contrato_atual,
+                            momento_snapshot,
+                            pagina=pagina,
+                            formato=formato,
+                        )[0],
+                    )
+
+                for pagina in range(num_paginas):
+                    c2.download_button(
+                        "Baixar Lista"
+                        if num_paginas == 1
+                        else f"Baixar Lista (Pág {pagina + 1})",
+                        lambda pagina=pagina: baixar_pagina(pagina),
+                        f"lista_{nome_arq}.{ext}"
+                        if num_paginas == 1
+                        else f"lista_{nome_arq}_p{pagina + 1}.{ext}",
+                        mime_img,
+                        on_click="ignore",
+                        width="stretch",
+                    )
+
+                if num_paginas > 1:
+                    chave_lista = chave_exportacao("lista_completa", formato, *selecao)
+
+                    def baixar_pacote(pacote):
+                        def gerar():
+                            imgs = cache_exportacao.obter(
+                                chave_lista,
+                                lambda: gerar_lista_paralela(
+                                    indice_coleta.selecionar(filtro_coleta),
+                                    cols_export,
+                                    contrato_atual,
+                                    momento_snapshot,
+                                    formato,
+                                ),
                             )
-                        else:
-                            for idx_img, img_bytes in enumerate(imgs):
-                                c2.download_button(
-                                    f"Baixar Lista (Pág {idx_img + 1})",
-                                    img_bytes,
-                                    f"lista_{nome_arq}_p{idx_img + 1}.jpg",
-                                    "image/jpeg",
-                                    width="stretch",
-                                )
-                except:
-                    pass
+                            if pacote == "zip":
+                                return empacotar_zip(imgs, f"lista_{nome_arq}", ext)
+                            return empacotar_pdf(imgs)
+
+                        return cache_exportacao.obter(f"{chave_lista}.{pacote}", gerar)
+
+                    c2.download_button(
+                        "Baixar Todas (ZIP)",
+                        lambda: baixar_pacote("zip"),
+                        f"lista_{nome_arq}.zip",
+                        "application/zip",
+                        on_click="ignore",
+                        width="stretch",
+                    )
+                    c2.download_button(
+                        "Baixar Todas (PDF)",
+                        lambda: baixar_pacote("pdf"),
+                        f"lista_{nome_arq}.pdf",
+                        "application/pdf",
+                        on_click="ignore",
+                        width="stretch",
+                    )
+
+            if indice_share is not None and df_view["AT"].notna().any():
+                with st.expander("📶 Ocorrências por 1.000 acessos (por AT)"):
+                    st.dataframe(
+                        indice_share.por_mil_acessos(
+                            sigla_at(df_view["AT"].dropna()).value_counts(),
+                            "Ocorrências",
+                        ),
+                        hide_index=True,
+                    )
+                    st.caption(f"Acessos de {indice_share.rotulo_mes_recente}")
 
-            # --- EXIBIÇÃO DA TABELA HTML CENTRALIZADA COM RESPONSIVIDADE ---
+            # --- TABELA OPERACIONAL (GRADE VIRTUALIZADA, PAGINADA NO SERVIDOR) ---
             c_tab1, c_tab2 = st.columns([4, 1])
             with c_tab2:
                 layout_modo = st.selectbox(
@@ -1260,9 +1099,13 @@ else:
                 cols_ocultar_html = ["horas_float"]
 
             cols_logica = list(dict.fromkeys(cols_visiveis + cols_ocultar_html))
-            c_final = [c for c in cols_logica if c in df_view.columns]
-
-            df_tela = df_view[c_final]
+            # "Horas Corridas" sai de "diff_s" quando a página é formatada
+            c_final = [
+                c
+                for c in cols_logica
+                if c in df_view.columns
+                or (c == "Horas Corridas" and "diff_s" in df_view)
+            ]
 
             dict_renomear = {
                 "Ocorrência": "ID",
@@ -1275,48 +1118,6 @@ else:
                 "Cond. Alto Valor": "A.V",
                 "Técnicos": "Téc.",
             }
-            df_tela.rename(columns=lambda x: dict_renomear.get(x, x), inplace=True)
-
-            def highlight_rows_tela(row):
-                h = row.get("horas_float", 0)  # checkpoint
-                is_b2b = str(row.get("B2B", "NÃO")).upper() == "SIM"
-                limite_fora = 4 if is_b2b else 8
-
-                tc = "#16a34a"
-                if h > 24:
-                    tc = "#dc2626"
-                elif h > limite_fora:
-                    tc = "#d97706"
-
-                if row.get("Afet.", 0) >= 100:
-                    tc = "#2563eb"
-
-                styles = []
-                for col in row.index:
-                    val = str(row[col]).upper().strip()
-                    cell_style = (
-                        f"color: {tc}; text-align: center !important; font-weight: 700;"
-                    )
-
-                    # --- ESTILIZAÇÃO DO BADGE DE CRITICIDADE ---
-                    if col == "Criticidade":
-                        if "E-MAIL" in val:
-                            cell_style = "background-color: #fee2e2; color: #991b1b; font-weight: 900; border-radius: 4px;"
-                        elif "COORDENADOR" in val:
-                            cell_style = "background-color: #ffedd5; color: #c2410c; font-weight: 800; border-radius: 4px;"
-                        elif "SUPERVISOR" in val:
-                            cell_style = "background-color: #fef9c3; color: #a16207; font-weight: 800; border-radius: 4px;"
-                        else:
-                            cell_style = "background-color: #dcfce7; color: #15803d; font-weight: 700; border-radius: 4px;"
-
-                    elif col == "VIP" and val == "SIM":
-                        cell_style += "background-color: #f5d0fe; color: #86198f;"
-                    elif col == "A.V" and val == "SIM":
-                        cell_style += "background-color: #d9f99d; color: #365314;"
-                    elif col == "B2B" and val == "SIM":
-                        cell_style += "background-color: #ddd6fe; color: #5b21b6;"
-                    styles.append(cell_style)
-                return styles
 
             ocultar_final = [
                 dict_renomear.get(c, c)
@@ -1324,42 +1125,30 @@ else:
                 if c in df_view.columns
             ]
 
-            tabela_html = (
-                df_tela.style.apply(highlight_rows_tela, axis=1)
-                .set_table_attributes(
-                    'style="width:100%; border-collapse: collapse; font-family: Inter, sans-serif;"'
-                )
-                .set_table_styles(
-                    [
-                        {
-                            "selector": "th",
-                            "props": [
-                                ("text-align", "center"),
-                                ("background-color", "#f1f5f9"),
-                                ("color", "#475569"),
-                                ("padding", "10px"),
-                                ("border-bottom", "2px solid #e2e8f0"),
-                                ("font-size", "13px"),
-                            ],
-                        },
-                        {
-                            "selector": "td",
-                            "props": [
-                                ("text-align", "center"),
-                                ("padding", "8px"),
-                                ("border-bottom", "1px solid #f8fafc"),
-                                ("font-size", "12px"),
-                            ],
-                        },
-                    ]
-                )
-                .hide(axis="index")
-                .hide(subset=list(ocultar_final), axis="columns")
-                .to_html()
-            )
+            num_paginas_tabela = max(1, -(-len(df_view) // LINHAS_POR_PAGINA))
+            pagina_tabela = 0
+            if num_paginas_tabela > 1:
+                with c_tab1:
+                    pagina_tabela = st.selectbox(
+                        "Página",
+                        range(num_paginas_tabela),
+                        format_func=lambda p: (
+                            f"Ocorrências {p * LINHAS_POR_PAGINA + 1}–"
+                            f"{min((p + 1) * LINHAS_POR_PAGINA, len(df_view))}"
+                            f" de {len(df_view)}"
+                        ),
+                        key="pagina_tabela",
+                        label_visibility="collapsed",
+                    )
 
-            with st.container(height=600, border=False):
-                st.markdown(tabela_html, unsafe_allow_html=True)
+            exibir_grade(
+                df_view,
+                c_final,
+                dict_renomear,
+                ocultar_final,
+                key="grade_operacional",
+                pagina=pagina_tabela,
+            )
 
         # --- ABA CLUSTER ---
         if tab_cl:
@@ -1376,13 +1165,14 @@ else:
                         st.form_submit_button("Atualizar Visão", width="stretch")
 
                 if sels:
-                    df_cl = processar_dados(df_raw, sels)
+                    filtro_cl = indice.bitmap({"Contrato": [c.upper() for c in sels]})
+                    df_cl = indice.selecionar(filtro_cl)
 
-                    t_g = len(df_cl)
-                    t_gv = len(df_cl[df_cl["Afetação"] >= 100])
-                    c_ok = len(df_cl[df_cl["Status SLA"] == "No Prazo"])
-                    c_fora = len(df_cl[df_cl["Status SLA"] == "Fora do Prazo"])
-                    c_crit = len(df_cl[df_cl["Status SLA"] == "Crítico"])
+                    t_g = indice.contar(filtro_cl)
+                    t_gv = indice.contar(filtro_cl, {"Grande Vulto": True})
+                    c_ok = indice.contar(filtro_cl, {"Status SLA": "No Prazo"})
+                    c_fora = indice.contar(filtro_cl, {"Status SLA": "Fora do Prazo"})
+                    c_crit = indice.contar(filtro_cl, {"Status SLA": "Crítico"})
 
                     def badge_cl(num, total, cor):
                         if total == 0:
@@ -1399,48 +1189,76 @@ else:
                     st.markdown(h_cl, unsafe_allow_html=True)
 
                     with st.expander("Descarregar Imagem"):
-                        if st.button("Gerar Dashboard"):
-                            try:
-                                st.download_button(
-                                    "Download",
-                                    gerar_dashboard_gerencial(df_cl, sels),
-                                    f"cluster_{nome_arq}.jpg",
-                                    "image/jpeg",
-                                )
-                            except:
-                                pass
-
-                    resumo = (
-                        df_cl.groupby("Contrato_Padrao")
-                        .agg(
-                            Total=("Ocorrência", "count"),
-                            No_Prazo=("Status SLA", lambda x: (x == "No Prazo").sum()),
-                            Fora_Prazo=(
-                                "Status SLA",
-                                lambda x: (x == "Fora do Prazo").sum(),
-                            ),
-                            Grandes_Vultos=("Afetação", lambda x: (x >= 100).sum()),
-                            VIPs=("VIP", lambda x: (x == "SIM").sum()),
-                            Cond_Alto_Valor=(
-                                "Cond. Alto Valor",
-                                lambda x: (x == "SIM").sum(),
-                            ),
-                            B2B=("B2B", lambda x: (x == "SIM").sum()),
-                            Criticos=("Status SLA", lambda x: (x == "Crítico").sum()),
+                        # Como a lista: índice da coleta, chave pela seleção
+                        chave_cluster = chave_exportacao(
+                            "cluster", snapshot.versao, momento_snapshot, sorted(sels)
                         )
-                        .rename(
-                            columns={
-                                "No_Prazo": "No Prazo",
-                                "Fora_Prazo": "Fora Prazo",
-                                "Grandes_Vultos": "Grandes Vultos",
-                                "Criticos": "Críticos (>24h)",
-                            }
+                        st.download_button(
+                            "Download",
+                            lambda: cache_exportacao.obter(
+                                chave_cluster,
+                                lambda: gerar_dashboard_gerencial(
+                                    indice_coleta.selecionar(
+                                        indice_coleta.bitmap(
+                                            {"Contrato": [c.upper() for c in sels]}
+                                        )
+                                    ),
+                                    sels,
+                                    momento_snapshot,
+                                ),
+                            ),
+                            f"cluster_{nome_arq}.jpg",
+                            "image/jpeg",
+                            on_click="ignore",
                         )
+
+                    resumo = (
+                        medidas_sla(df_cl)
+                        .groupby(df_cl["Contrato_Padrao"])
+                        .sum()
+                        .drop(columns="Sem Técnico")
+                        .rename(columns={"Críticos": "Críticos (>24h)"})
                         .reset_index()
                         .sort_values("Total", ascending=False)
                     )
 
                     st.dataframe(resumo, width="stretch", hide_index=True)
+
+                    st.markdown("##### 📈 Tendência")
+                    c_t1, c_t2 = st.columns([1, 2])
+                    with c_t1:
+                        dias_tendencia = st.radio(
+                            "Período",
+                            [30, 90],
+                            format_func=lambda d: f"{d} dias",
+                            horizontal=True,
+                            key="dias_tendencia",
+                        )
+                    with c_t2:
+                        medida_tendencia = st.selectbox(
+                            "Indicador", MEDIDAS_SLA, key="medida_tendencia"
+                        )
+                    tendencia = cubos_sla.consultar(
+                        "dia",
+                        datetime.now() - timedelta(days=dias_tendencia),
+                        contratos=sels,
+                        por=["Contrato"],
+                    )
+                    if tendencia.empty:
+                        st.caption(
+                            "Ainda sem histórico para os contratos selecionados."
+                        )
+                    else:
+                        st.line_chart(
+                            tendencia.pivot(
+                                index="Período",
+                                columns="Contrato",
+                                values=medida_tendencia,
+                            ).fillna(0)
+                        )
+                        st.caption(
+                            "Média diária de ocorrências em aberto nos snapshots do dia."
+                        )
                 else:
                     st.warning("Selecione pelo menos um contrato.")
 
@@ -1473,7 +1291,7 @@ else:
                     if st.button(
                         "🔄 Atualizar", use_container_width=True, key="btn_upd1"
                     ):
-                        carregar_dados_ofensores.clear()
+                        buscador_apis.limpar("ofensores")
                         st.rerun()
             else:
                 st.session_state.at_sel = None
@@ -1481,23 +1299,34 @@ else:
             range_dias = st.slider(
                 "**Selecione o Range**",
                 min_value=5,
-                max_value=365,
+                max_value=RANGE_MAXIMO,
                 value=30,
                 step=5,
                 help="Selecione o range de dias para ver as primárias afetadas",
+                key="range_dias",
             )
 
-            # carregamento de dados da api de ofensores, com cache para 5 minutos
-            dados_of, erro_of = carregar_dados_ofensores(
-                st.session_state.contract, range_dias
+            # carregamento de dados da api de ofensores, com cache para 5 minutos:
+            # uma chamada com o range máximo por contrato; o slider só recorta
+            sem_resposta = (None, "A API de ofensores não respondeu a tempo.")
+            tabela_of, erro_of = buscador_apis.aguardar(
+                buscador_apis.ofensores(st.session_state.contract), sem_resposta
             )
+            if tabela_of is not None and not tabela_of.tem_datas:
+                # payload sem data por ocorrência: volta a pedir o range à API
+                tabela_of, erro_of = buscador_apis.aguardar(
+                    buscador_apis.ofensores(st.session_state.contract, range_dias),
+                    sem_resposta,
+                )
             logger.debug(
                 f"Dados de ofensores carregados para o contrato {st.session_state.contract}"
             )
 
-            if dados_of is not None:
-                # processamento dos dados para ranking
-                df_rank = processar_json_ofensores(dados_of, st.session_state.at_sel)
+            if tabela_of is not None:
+                # ranking pelo índice invertido de AT: só o top entra na tabela
+                df_rank = tabela_of.ranking(
+                    st.session_state.at_sel, LIMITE_RANKING, range_dias
+                )
 
                 if not df_rank.empty:
                     if not df_rank.empty:
@@ -1520,7 +1349,7 @@ else:
                             if st.button(
                                 "🔄 Atualizar Base", use_container_width=False
                             ):
-                                carregar_dados_ofensores.clear()
+                                buscador_apis.limpar("ofensores")
                                 st.rerun()
 
                         top_1 = df_rank.iloc[0]
@@ -1538,6 +1367,14 @@ else:
                             )
 
                         st.markdown("##### 📋 Detalhamento dos casos repetidos")
+                        total_rank = tabela_of.total(
+                            st.session_state.at_sel, range_dias
+                        )
+                        if total_rank > len(df_rank):
+                            st.caption(
+                                f"Mostrando as {len(df_rank)} primeiras de "
+                                f"{total_rank} primárias."
+                            )
                         evento_selecao = st.dataframe(
                             df_rank,
                             hide_index=True,
@@ -1560,6 +1397,19 @@ else:
                                 row = content[1]
                                 valor = df_rank.at[content[0], "Primária"]
 
+                        if indice_share is not None:
+                            st.markdown("##### 📶 Falhas por 1.000 acessos (por AT)")
+                            st.dataframe(
+                                indice_share.por_mil_acessos(
+                                    tabela_of.falhas_por_at(
+                                        st.session_state.at_sel, range_dias
+                                    ),
+                                    "Falhas",
+                                ),
+                                hide_index=True,
+                            )
+                            st.caption(f"Acessos de {indice_share.rotulo_mes_recente}")
+
                         # TODO: desenvolvimento futuro
                         # with st.container():
                         #     st.subheader(f'Adicionar alerta para primária teste')
@@ -0,0 +1,142 @@
+import threading
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.orm import joinedload, sessionmaker
+
+from database import FilaEscrita, Session, User, escritor
+
+usuarios = User.__table__
+
+
+@dataclass(frozen=True)
+class Pendente:
+    id_user: int
+    name: str
+    email: str
+    contrato: str
+    created_at: datetime
+
+
+class FilaAprovacao:
+    """Utilizadores à espera de aprovação, para o painel do admin.
+
+    As páginas saem por keyset (id_user > último da página anterior) pelo
+    índice de `approved`, com o contrato carregado no mesmo SELECT. A
+    contagem e as páginas ficam em memória até a próxima aprovação, recusa
+    ou novo registo (`invalidar`), então as execuções do script não voltam
+    ao banco. Aprovar e recusar em lote é uma única transação.
+    """
+
+    def __init__(
+        self, session_factory: sessionmaker = Session, escritor: FilaEscrita = escritor
+    ):
+        self._session_factory = session_factory
+        self.escritor = escritor
+        self._lock = threading.Lock()
+        self._preparado = False
+        self._pendentes: int | None = None
+        self._paginas: dict[tuple, tuple[list[Pendente], bool]] = {}
+
+    def _preparar(self) -> None:
+        # O índice é novo: cria-o se o banco veio de uma versão anterior
+        if not self._preparado:
+
+            def operacao(db) -> None:
+                for indice in usuarios.indexes:
+                    indice.create(db.connection(), checkfirst=True)
+
+            self.escritor.executar(operacao)
+            self._preparado = True
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._pendentes = None
+            self._paginas = {}
+
+    def contar(self) -> int:
+        with self._lock:
+            if self._pendentes is None:
+                self._preparar()
+                with self._session_factory() as session:
+                    self._pendentes = session.execute(
+                        select(func.count()).where(User.approved.is_(False))
+                    ).scalar()
+            return self._pendentes
+
+    def pagina(
+        self, depois_de: int | None = None, limite: int = 10
+    ) -> tuple[list[Pendente], bool]:
+        """Até `limite` pendentes com id_user > `depois_de` e se há mais."""
+        chave = (depois_de, limite)
+        with self._lock:
+            if chave not in self._paginas:
+                self._preparar()
+                self._paginas[chave] = self._ler_pagina(depois_de, limite)
+            return self._paginas[chave]
+
+    def _ler_pagina(
+        self, depois_de: int | None, limite: int
+    ) -> tuple[list[Pendente], bool]:
+        stmt = (
+            select(User)
+            .options(joinedload(User.contract_rel))
+            .where(User.approved.is_(False))
+            .order_by(User.id_user)
+            .limit(limite + 1)
+        )
+        if depois_de is not None:
+            stmt = stmt.where(User.id_user > depois_de)
+        with self._session_factory() as session:
+            linhas = session.scalars(stmt).all()
+            pendentes = [
+                Pendente(
+                    u.id_user,
+                    u.name,
+                    u.email,
+                    u.contract_rel.name if u.contract_rel else "",
+                    u.created_at,
+                )
+                for u in linhas[:limite]
+            ]
+        return pendentes, len(linhas) > limite
+
+    def aprovar(self, perfis: dict[int, str]) -> int:
+        """Aprova {id_user: perfil} numa transação; devolve quantos mudaram."""
+        if not perfis:
+            return 0
+        comando = (
+            update(usuarios)
+            .where(
+                usuarios.c.id_user == bindparam("uid"),
+                usuarios.c.approved.is_(False),
+            )
+            .values(approved=True, role=bindparam("perfil"))
+        )
+        parametros = [{"uid": u, "perfil": p} for u, p in perfis.items()]
+        try:
+            return self.escritor.executar(
+                lambda db: db.execute(comando, parametros).rowcount
+            )
+        finally:
+            self.invalidar()
+
+    def recusar(self, ids: Iterable[int]) -> int:
+        """Remove os pendentes `ids` numa transação; devolve quantos saíram."""
+        ids = list(ids)
+        if not ids:
+            return 0
+        comando = delete(usuarios).where(
+            usuarios.c.id_user.in_(ids),
+            usuarios.c.approved.is_(False),
+        )
+        try:
+            return self.escritor.executar(lambda db: db.execute(comando).rowcount)
+        finally:
+            self.invalidar()
+
+
+fila_aprovacao = FilaAprovacao()
@@ -0,0 +1,121 @@
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+class ServidorOcupado(Exception):
+    """Há pedidos de autenticação demais na fila; tente novamente em instantes."""
+
+
+# O que o PoolHash levanta numa rajada: fila cheia ou bcrypt além do timeout
+ERROS_POOL_HASH = (ServidorOcupado, TimeoutError)
+
+
+class PoolHash:
+    """Executa o bcrypt num pool limitado, fora da thread do script.
+
+    Com poucos workers, uma rajada de logins no início do turno disputa só
+    esses núcleos em vez de todas as threads do Streamlit; pedidos além de
+    `max_pendentes` são recusados em vez de acumular na fila.
+    """
+
+    def __init__(self, workers: int = 2, max_pendentes: int = 32, timeout: float = 15):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bcrypt"
+        )
+        self._vagas = threading.BoundedSemaphore(max_pendentes)
+        self.timeout = timeout
+
+    def _executar(self, func, *args):
+        if not self._vagas.acquire(blocking=False):
+            raise ServidorOcupado("Muitos pedidos de login; tente novamente.")
+        try:
+            futuro = self._executor.submit(func, *args)
+        except BaseException:
+            self._vagas.release()
+            raise
+        # A vaga só volta quando o trabalho termina (ou é cancelado), e não
+        # quando quem pediu desiste: senão, após timeouts, a fila passaria
+        # de `max_pendentes`
+        futuro.add_done_callback(lambda _: self._vagas.release())
+        try:
+            return futuro.result(self.timeout)
+        except TimeoutError:
+            futuro.cancel()  # ainda na fila: não chega a rodar
+            raise
+
+    def hash_senha(self, senha: str) -> str:
+        return self._executar(
+            lambda: bcrypt.hashpw(senha.encode("utf-8"), bcrypt.gensalt())
+        ).decode("utf-8")
+
+    def verificar_senha(self, senha: str, senha_hash: str) -> bool:
+        return self._executar(
+            bcrypt.checkpw, senha.encode("utf-8"), senha_hash.encode("utf-8")
+        )
+
+
+class LimitadorTentativas:
+    """Bloqueia chaves com falhas demais numa janela deslizante.
+
+    Cada chave é um par (tipo, valor), ex. ("email", "a@b.pt") ou ("ip", ...),
+    e cada tipo tem o seu limite: um IP partilhado (NAT do escritório) aguenta
+    mais falhas do que um único email.
+    """
+
+    def __init__(self, limites: dict[str, int], janela_s: float = 300):
+        self.limites = limites
+        self.janela_s = janela_s
+        self._falhas: dict[tuple[str, str], deque[float]] = {}
+        self._proxima_varredura = 0.0
+        self._lock = threading.Lock()
+
+    def _recentes(self, chave: tuple[str, str], agora: float) -> deque[float]:
+        """Falhas da chave dentro da janela; a chave sai do dicionário se não há."""
+        falhas = self._falhas.get(chave)
+        if falhas is None:
+            return deque()
+        while falhas and agora - falhas[0] > self.janela_s:
+            falhas.popleft()
+        if not falhas:
+            del self._falhas[chave]
+        return falhas
+
+    def _varrer(self, agora: float) -> None:
+        # Chaves que falharam uma vez e nunca mais voltaram também expiram
+        if agora >= self._proxima_varredura:
+            self._proxima_varredura = agora + self.janela_s
+            for chave in list(self._falhas):
+                self._recentes(chave, agora)
+
+    def bloqueado(self, *chaves: tuple[str, str]) -> float:
+        """Segundos restantes de bloqueio (0 se todas as chaves estão liberadas)."""
+        agora = time.monotonic()
+        restante = 0.0
+        with self._lock:
+            for chave in chaves:
+                falhas = self._recentes(chave, agora)
+                if len(falhas) >= self.limites[chave[0]]:
+                    restante = max(restante, self.janela_s - (agora - falhas[0]))
+        return restante
+
+    def registrar_falha(self, *chaves: tuple[str, str]) -> None:
+        agora = time.monotonic()
+        with self._lock:
+            self._varrer(agora)
+            for chave in chaves:
+                self._recentes(chave, agora)
+                self._falhas.setdefault(chave, deque()).append(agora)
+
+    def limpar(self, *chaves: tuple[str, str]) -> None:
+        with self._lock:
+            for chave in chaves:
+                self._falhas.pop(chave, None)
+
+
+pool_hash = PoolHash()
+limitador_login = LimitadorTentativas({"email": 5, "ip": 30})
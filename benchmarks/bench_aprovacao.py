@@ -0,0 +1,126 @@
+"""Compara o painel de aprovação antigo (todos os pendentes, contrato
+carregado um a um, aprovar um por transação) com a FilaAprovacao (página por
+keyset com o contrato no mesmo SELECT, contagem em cache, aprovação em lote).
+
+Uso: python -m benchmarks.bench_aprovacao [utilizadores] [pendentes]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import event, insert, select, text, update
+from sqlalchemy.orm import sessionmaker
+
+from aprovacao import FilaAprovacao
+from database import Base, Contract, FilaEscrita, User, criar_engine
+
+
+def medir(funcao, repeticoes: int = 5) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor * 1000
+
+
+def main(n_usuarios: int = 50_000, n_pendentes: int = 500) -> None:
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = criar_engine(str(Path(pasta) / "user.db"))
+        Session = sessionmaker(bind=engine, expire_on_commit=False)
+        escritor = FilaEscrita(Session)
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(
+                insert(Contract), [{"name": f"CONTRATO_{i}"} for i in range(6)]
+            )
+            conn.execute(
+                insert(User),
+                [
+                    {
+                        "name": f"Utilizador {i}",
+                        "approved": i >= n_pendentes,
+                        "contract": i % 6 + 1,
+                        "email": f"u{i}@x",
+                        "password": "x",
+                    }
+                    for i in range(n_usuarios)
+                ],
+            )
+            # Como no user.db de uma versão anterior
+            conn.execute(text("DROP INDEX ix_users_approved"))
+
+        consultas = 0
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def contar_consultas(*_):
+            nonlocal consultas
+            consultas += 1
+
+        def painel_legado():
+            with Session() as session:
+                stmt = select(User).where(User.approved.is_(False))
+                for user in session.execute(stmt).mappings().all():
+                    row = user.get("User", {})
+                    _ = f"**{row.name}** | {row.contract_rel.name}"
+
+        fila = FilaAprovacao(Session, escritor)
+
+        def painel_novo(fila: FilaAprovacao):
+            fila.contar()
+            for row in fila.pagina()[0]:
+                _ = f"**{row.name}** | {row.contrato}"
+
+        def medir_consultas(funcao) -> int:
+            nonlocal consultas
+            consultas = 0
+            funcao()
+            return consultas
+
+        print(f"{n_usuarios} utilizadores, {n_pendentes} pendentes")
+        print(
+            f"  legado: {medir(painel_legado):7.1f} ms por execução, "
+            f"{medir_consultas(painel_legado)} consultas"
+        )
+
+        def sem_cache():
+            fila.invalidar()
+            painel_novo(fila)
+
+        print(
+            f"  novo:   {medir(sem_cache):7.1f} ms sem cache, "
+            f"{medir_consultas(sem_cache)} consultas | "
+            f"{medir(lambda: painel_novo(fila)):5.3f} ms em cache, "
+            f"{medir_consultas(lambda: painel_novo(fila))} consultas"
+        )
+
+        pagina = fila.pagina()[0]
+
+        def aprovar_legado():
+            for row in pagina:
+                escritor.executar(
+                    lambda s, uid=row.id_user: s.execute(
+                        update(User).where(User.id_user == uid).values(approved=True)
+                    )
+                )
+
+        t_legado = medir(aprovar_legado, 1)
+        with engine.begin() as conn:
+            conn.execute(
+                update(User)
+                .where(User.id_user.in_([r.id_user for r in pagina]))
+                .values(approved=False)
+            )
+        t0 = time.perf_counter()
+        fila.aprovar({r.id_user: "user" for r in pagina})
+        t_lote = (time.perf_counter() - t0) * 1000
+        print(
+            f"  aprovar {len(pagina)}: um a um {t_legado:6.1f} ms | "
+            f"em lote {t_lote:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
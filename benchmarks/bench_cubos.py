@@ -0,0 +1,96 @@
+"""Cubos de SLA: custo de somar cada snapshot nos rollups por hora/dia e
+latência das consultas de tendência de 30/90 dias, comparadas com
+reprocessar os snapshots crus do período.
+
+Uso: python -m benchmarks.bench_cubos [ocorrencias] [dias] [minutos entre snapshots]
+"""
+
+import sys
+import tempfile
+import time
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.dados_sinteticos import gerar_snapshot
+from cubos import CubosSLA
+from database import FilaEscrita, criar_engine
+from sla import medidas_sla, processar_dados
+
+
+def main(n: int = 2000, dias: int = 90, passo: int = 30) -> None:
+    rng = np.random.default_rng(5)
+    agora = datetime.now().replace(second=0, microsecond=0)
+    inicio = agora - timedelta(days=dias)
+    base = gerar_snapshot(n, agora=inicio)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = criar_engine(str(Path(pasta) / "historico.db"))
+        cubos = CubosSLA(engine, FilaEscrita(sessionmaker(bind=engine)))
+        tempos = []
+        momentos = [inicio + timedelta(minutes=m) for m in range(0, dias * 1440, passo)]
+        for em in momentos:
+            df = base.copy()
+            df["Técnicos"] = rng.integers(0, 3, len(df))
+            # Na aplicação o snapshot processado vem do IndiceSnapshot
+            df = processar_dados(df, [], agora=em)
+            t0 = time.perf_counter()
+            cubos.registrar(df, em)
+            tempos.append(time.perf_counter() - t0)
+        print(f"{len(momentos)} snapshots de {n} ocorrências ({dias} dias)")
+        print(
+            f"  somar nos cubos: mediana {1000 * np.median(tempos):.1f} ms, "
+            f"p95 {1000 * np.percentile(tempos, 95):.1f} ms por snapshot"
+        )
+
+        for nome, consulta in [
+            (
+                "30 dias por dia, por contrato",
+                lambda: cubos.consultar(
+                    "dia", agora - timedelta(days=30), por=["Contrato"]
+                ),
+            ),
+            (
+                "90 dias por dia, 2 contratos",
+                lambda: cubos.consultar(
+                    "dia",
+                    agora - timedelta(days=90),
+                    contratos=["ABILITY_SJ", "TEL_JI"],
+                    por=["Contrato"],
+                ),
+            ),
+            (
+                "30 dias por hora, 1 AT",
+                lambda: cubos.consultar("hora", agora - timedelta(days=30), ats=["SJ"]),
+            ),
+        ]:
+            t0 = time.perf_counter()
+            linhas = len(consulta())
+            t_banco = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            consulta()
+            t_memoria = time.perf_counter() - t0
+            print(
+                f"  {nome}: {linhas} linhas em {1000 * t_banco:.1f} ms "
+                f"(repetida: {1000 * t_memoria:.2f} ms)"
+            )
+
+        # Sem cubos: reprocessar cada snapshot do período e resumir
+        amostra = momentos[-10:]
+        t0 = time.perf_counter()
+        for em in amostra:
+            medidas_sla(processar_dados(base, [], agora=em)).sum()
+        por_snapshot = (time.perf_counter() - t0) / len(amostra)
+        print(
+            f"  reprocessar os {30 * 1440 // passo} snapshots de 30 dias: "
+            f"~{por_snapshot * 30 * 1440 / passo:.1f} s"
+        )
+
+
+if __name__ == "__main__":
+    argumentos = [int(a) for a in sys.argv[1:4]]
+    main(*argumentos)
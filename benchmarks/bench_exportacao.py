@@ -0,0 +1,159 @@
+"""Mede as exportações: cards em matplotlib (legado) contra o template do
+renderizador, e a lista sequencial contra o pool de processos.
+
+Uso: python -m benchmarks.bench_exportacao [linhas]
+"""
+
+import io
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.dados_sinteticos import gerar_snapshot
+from exportacao import (
+    contar_paginas,
+    gerar_cards,
+    gerar_lista,
+    gerar_lista_paralela,
+    pool_paginas,
+)
+from sla import processar_dados
+
+COLUNAS = [
+    "Ocorrência",
+    "Cabo/Primária",
+    "AT",
+    "Afetação",
+    "Reincidência",
+    "Origem",
+    "Horas Corridas",
+    "VIP",
+    "Cond. Alto Valor",
+    "B2B",
+    "Técnicos",
+]
+
+KPIS = {"total": 312, "sem_tec": 41, "critico": 18, "fora": 97, "no_prazo": 197,
+        "lit": 120, "vale": 192}  # fmt: skip
+
+
+def cards_legado(kpis, contrato, momento):
+    """Cópia do gerar_cards_mpl em matplotlib que o renderizador substituiu."""
+    import matplotlib.patches as patches
+    import matplotlib.pyplot as plt
+
+    C_BG, C_BORDER, C_TEXT, C_LABEL = "#ffffff", "#e2e8f0", "#1e293b", "#64748b"
+    C_RED, C_YELLOW, C_GREEN = "#dc2626", "#d97706", "#16a34a"
+    h_tot = 14 if contrato == "ABILITY_SJ" else 11
+    fig, ax = plt.subplots(figsize=(12, h_tot), dpi=200)
+    fig.patch.set_facecolor(C_BG)
+    ax.axis("off")
+    ax.set_xlim(0, 100)
+    ax.set_ylim(0, 100)
+
+    def draw(x, y, w, h, t, v, col=C_TEXT):
+        ax.add_patch(
+            patches.FancyBboxPatch(
+                (x, y),
+                w,
+                h,
+                boxstyle="round,pad=0,rounding_size=3",
+                fc="white",
+                ec=C_BORDER,
+                lw=2,
+            )
+        )
+        ax.text(
+            x + w / 2,
+            y + h * 0.8,
+            t.upper(),
+            ha="center",
+            size=18,
+            color=C_LABEL,
+            weight="bold",
+        )
+        ax.text(
+            x + w / 2,
+            y + h * 0.4,
+            str(v),
+            ha="center",
+            size=55,
+            color=col,
+            weight="black",
+        )
+
+    ax.text(50, 96, "SIGMA OPS", ha="center", size=32, weight="black", color="#7c3aed")
+    ax.text(
+        50,
+        92,
+        f"{contrato} • {momento.strftime('%H:%M')}",
+        ha="center",
+        size=22,
+        weight="bold",
+        color="#475569",
+    )
+    draw(2, 68, 46, 18, "Total", kpis["total"])
+    draw(52, 68, 46, 18, "S/ Técnico", kpis["sem_tec"])
+    w = 30
+    g = 3
+    draw(2, 42, w, 18, "Crítico", kpis["critico"], C_RED)
+    draw(2 + w + g, 42, w, 18, "Fora do Prazo", kpis["fora"], C_YELLOW)
+    draw(2 + 2 * (w + g), 42, w, 18, "No Prazo", kpis["no_prazo"], C_GREEN)
+    if contrato == "ABILITY_SJ":
+        draw(2, 16, 46, 18, "Litoral", kpis["lit"])
+        draw(52, 16, 46, 18, "Vale", kpis["vale"])
+    buf = io.BytesIO()
+    plt.savefig(buf, format="jpg", dpi=200, bbox_inches="tight", facecolor=C_BG)
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def medir(func, repeticoes: int = 10) -> float:
+    func()  # aquece caches de fontes e templates
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        func()
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def main(n: int = 300) -> None:
+    agora = pd.Timestamp.now().floor("s")
+    df = processar_dados(gerar_snapshot(n, seed=7, agora=agora), [])
+    momento = datetime(2026, 1, 1, 8, 0)
+
+    t_mpl = medir(lambda: cards_legado(KPIS, "ABILITY_SJ", momento))
+    print("cards (ABILITY_SJ)")
+    print(f"  matplotlib: {1000 * t_mpl:.1f} ms")
+    for formato in ("jpeg", "webp"):
+        t = medir(lambda: gerar_cards(KPIS, "ABILITY_SJ", momento, formato))
+        tamanho = len(gerar_cards(KPIS, "ABILITY_SJ", momento, formato)) // 1024
+        print(
+            f"  template {formato}: {1000 * t:.1f} ms ({t_mpl / t:.0f}x), {tamanho} KB"
+        )
+    print(
+        f"  (matplotlib: {len(cards_legado(KPIS, 'ABILITY_SJ', momento)) // 1024} KB)"
+    )
+
+    print(f"lista: {n} linhas, {contar_paginas(n)} páginas")
+
+    inicio = time.perf_counter()
+    seq = gerar_lista(df, COLUNAS, "BENCH", momento)
+    t_seq = time.perf_counter() - inicio
+    print(f"  sequencial: {t_seq:.2f}s")
+
+    # Aquece o pool (spawn + import do matplotlib) fora da medição
+    pool_paginas().submit(int).result()
+    gerar_lista_paralela(df.head(41), COLUNAS, "BENCH", momento)
+
+    inicio = time.perf_counter()
+    par = gerar_lista_paralela(df, COLUNAS, "BENCH", momento)
+    t_par = time.perf_counter() - inicio
+    print(f"  pool de processos: {t_par:.2f}s")
+    print(f"  speedup: {t_seq / t_par:.1f}x")
+    assert len(seq) == len(par)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
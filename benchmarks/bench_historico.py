@@ -0,0 +1,88 @@
+"""Histórico de snapshots: custo de gravar um snapshot por minuto, tamanho
+do banco antes e depois da compactação e latência das consultas por período.
+
+Uso: python -m benchmarks.bench_historico [ocorrencias] [dias]
+"""
+
+import sys
+import tempfile
+import time
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.dados_sinteticos import gerar_snapshot
+from historico import HistoricoOcorrencias
+
+
+def main(n: int = 2000, dias: int = 2) -> None:
+    rng = np.random.default_rng(7)
+    inicio = datetime.now() - timedelta(days=dias + 8)
+    df = gerar_snapshot(n, agora=inicio)
+    proxima = int(df["Ocorrência"].max()) + 1
+
+    with tempfile.TemporaryDirectory() as pasta:
+        historico = HistoricoOcorrencias(
+            str(Path(pasta) / "historico.db"), compactar_a_cada=float("inf")
+        )
+        minutos = dias * 24 * 60
+        tempos = []
+        for m in range(minutos):
+            # ~1% das ocorrências muda por minuto e ~0,2% entra/sai
+            df = df.copy()
+            mudam = rng.random(len(df)) < 0.01
+            df.loc[mudam, "Técnicos"] = rng.integers(0, 3, mudam.sum(), dtype=np.int32)
+            saem = rng.random(len(df)) < 0.002
+            novas = gerar_snapshot(int(saem.sum()), seed=m, agora=inicio)
+            novas["Ocorrência"] = np.arange(proxima, proxima + len(novas))
+            proxima += len(novas)
+            df = pd.concat([df[~saem], novas], ignore_index=True)
+            t0 = time.perf_counter()
+            historico.registrar(df, inicio + timedelta(minutes=m))
+            tempos.append(time.perf_counter() - t0)
+
+        resumo = historico.resumo()
+        print(f"{minutos} snapshots de ~{n} ocorrências ({dias} dias, 1/min)")
+        print(
+            f"  gravar: mediana {1000 * np.median(tempos):.1f} ms, "
+            f"p95 {1000 * np.percentile(tempos, 95):.1f} ms por snapshot"
+        )
+        print(f"  {resumo['versoes']} versões, {resumo['tamanho_mb']} MB")
+
+        meio = inicio + timedelta(minutes=minutos // 2)
+        for nome, consulta in [
+            ("estado num instante", lambda: historico.estado_em(meio)),
+            (
+                "1 dia, 1 contrato",
+                lambda: historico.consultar(
+                    meio, meio + timedelta(days=1), contratos=["TEL_JI"]
+                ),
+            ),
+            (
+                "6 h, 2 ATs",
+                lambda: historico.consultar(
+                    meio, meio + timedelta(hours=6), ats=["TG", "SJ"]
+                ),
+            ),
+        ]:
+            t0 = time.perf_counter()
+            linhas = len(consulta())
+            ms = 1000 * (time.perf_counter() - t0)
+            print(f"  {nome}: {linhas} linhas em {ms:.1f} ms")
+
+        # Todo o período já passou do limite de detalhe (7 dias)
+        t0 = time.perf_counter()
+        resultado = historico.compactar()
+        print(
+            f"  compactação: {resultado} em {time.perf_counter() - t0:.1f} s -> "
+            f"{historico.resumo()['versoes']} versões, "
+            f"{historico.resumo()['tamanho_mb']} MB"
+        )
+        historico.engine.dispose()
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,100 @@
+"""Orçamento de importação do arranque, medido com `python -X importtime`.
+
+Importa num processo limpo os módulos de cada caminho do app.py e falha
+(código de saída 1) se a página de login voltar a puxar dependências pesadas
+ou se algum caminho passar do orçamento.
+
+Uso: python -m benchmarks.bench_importacao [orcamento_login_ms]
+"""
+
+import re
+import subprocess
+import sys
+
+# Módulos importados no topo do app.py (página de login)
+LOGIN = [
+    "perfil_importacao",
+    "streamlit",
+    "streamlit_cookies_controller",
+    "sqlalchemy",
+    "aprovacao",
+    "auth",
+    "database",
+    "feedback",
+    "log",
+    "sessao",
+]
+# Importados só depois do login
+PAINEL = [
+    "pandas",
+    "d1",
+    "cubos",
+    "exportacao",
+    "fetch",
+    "grade",
+    "historico",
+    "http_client",
+    "indice",
+    "ocorrencias",
+    "ofensores",
+    "poller",
+    "renderizador",
+    "share",
+]
+PROIBIDOS_NO_LOGIN = {"pandas", "numpy", "matplotlib", "PIL", "requests", "pyarrow"}
+
+_LINHA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def medir(modulos: list[str], ja_carregados: list[str] = ()) -> dict[str, tuple]:
+    """Roda `-X importtime` e devolve {módulo: (próprio_us, acumulado_us, nível)}."""
+    codigo = "".join(f"import {m}\n" for m in ja_carregados)
+    codigo += "import sys; sys.stderr.write('--inicio--\\n')\n"
+    codigo += "".join(f"import {m}\n" for m in modulos)
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    saida = saida.split("--inicio--", 1)[1]
+    resultado = {}
+    for proprio, acumulado, recuo, nome in _LINHA.findall(saida):
+        resultado[nome] = (int(proprio), int(acumulado), (len(recuo) - 1) // 2)
+    return resultado
+
+
+def total_ms(medicao: dict[str, tuple]) -> float:
+    return sum(acum for _, acum, nivel in medicao.values() if nivel == 0) / 1000
+
+
+def topo(medicao: dict[str, tuple], n: int = 8) -> list[tuple[str, float]]:
+    itens = sorted(medicao.items(), key=lambda i: i[1][1], reverse=True)
+    return [(nome, acum / 1000) for nome, (_, acum, _) in itens[:n]]
+
+
+def main(orcamento_login_ms: float = 2500) -> int:
+    falhas = []
+
+    login = medir(LOGIN)
+    print(f"login: {total_ms(login):.0f} ms (orçamento {orcamento_login_ms:.0f} ms)")
+    for nome, ms in topo(login):
+        print(f"  {ms:8.1f} ms  {nome}")
+    pesados = PROIBIDOS_NO_LOGIN & set(login)
+    if pesados:
+        falhas.append(f"a página de login importa {sorted(pesados)}")
+    if total_ms(login) > orcamento_login_ms:
+        falhas.append("a página de login passou do orçamento")
+
+    painel = medir(PAINEL, ja_carregados=LOGIN)
+    print(f"painel (após o login): {total_ms(painel):.0f} ms")
+    for nome, ms in topo(painel):
+        print(f"  {ms:8.1f} ms  {nome}")
+
+    for falha in falhas:
+        print(f"FALHA: {falha}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else 2500))
@@ -0,0 +1,138 @@
+"""Mede a tabela de logs do user.db antes e depois da retenção: gravar um
+lote, contar logs por hora (GROUP BY na tabela crua ou lendo `logs_hora`),
+buscar os últimos erros e o tamanho do ficheiro.
+
+Uso: python -m benchmarks.bench_logs [dias] [logs_por_dia]
+"""
+
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+from database import FilaEscrita, criar_engine
+from log import RetencaoLogs, _agora_utc, logs, logs_hora, somar_por_hora
+
+NIVEIS = np.array(["INFO", "WARNING", "ERROR"])
+
+
+def gerar_logs(n: int, inicio, fim, rng) -> list[dict]:
+    segundos = np.sort(rng.uniform(0, (fim - inicio).total_seconds(), n))
+    niveis = NIVEIS[rng.choice(3, n, p=[0.9, 0.08, 0.02])]
+    return [
+        {
+            "timestamp": inicio + timedelta(seconds=float(s)),
+            "level": str(nivel),
+            "message": f"Login realizado com sucesso: utilizador{i % 300}",
+        }
+        for i, (s, nivel) in enumerate(zip(segundos, niveis))
+    ]
+
+
+def medir(funcao, repeticoes: int = 5) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor * 1000
+
+
+def tamanho_mb(caminho: Path) -> float:
+    arquivos = caminho.parent.glob(caminho.name + "*")
+    return sum(p.stat().st_size for p in arquivos) / 1024 / 1024
+
+
+def main(dias: int = 180, por_dia: int = 5_000) -> None:
+    rng = np.random.default_rng(3)
+    agora = _agora_utc()
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = Path(pasta) / "user.db"
+        engine = criar_engine(str(caminho))
+        escritor = FilaEscrita(sessionmaker(bind=engine))
+        # Como um user.db de uma versão anterior: logs sem índice nem rollup
+        logs.create(engine)
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_logs_timestamp_level"))
+            registros = gerar_logs(
+                dias * por_dia, agora - timedelta(days=dias), agora, rng
+            )
+            conn.execute(insert(logs), registros)
+
+        desde = agora - timedelta(hours=48)
+        hora = func.strftime("%Y-%m-%d %H", logs.c.timestamp)
+        por_hora_cru = (
+            select(hora, logs.c.level, func.count())
+            .where(logs.c.timestamp >= desde)
+            .group_by(hora, logs.c.level)
+        )
+        ultimos_erros = (
+            select(logs.c.timestamp, logs.c.message)
+            .where(logs.c.level.in_(["WARNING", "ERROR"]))
+            .order_by(logs.c.timestamp.desc())
+            .limit(20)
+        )
+        por_hora_rollup = select(logs_hora).where(logs_hora.c.hora >= desde)
+
+        def consultar(consulta):
+            with engine.connect() as conn:
+                return conn.execute(consulta).all()
+
+        def gravar_lote(com_rollup: bool):
+            lote = gerar_logs(200, agora, agora + timedelta(seconds=1), rng)
+
+            def operacao(db):
+                db.execute(insert(logs), lote)
+                if com_rollup:
+                    somar_por_hora(db, lote)
+
+            escritor.executar(operacao)
+
+        print(f"{dias * por_dia} logs em {dias} dias, {tamanho_mb(caminho):.1f} MB")
+        print(
+            f"  antes:  lote de 200 {medir(lambda: gravar_lote(False)):6.1f} ms | "
+            f"por hora (48 h) {medir(lambda: consultar(por_hora_cru)):7.1f} ms | "
+            f"últimos erros {medir(lambda: consultar(ultimos_erros)):6.1f} ms"
+        )
+
+        retencao = RetencaoLogs(engine, escritor, retencao_dias=30)
+        t0 = time.perf_counter()
+        retencao.preparar()
+        t_preparar = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        resultado = retencao.aplicar(agora)
+        t_aplicar = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        retencao.compactar()
+        t_compactar = time.perf_counter() - t0
+        print(
+            f"  preparar (índice + rollup) {t_preparar:.1f} s | "
+            f"retenção {resultado} em {t_aplicar:.1f} s | "
+            f"VACUUM inicial (admin) {t_compactar:.1f} s"
+        )
+        print(f"  {tamanho_mb(caminho):.1f} MB depois da retenção")
+        print(
+            f"  depois: lote de 200 {medir(lambda: gravar_lote(True)):6.1f} ms | "
+            f"por hora (48 h) {medir(lambda: consultar(por_hora_cru)):7.1f} ms, "
+            f"no rollup {medir(lambda: consultar(por_hora_rollup)):5.1f} ms | "
+            f"últimos erros {medir(lambda: consultar(ultimos_erros)):6.1f} ms"
+        )
+
+        # Uma rodada de rotina: só a última hora passou da retenção
+        t0 = time.perf_counter()
+        resultado = retencao.aplicar(agora + timedelta(hours=1))
+        print(
+            f"  rodada horária seguinte: {resultado} em "
+            f"{(time.perf_counter() - t0) * 1000:.0f} ms"
+        )
+        print(f"  {retencao.resumo()}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,162 @@
+"""Compara a memória do snapshot no esquema em texto (legado) com o esquema
+compacto de ocorrencias.aplicar_tipos, do payload da API ao snapshot
+processado.
+
+Uso: python -m benchmarks.bench_memoria
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_sla import processar_legado
+from benchmarks.dados_sinteticos import ATS, CONTRATOS
+from ocorrencias import normalizar_ocorrencias
+from sla import formatar_exibicao, processar_dados
+
+
+def gerar_payload(n: int, seed: int = 42) -> list[dict]:
+    """Ocorrências como vêm no JSON da API."""
+    rng = np.random.default_rng(seed)
+    agora = datetime.now()
+    cidades = ["SAO JOSE DOS CAMPOS", "TAUBATE", "CARAGUATATUBA", "UBATUBA"]
+    return [
+        {
+            "ocorrencia": 1_000_000 + i,
+            "data_abertura": (
+                agora - timedelta(seconds=int(rng.exponential(8 * 3600)))
+            ).strftime("%Y-%m-%dT%H:%M:%S"),
+            "contrato": str(rng.choice(CONTRATOS)),
+            "cnl": f"{rng.integers(12000, 12100)}",
+            "at": f"{rng.choice(ATS)}-{rng.integers(1, 99):02d}",
+            "afetacao": int(rng.integers(0, 300)),
+            "vip": bool(rng.random() > 0.9),
+            "cond_alto_valor": bool(rng.random() > 0.85),
+            "b2b_avancado": bool(rng.random() > 0.8),
+            "tecnicos": [{"matricula": "T1"}] * int(rng.integers(0, 3)),
+            "origem": str(rng.choice(["GPON", "METALICO", "CABO"])),
+            "cabo": f"CB{rng.integers(0, 97):03d}",
+            "primarias": int(rng.integers(1, 20)),
+            "bd": f"BD{rng.integers(0, 40):02d}",
+            "propenso_anatel": int(rng.integers(0, 3)),
+            "reclamado_anatel": int(rng.integers(0, 3)),
+            "reincidencia": None if rng.random() > 0.3 else int(rng.integers(1, 4)),
+            "equipamentos": [f"CB{i % 97:03d}/P{i % 13}"],
+            "municipio": str(rng.choice(cidades)),
+        }
+        for i in range(n)
+    ]
+
+
+def normalizar_legado(df_api: pd.DataFrame) -> pd.DataFrame:
+    """Cópia fiel do normalizar_ocorrencias em texto (SIM/NÃO, "" e object)."""
+    df_api["ocorrencia"] = df_api["ocorrencia"].astype(int)
+    df_api = df_api.drop_duplicates(subset=["ocorrencia"], keep="last")
+    df_api = df_api.rename(
+        columns={
+            "ocorrencia": "Ocorrência",
+            "data_abertura": "Abertura",
+            "contrato": "Contrato",
+            "cnl": "CNL",
+            "at": "AT",
+            "afetacao": "Afetação",
+            "vip": "VIP",
+            "cond_alto_valor": "Cond. Alto Valor",
+            "b2b_avancado": "B2B",
+            "tecnicos": "Técnicos",
+            "origem": "Origem",
+            "cabo": "Cabo",
+            "primarias": "Primárias",
+            "bd": "BD",
+            "propenso_anatel": "Propensos - Anatel",
+            "reclamado_anatel": "Reclamados - Anatel",
+            "reincidencia": "Reincidência",
+            "municipio": "Cidade_Real",
+        }
+    )
+
+    def format_reinc(x):
+        if pd.isna(x) or str(x).strip() in ["", "nan", "None"]:
+            return ""
+        return str(int(float(x)))
+
+    df_api["Reincidência"] = df_api["Reincidência"].apply(format_reinc)
+    df_api["Cabo/Primária"] = df_api["equipamentos"].apply(
+        lambda x: str(x[0]).strip() if isinstance(x, list) and len(x) > 0 else "-"
+    )
+    df_api["Abertura_dt"] = pd.to_datetime(df_api["Abertura"], errors="coerce")
+    df_api["Técnicos"] = df_api["Técnicos"].apply(
+        lambda x: len(x) if isinstance(x, list) else 0
+    )
+    df_api["Afetação"] = (
+        pd.to_numeric(df_api["Afetação"], errors="coerce").fillna(0).astype(int)
+    )
+
+    def formatar_flag(val):
+        if pd.isna(val):
+            return "NÃO"
+        s = str(val).upper().strip()
+        if s in ["TRUE", "SIM", "S", "YES"]:
+            return "SIM"
+        try:
+            return "SIM" if float(val) > 0 else "NÃO"
+        except (TypeError, ValueError):
+            return "NÃO"
+
+    for col in ["VIP", "Cond. Alto Valor", "B2B"]:
+        df_api[col] = df_api[col].apply(formatar_flag)
+    return df_api
+
+
+def processar_dados_legado(df_raw: pd.DataFrame, agora: datetime) -> pd.DataFrame:
+    df = df_raw.copy()
+    df["Contrato_Padrao"] = df["Contrato"].astype(str).str.strip().str.upper()
+    df = processar_legado(df, agora)
+    return df.sort_values("horas_float", ascending=False)
+
+
+def mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
+
+if __name__ == "__main__":
+    agora = datetime.now()
+    for n in (10_000, 100_000):
+        payload = gerar_payload(n)
+
+        t0 = time.perf_counter()
+        bruto_legado = normalizar_legado(pd.DataFrame(payload))
+        proc_legado = processar_dados_legado(bruto_legado, agora)
+        t_legado = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        bruto = normalizar_ocorrencias(pd.DataFrame(payload))
+        proc = processar_dados(bruto, [], agora=agora)
+        t_novo = time.perf_counter() - t0
+
+        # Mesma tela: o texto formatado do esquema novo bate com o legado
+        colunas = [
+            c
+            for c in proc_legado.columns
+            if c in proc.columns and c != "Abertura" or c == "Horas Corridas"
+        ]
+        pd.testing.assert_frame_equal(
+            proc_legado[colunas].astype(str).reset_index(drop=True),
+            formatar_exibicao(proc, colunas).astype(str).reset_index(drop=True),
+        )
+
+        print(f"{n:>7} ocorrências")
+        print(
+            f"  snapshot bruto:      texto {mb(bruto_legado):7.1f} MB | "
+            f"tipado {mb(bruto):6.1f} MB | {mb(bruto_legado) / mb(bruto):4.1f}x"
+        )
+        print(
+            f"  snapshot processado: texto {mb(proc_legado):7.1f} MB | "
+            f"tipado {mb(proc):6.1f} MB | {mb(proc_legado) / mb(proc):4.1f}x"
+        )
+        print(
+            f"  normalizar + processar: texto {t_legado * 1000:7.1f} ms | "
+            f"tipado {t_novo * 1000:6.1f} ms"
+        )
@@ -0,0 +1,116 @@
+"""Compara o ranking de ofensores em loop sobre o JSON (legado) com a
+TabelaOfensores colunar e o índice invertido por AT, e mede o recorte local
+de todas as posições do slider de range a partir de uma única carga.
+
+Uso: python -m benchmarks.bench_ofensores [primarias]
+"""
+
+import sys
+import time
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from ofensores import LIMITE_RANKING, RANGE_MAXIMO, TabelaOfensores
+
+FILTROS = [None, ["SJ"], ["SJ", "TT"], ["PN", "TG", "CP", "MK"], ["XX"]]
+
+
+def gerar_payload(n: int, seed: int = 11, agora: datetime | None = None) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    agora = agora or datetime.now()
+    ats = [f"A{i:02d}" for i in range(60)] + ["SJ", "TT", "PN", "TG", "CP", "MK"]
+    payload = []
+    for p in range(n):
+        at = ats[rng.integers(len(ats))]
+        qtd = int(rng.integers(1, 12))
+        payload.append(
+            {
+                "primaria": f"P{p:05d}",
+                "count": qtd,
+                "ocorrencias": [
+                    {
+                        "id_ocorrencia": 10_000_000 + p * 20 + j,
+                        "at": at,
+                        "municipio": "X",
+                        "data_ocorrencia": (
+                            agora - timedelta(days=float(rng.uniform(0, RANGE_MAXIMO)))
+                        ).strftime("%Y-%m-%dT%H:%M:%S"),
+                    }
+                    for j in range(qtd)
+                ],
+            }
+        )
+    return payload
+
+
+def processar_legado(dados_json, at_sel=None) -> pd.DataFrame:
+    """Cópia do processar_json_ofensores que existia no app.py."""
+    linhas = []
+    for item in dados_json:
+        if at_sel is not None and isinstance(at_sel, list) and at_sel != [""]:
+            if item.get("ocorrencias")[0].get("at") not in at_sel:
+                continue
+        linhas.append(
+            {
+                "Primária": item.get("primaria", ""),
+                "Município": item.get("ocorrencias")[0].get("municipio", ""),
+                "Volume (Falhas)": item.get("count", 0),
+                "Ocorrências": ", ".join(
+                    [str(d.get("id_ocorrencia")) for d in item.get("ocorrencias", [])]
+                ),
+            }
+        )
+    if linhas:
+        return pd.DataFrame(linhas).sort_values(by="Volume (Falhas)", ascending=False)
+    return pd.DataFrame()
+
+
+def main(n: int = 20_000) -> None:
+    agora = datetime.now()
+    payload = gerar_payload(n, agora=agora)
+    print(f"{n} primárias, {sum(len(i['ocorrencias']) for i in payload)} ocorrências")
+
+    inicio = time.perf_counter()
+    tabela = TabelaOfensores.construir(payload, agora)
+    t_construcao = time.perf_counter() - inicio
+    print(f"  construção (uma vez por carga): {1000 * t_construcao:.1f} ms")
+
+    for filtro in FILTROS:
+        inicio = time.perf_counter()
+        legado = processar_legado(payload, filtro)
+        t_leg = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        novo = tabela.ranking(filtro, LIMITE_RANKING)
+        t_novo = time.perf_counter() - inicio
+
+        # Empates podem sair em outra ordem no legado (sort instável)
+        if len(legado):
+            esperado = legado["Volume (Falhas)"].to_numpy()[:LIMITE_RANKING]
+            assert (novo["Volume (Falhas)"].to_numpy() == esperado).all()
+            assert tabela.total(filtro) == len(legado)
+        else:
+            assert novo.empty
+        print(
+            f"  filtro {filtro}: legado {1000 * t_leg:7.1f} ms | "
+            f"índice {1000 * t_novo:6.2f} ms ({t_leg / t_novo:.0f}x)"
+        )
+
+    # Slider de 5 em 5 dias: antes, cada posição era uma chamada à API
+    ranges = list(range(5, RANGE_MAXIMO + 1, 5))
+    for rodada in ("primeira passada", "em cache"):
+        inicio = time.perf_counter()
+        for dias in ranges:
+            tabela.ranking(["SJ"], LIMITE_RANKING, dias)
+        t_ranges = time.perf_counter() - inicio
+        print(
+            f"  {len(ranges)} ranges ({rodada}): {1000 * t_ranges:.1f} ms, "
+            f"{1000 * t_ranges / len(ranges):.2f} ms por movimento do slider"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
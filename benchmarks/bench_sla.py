@@ -0,0 +1,111 @@
+"""Compara o cálculo de SLA linha a linha (legado) com o motor colunar de sla.py.
+
+Uso: python -m benchmarks.bench_sla
+"""
+
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.dados_sinteticos import gerar_snapshot
+from sla import ATS_LITORAL, aplicar_sla, formatar_exibicao
+
+
+def processar_legado(df: pd.DataFrame, agora: datetime) -> pd.DataFrame:
+    """Cópia fiel da implementação com df.apply(axis=1) de processar_dados."""
+    df["diff_s"] = (agora - df["Abertura_dt"]).dt.total_seconds().clip(lower=0)
+    df["horas_float"] = df["diff_s"] / 3600
+
+    def formatar_hms(s):
+        val = int(s) if pd.notna(s) else 0
+        m, s_res = divmod(val, 60)
+        h, m_res = divmod(m, 60)
+        return f"{int(h):02d}:{int(m_res):02d}:{int(s_res):02d}"
+
+    df["Horas Corridas"] = df["diff_s"].apply(formatar_hms)
+
+    def calc_sla_status(row):
+        h = row["horas_float"]
+        is_b2b = str(row.get("B2B", "NÃO")).upper() == "SIM"
+        limite_fora = 4 if is_b2b else 8
+        if h > 24:
+            return "Crítico"
+        elif h > limite_fora:
+            return "Fora do Prazo"
+        else:
+            return "No Prazo"
+
+    df["Status SLA"] = df.apply(calc_sla_status, axis=1)
+
+    def calc_criticidade_eps(row):
+        h = row["horas_float"]
+        if h >= 7:
+            return "🚨 E-MAIL(EPS)"
+        elif h >= 6:
+            return "🟠 GERÊNCIA(EPS)"
+        elif h >= 4:
+            return "🟡 COORDENADOR (EPS)"
+        else:
+            return "🟢 SUPERVISOR (EPS)"
+
+    df["Criticidade EPS"] = df.apply(calc_criticidade_eps, axis=1)
+
+    def def_area(row):
+        if str(row["Contrato_Padrao"]) == "ABILITY_SJ" and pd.notna(row.get("AT")):
+            return (
+                "Litoral"
+                if str(row["AT"]).split("-")[0].strip().upper() in ATS_LITORAL
+                else "Vale"
+            )
+        return "Geral"
+
+    df["Area"] = df.apply(def_area, axis=1)
+    return df
+
+
+# Colunas calculadas, comparadas como texto de tela
+COLUNAS_SLA = [
+    "diff_s",
+    "horas_float",
+    "Horas Corridas",
+    "Status SLA",
+    "Criticidade EPS",
+    "Area",
+]
+
+
+def preparar(n: int) -> pd.DataFrame:
+    df = gerar_snapshot(n)
+    df["Contrato_Padrao"] = df["Contrato"].astype(str).str.strip().str.upper()
+    df["Abertura_dt"] = df["Abertura"]
+    return df
+
+
+def medir(func, df: pd.DataFrame, agora: datetime, repeticoes: int = 3):
+    melhor, resultado = float("inf"), None
+    for _ in range(repeticoes):
+        copia = df.copy()
+        t0 = time.perf_counter()
+        resultado = func(copia, agora)
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor, resultado
+
+
+if __name__ == "__main__":
+    agora = datetime.now().replace(tzinfo=None)
+    for n in (10_000, 100_000):
+        df = preparar(n)
+        # O legado espera o esquema em texto (SIM/NÃO) de antes dos tipos
+        legado = formatar_exibicao(df, df.columns)
+        t_legado, r_legado = medir(processar_legado, legado, agora, repeticoes=1)
+        t_novo, r_novo = medir(aplicar_sla, df, agora)
+        pd.testing.assert_frame_equal(
+            r_legado[COLUNAS_SLA],
+            formatar_exibicao(r_novo, COLUNAS_SLA),
+            check_dtype=False,
+        )
+        print(
+            f"{n:>7} ocorrências | legado {t_legado * 1000:9.1f} ms | "
+            f"colunar {t_novo * 1000:7.1f} ms | {t_legado / t_novo:6.1f}x"
+        )
@@ -0,0 +1,102 @@
+"""Contenção de escrita no SQLite: configuração antiga vs WAL + fila de escrita.
+
+Simula várias sessões do Streamlit gravando logs/feedback ao mesmo tempo
+enquanto outras leem, e conta erros "database is locked" e vazão.
+
+Uso: python -m benchmarks.bench_sqlite [sessoes] [escritas_por_sessao]
+"""
+
+import sys
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, FilaEscrita, Log, criar_engine
+
+
+def engine_legado(caminho: Path):
+    engine = create_engine(f"sqlite:///{caminho}")
+
+    @event.listens_for(engine, "connect")
+    def pragmas_padrao(dbapi_connection, connection_record):
+        # Desfaz o listener global de database.py: valores padrão do SQLite
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=DELETE")
+        cursor.execute("PRAGMA synchronous=FULL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+    return engine
+
+
+def simular(engine, escrever, sessoes: int, escritas: int) -> dict:
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    erros, latencias = [], []
+    lock = threading.Lock()
+
+    def sessao(i: int):
+        for j in range(escritas):
+            t0 = time.perf_counter()
+            try:
+                escrever(Session, {"level": "INFO", "message": f"sessao {i} #{j}"})
+                # Leitura concorrente, como o painel de aprovação faz a cada rerun
+                with Session() as db:
+                    db.execute(select(func.count(Log.id_log))).scalar()
+            except OperationalError as e:
+                with lock:
+                    erros.append(str(e.orig))
+            with lock:
+                latencias.append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=sessao, args=(i,)) for i in range(sessoes)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - inicio
+
+    with Session() as db:
+        gravados = db.execute(select(func.count(Log.id_log))).scalar()
+    latencias.sort()
+    return {
+        "gravados": gravados,
+        "erros": len(erros),
+        "locked": sum("locked" in e for e in erros),
+        "escritas/s": round(gravados / total),
+        "p95 (ms)": round(1000 * latencias[int(len(latencias) * 0.95) - 1]),
+    }
+
+
+def escrever_direto(Session, registro):
+    with Session() as db:
+        db.execute(insert(Log), [registro])
+        db.commit()
+
+
+if __name__ == "__main__":
+    sessoes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    escritas = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    with tempfile.TemporaryDirectory() as tmp:
+        legado = simular(
+            engine_legado(Path(tmp) / "legado.db"), escrever_direto, sessoes, escritas
+        )
+
+        engine = criar_engine(str(Path(tmp) / "wal.db"))
+        escritor = FilaEscrita(sessionmaker(bind=engine, expire_on_commit=False))
+
+        def escrever_fila(Session, registro):
+            escritor.executar(lambda db: db.execute(insert(Log), [registro]))
+
+        novo = simular(engine, escrever_fila, sessoes, escritas)
+
+    print(f"{sessoes} sessões x {escritas} escritas")
+    for nome, r in (("legado", legado), ("WAL + fila", novo)):
+        print(f"{nome:>11}: " + " | ".join(f"{k} {v}" for k, v in r.items()))
@@ -0,0 +1,81 @@
+"""Compara util.oc_vencida chamada registro a registro (legado) com o lote
+util.oc_vencidas sobre arrays datetime64.
+
+Uso: python -m benchmarks.bench_vencida [registros]
+"""
+
+import sys
+import time
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from util import oc_vencida, oc_vencidas
+
+
+def oc_vencida_legado(start: str, end: str, limit: int = 8) -> dict:
+    """Cópia da implementação escalar com datetime.fromisoformat."""
+    d_start = datetime.fromisoformat(start)
+    d_end = datetime.fromisoformat(end)
+    total_hour = (d_end - d_start).total_seconds() / 3600
+    return {"duration": round(total_hour, 2), "expired": total_hour > limit}
+
+
+def gerar_registros(n: int, seed: int = 5) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    base = datetime(2026, 8, 5)
+    inicios = rng.uniform(0, 86_400, n)
+    duracoes = rng.exponential(6 * 3600, n)
+    return [
+        {
+            "data_ocorrencia": (base + timedelta(seconds=int(i))).isoformat(),
+            "data_ocorrencia_final": (
+                base + timedelta(seconds=int(i) + int(d))
+            ).isoformat(),
+            "limite": 4 if j % 5 == 0 else 8,
+        }
+        for j, (i, d) in enumerate(zip(inicios, duracoes))
+    ]
+
+
+def main(n: int = 100_000) -> None:
+    registros = gerar_registros(n)
+
+    inicio = time.perf_counter()
+    legado = [
+        oc_vencida_legado(r["data_ocorrencia"], r["data_ocorrencia_final"], r["limite"])
+        for r in registros
+    ]
+    t_legado = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for r, esperado in zip(registros[:1000], legado):
+        obtido = oc_vencida(
+            r["data_ocorrencia"], r["data_ocorrencia_final"], r["limite"]
+        )
+        assert obtido == esperado
+    t_wrapper = (time.perf_counter() - inicio) * n / 1000
+
+    # colunas extraídas do JSON antes de medir, como faz um DataFrame
+    inicios = [r["data_ocorrencia"] for r in registros]
+    fins = [r["data_ocorrencia_final"] for r in registros]
+    limites = np.array([r["limite"] for r in registros])
+    inicio = time.perf_counter()
+    horas, vencidas = oc_vencidas(inicios, fins, limites)
+    t_lote = time.perf_counter() - inicio
+
+    # o legado arredonda a 2 casas; o lote devolve a duração exata
+    assert np.allclose(horas, [x["duration"] for x in legado], atol=0.005)
+    assert (vencidas == [x["expired"] for x in legado]).all()
+    print(f"{n} registros:")
+    print(f"  loop com fromisoformat (legado): {1000 * t_legado:8.1f} ms")
+    print(f"  loop com o wrapper (estimado):   {1000 * t_wrapper:8.1f} ms")
+    print(
+        f"  oc_vencidas em lote:             {1000 * t_lote:8.1f} ms "
+        f"({t_legado / t_lote:.0f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,52 @@
+"""Geração de snapshots sintéticos da API de ocorrências para os benchmarks."""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from ocorrencias import aplicar_tipos
+
+CONTRATOS = [
+    "ABILITY_SJ",
+    "ABILITY_OS",
+    "TEL_INTERIOR",
+    "TEL_JI",
+    "TEL_PC_SC",
+    "TELEMONT",
+]
+ATS = ["TG", "PG", "SJ", "JI", "TT", "CP", "MK", "PN", "BV", "GR", "LZ", "CA"]
+
+
+def gerar_snapshot(
+    n: int, seed: int = 42, agora: datetime | None = None
+) -> pd.DataFrame:
+    """Snapshot já normalizado (colunas e tipos como saem de carregar_dados_api)."""
+    rng = np.random.default_rng(seed)
+    agora = agora or datetime.now()
+    idade_s = rng.exponential(scale=8 * 3600, size=n).astype(int)
+    abertura = [
+        (agora - timedelta(seconds=int(s))).strftime("%Y-%m-%dT%H:%M:%S")
+        for s in idade_s
+    ]
+    sim_nao = np.array(["SIM", "NÃO"], dtype=object)
+    df = pd.DataFrame(
+        {
+            "Ocorrência": np.arange(1_000_000, 1_000_000 + n),
+            "Abertura": abertura,
+            "Contrato": rng.choice(CONTRATOS, size=n),
+            "AT": [
+                f"{at}-{rng.integers(1, 99):02d}" if rng.random() > 0.02 else None
+                for at in rng.choice(ATS, size=n)
+            ],
+            "Afetação": rng.integers(0, 300, size=n),
+            "VIP": sim_nao[(rng.random(n) > 0.9).astype(int) ^ 1],
+            "Cond. Alto Valor": sim_nao[(rng.random(n) > 0.85).astype(int) ^ 1],
+            "B2B": sim_nao[(rng.random(n) > 0.8).astype(int) ^ 1],
+            "Técnicos": rng.integers(0, 3, size=n),
+            "Origem": rng.choice(["GPON", "METALICO", "CABO"], size=n),
+            "Reincidência": rng.choice(["", "1", "2"], size=n),
+            "Cabo/Primária": [f"CB{i % 97:03d}/P{i % 13}" for i in range(n)],
+        }
+    )
+    return aplicar_tipos(df)
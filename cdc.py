@@ -0,0 +1,143 @@
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from sla import calcular_status_sla, flag_sim
+
+CHAVE = "Ocorrência"
+
+# Colunas de conteúdo que definem se uma ocorrência mudou entre snapshots
+COLUNAS_HASH = [
+    "Abertura",
+    "Contrato",
+    "CNL",
+    "AT",
+    "Afetação",
+    "VIP",
+    "Cond. Alto Valor",
+    "B2B",
+    "Técnicos",
+    "Origem",
+    "Cabo",
+    "Primárias",
+    "BD",
+    "Propensos - Anatel",
+    "Reclamados - Anatel",
+    "Reincidência",
+    "Cabo/Primária",
+    "Cidade_Real",
+]
+
+# Colunas acompanhadas individualmente e o tipo de evento que emitem
+COLUNAS_EVENTO = {"Técnicos": "tecnicos", "Afetação": "afetacao"}
+
+
+@dataclass(frozen=True)
+class Evento:
+    tipo: str  # nova | encerrada | tecnicos | afetacao | sla
+    ocorrencia: int
+    antes: object = None
+    depois: object = None
+
+
+def calcular_hashes(df: pd.DataFrame) -> pd.Series | None:
+    """Hash de conteúdo por ocorrência (índice = Ocorrência)."""
+    if df is None or CHAVE not in df.columns:
+        return None
+    cols = [c for c in COLUNAS_HASH if c in df.columns]
+    hashes = pd.util.hash_pandas_object(df[cols], index=False)
+    return pd.Series(hashes.to_numpy(), index=pd.Index(df[CHAVE], name=CHAVE))
+
+
+def _status_sla(df: pd.DataFrame, em: datetime) -> np.ndarray:
+    if em.tzinfo is not None:
+        em = em.astimezone().replace(tzinfo=None)
+    abertura = pd.to_datetime(df["Abertura"], errors="coerce").dt.tz_localize(None)
+    horas = ((em - abertura).dt.total_seconds().clip(lower=0) / 3600).to_numpy()
+    return calcular_status_sla(horas, flag_sim(df, "B2B"))
+
+
+@dataclass(frozen=True)
+class DiffSnapshot:
+    """Diferenças entre dois snapshots consecutivos, unidos por Ocorrência."""
+
+    novas: pd.Index
+    encerradas: pd.Index
+    alteradas: pd.Index
+    mudancas: dict[str, pd.DataFrame]  # tipo -> DataFrame(antes, depois)
+
+    def mesmo_conteudo(self) -> bool:
+        """Nenhuma ocorrência entrou, saiu ou mudou: só o relógio andou."""
+        return not (len(self.novas) or len(self.encerradas) or len(self.alteradas))
+
+    def vazio(self) -> bool:
+        return not (
+            len(self.novas)
+            or len(self.encerradas)
+            or any(len(m) for m in self.mudancas.values())
+        )
+
+    def resumo(self) -> dict[str, int]:
+        resumo = {"nova": len(self.novas), "encerrada": len(self.encerradas)}
+        resumo.update({tipo: len(m) for tipo, m in self.mudancas.items()})
+        return resumo
+
+    def eventos(self) -> Iterator[Evento]:
+        for oc in self.novas:
+            yield Evento("nova", int(oc))
+        for oc in self.encerradas:
+            yield Evento("encerrada", int(oc))
+        for tipo, mudancas in self.mudancas.items():
+            for oc, antes, depois in mudancas.itertuples():
+                yield Evento(tipo, int(oc), antes, depois)
+
+
+def comparar_snapshots(
+    df_anterior: pd.DataFrame,
+    hash_anterior: pd.Series,
+    em_anterior: datetime,
+    df_atual: pd.DataFrame,
+    hash_atual: pd.Series,
+    em_atual: datetime,
+) -> DiffSnapshot:
+    """Compara dois snapshots e separa o que entrou, saiu e mudou.
+
+    Só as ocorrências com hash diferente têm as colunas comparadas; a
+    transição de SLA, que depende apenas do relógio, é calculada de forma
+    vetorizada para as ocorrências presentes nos dois snapshots.
+    """
+    novas = hash_atual.index.difference(hash_anterior.index)
+    encerradas = hash_anterior.index.difference(hash_atual.index)
+    comuns = hash_atual.index.intersection(hash_anterior.index)
+    alteradas = comuns[
+        hash_anterior.loc[comuns].to_numpy() != hash_atual.loc[comuns].to_numpy()
+    ]
+
+    antes = df_anterior.set_index(CHAVE)
+    depois = df_atual.set_index(CHAVE)
+
+    mudancas = {}
+    for coluna, tipo in COLUNAS_EVENTO.items():
+        if coluna not in antes.columns or coluna not in depois.columns:
+            continue
+        a = antes.loc[alteradas, coluna]
+        d = depois.loc[alteradas, coluna]
+        diferente = a.to_numpy() != d.to_numpy()
+        mudancas[tipo] = pd.DataFrame(
+            {"antes": a[diferente].to_numpy(), "depois": d[diferente].to_numpy()},
+            index=alteradas[diferente],
+        )
+
+    if "Abertura" in antes.columns and "Abertura" in depois.columns:
+        sla_antes = _status_sla(antes.loc[comuns], em_anterior)
+        sla_depois = _status_sla(depois.loc[comuns], em_atual)
+        diferente = sla_antes != sla_depois
+        mudancas["sla"] = pd.DataFrame(
+            {"antes": sla_antes[diferente], "depois": sla_depois[diferente]},
+            index=comuns[diferente],
+        )
+
+    return DiffSnapshot(novas, encerradas, alteradas, mudancas)
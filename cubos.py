@@ -0,0 +1,256 @@
+import threading
+
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from loguru import logger
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Engine,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    and_,
+    delete,
+    func,
+    select,
+)
+from sqlalchemy.dialects.sqlite import insert
+
+from database import FilaEscrita
+from sla import MEDIDAS_SLA, medidas_sla, sigla_at
+
+# Indicador do painel -> coluna dos cubos
+COLUNAS_MEDIDAS = dict(
+    zip(
+        MEDIDAS_SLA,
+        (
+            "total",
+            "no_prazo",
+            "fora_prazo",
+            "grande_vulto",
+            "vip",
+            "alto_valor",
+            "b2b",
+            "critico",
+            "sem_tecnico",
+        ),
+    )
+)
+# Dimensão exposta -> coluna dos cubos
+DIMENSOES = {"Contrato": "contrato", "Area": "area", "AT": "sigla_at"}
+# Resolução -> quantos dias de cubo são mantidos
+RETENCAO_DIAS = {"hora": 35, "dia": 730}
+
+metadata = MetaData()
+
+
+def _tabela_cubo(nome: str) -> Table:
+    return Table(
+        nome,
+        metadata,
+        Column("periodo", DateTime, primary_key=True),
+        *[Column(d, String, primary_key=True) for d in DIMENSOES.values()],
+        *[
+            Column(c, Integer, nullable=False, default=0)
+            for c in COLUNAS_MEDIDAS.values()
+        ],
+    )
+
+
+# Somas dos indicadores em todos os snapshots do período, por grupo
+CUBOS = {"hora": _tabela_cubo("sla_hora"), "dia": _tabela_cubo("sla_dia")}
+# Quantos snapshots entraram em cada período: divide as somas em médias
+periodos = Table(
+    "sla_periodos",
+    metadata,
+    Column("resolucao", String, primary_key=True),
+    Column("periodo", DateTime, primary_key=True),
+    Column("snapshots", Integer, nullable=False),
+    Column("ultimo", DateTime, nullable=False),
+)
+
+
+def _inicio_periodo(em: datetime, resolucao: str) -> datetime:
+    if resolucao == "hora":
+        return em.replace(minute=0, second=0, microsecond=0)
+    return em.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class CubosSLA:
+    """Rollups por hora e por dia dos indicadores de SLA do painel gerencial.
+
+    Cada snapshot processado (`processar_dados` na hora da coleta) é
+    resumido por (contrato, área, AT) com `medidas_sla` e somado com upsert
+    nos cubos `sla_hora` e `sla_dia`; `sla_periodos` conta os snapshots de
+    cada período. A consulta devolve a média de ocorrências em aberto por
+    período, lendo só as linhas agregadas pela chave primária.
+    """
+
+    def __init__(self, engine: Engine, escritor: FilaEscrita):
+        self.engine = engine
+        self.escritor = escritor
+        metadata.create_all(engine)
+        self._lock = threading.Lock()
+        with engine.connect() as conn:
+            self._ultimo = conn.execute(select(func.max(periodos.c.ultimo))).scalar()
+        self._dia_retencao = None
+        # Consultas desde o último snapshot somado; o registrar as descarta
+        self._consultas: dict[tuple, pd.DataFrame] = {}
+
+    def registrar(self, df: pd.DataFrame, em: datetime) -> int:
+        """Soma um snapshot nos cubos; devolve quantos grupos foram tocados.
+
+        `df` é o snapshot já processado por `processar_dados` (o mesmo que o
+        IndiceSnapshot guarda), com as horas contadas até `em`.
+        """
+        if em.tzinfo is not None:
+            em = em.astimezone().replace(tzinfo=None)
+        with self._lock:
+            # Um snapshot já somado (ex.: reinício do processo) não entra de novo
+            if self._ultimo is not None and em <= self._ultimo:
+                return 0
+            chaves = [
+                df["Contrato_Padrao"].rename("contrato"),
+                df["Area"].rename("area"),
+                sigla_at(df["AT"]).rename("sigla_at"),
+            ]
+            grupos = (
+                medidas_sla(df)
+                .rename(columns=COLUNAS_MEDIDAS)
+                .groupby(chaves)
+                .sum()
+                .reset_index()
+                .to_dict("records")
+            )
+            self.escritor.executar(lambda db: self._somar(db, grupos, em))
+            self._ultimo = em
+            self._consultas = {}
+            if em.date() != self._dia_retencao:
+                self._dia_retencao = em.date()
+                self.aplicar_retencao(em)
+        return len(grupos)
+
+    def _somar(self, db, grupos: list[dict], em: datetime) -> None:
+        for resolucao, cubo in CUBOS.items():
+            periodo = _inicio_periodo(em, resolucao)
+            if grupos:
+                comando = insert(cubo)
+                db.execute(
+                    comando.on_conflict_do_update(
+                        index_elements=[cubo.c.periodo, *DIMENSOES.values()],
+                        set_={
+                            c: cubo.c[c] + comando.excluded[c]
+                            for c in COLUNAS_MEDIDAS.values()
+                        },
+                    ),
+                    [{**g, "periodo": periodo} for g in grupos],
+                )
+            comando = insert(periodos).values(
+                resolucao=resolucao, periodo=periodo, snapshots=1, ultimo=em
+            )
+            db.execute(
+                comando.on_conflict_do_update(
+                    index_elements=[periodos.c.resolucao, periodos.c.periodo],
+                    set_={
+                        "snapshots": periodos.c.snapshots + 1,
+                        "ultimo": comando.excluded.ultimo,
+                    },
+                )
+            )
+
+    def aplicar_retencao(self, agora: datetime | None = None) -> None:
+        agora = agora or datetime.now()
+
+        def operacao(db) -> None:
+            for resolucao, cubo in CUBOS.items():
+                limite = agora - timedelta(days=RETENCAO_DIAS[resolucao])
+                db.execute(delete(cubo).where(cubo.c.periodo < limite))
+                db.execute(
+                    delete(periodos).where(
+                        periodos.c.resolucao == resolucao, periodos.c.periodo < limite
+                    )
+                )
+
+        self.escritor.executar(operacao)
+        logger.debug(f"Retenção dos cubos de SLA aplicada até {agora:%d/%m %H:%M}")
+
+    def consultar(
+        self,
+        resolucao: str,
+        inicio: datetime,
+        fim: datetime | None = None,
+        contratos: Iterable[str] | None = None,
+        areas: Iterable[str] | None = None,
+        ats: Iterable[str] | None = None,
+        por: Iterable[str] = (),
+    ) -> pd.DataFrame:
+        """Média de ocorrências em aberto por período ("hora" ou "dia").
+
+        Volta com "Período", as dimensões de `por` (Contrato, Area, AT) e uma
+        coluna por indicador de `MEDIDAS_SLA`. Sem `por`, todo período com
+        snapshot aparece, mesmo que zerado pelos filtros. O resultado fica em
+        memória até o próximo snapshot.
+        """
+        inicio = _inicio_periodo(inicio, resolucao)
+        chave = (
+            resolucao,
+            inicio,
+            fim,
+            *(tuple(f or ()) for f in (contratos, areas, ats, por)),
+        )
+        resultado = self._consultas.get(chave)
+        if resultado is None:
+            resultado = self._consultas[chave] = self._consultar(
+                resolucao, inicio, fim, contratos, areas, ats, list(por)
+            )
+        return resultado.copy()
+
+    def _consultar(
+        self, resolucao, inicio, fim, contratos, areas, ats, por
+    ) -> pd.DataFrame:
+        cubo = CUBOS[resolucao]
+        dimensoes = [cubo.c[DIMENSOES[d]] for d in por]
+        # Filtros no ON: sem `por`, o LEFT JOIN mantém os períodos zerados
+        juncao = [cubo.c.periodo == periodos.c.periodo]
+        for dimensao, valores in (
+            ("Contrato", contratos),
+            ("Area", areas),
+            ("AT", ats),
+        ):
+            if valores:
+                valores = [v.strip() for v in valores]
+                if dimensao != "Area":
+                    valores = [v.upper() for v in valores]
+                juncao.append(cubo.c[DIMENSOES[dimensao]].in_(valores))
+        consulta = (
+            select(
+                periodos.c.periodo,
+                *dimensoes,
+                *[
+                    func.round(
+                        func.coalesce(func.sum(cubo.c[c]), 0)
+                        * 1.0
+                        / periodos.c.snapshots,
+                        1,
+                    )
+                    for c in COLUNAS_MEDIDAS.values()
+                ],
+            )
+            .select_from(periodos)
+            .join(cubo, and_(*juncao), isouter=not por)
+            .where(
+                periodos.c.resolucao == resolucao,
+                periodos.c.periodo >= inicio,
+                periodos.c.periodo <= (fim or datetime.now()),
+            )
+            .group_by(periodos.c.periodo, *dimensoes)
+            .order_by(periodos.c.periodo, *dimensoes)
+        )
+        with self.engine.connect() as conn:
+            linhas = conn.execute(consulta).all()
+        return pd.DataFrame(linhas, columns=["Período", *por, *MEDIDAS_SLA])
@@ -0,0 +1,175 @@
+import threading
+
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from database import ResumoD1, Session, engine, escritor
+from http_client import cliente
+from util import oc_vencidas
+
+# Acima disto (em horas) a ocorrência D-1 saiu do prazo
+LIMITE_PRAZO_D1 = 8
+CAMPOS_RESUMO = ("ocorrencias", "prazo", "reincidencia")
+
+
+def buscar_registros_d1(url: str, contrato: str) -> list[dict]:
+    """Registros D-1 crus de um contrato; o JSON é decodificado uma única vez."""
+    response = cliente.get("d_minus_one", url, params={"contrato": contrato})
+    if response.status_code != 200:
+        raise RuntimeError(f"Erro {response.status_code}")
+    registros = response.json()
+    # Um 200 com erro no corpo (ex.: {"detail": ...}) não pode virar um D-1 zerado
+    if not isinstance(registros, list):
+        raise RuntimeError(f"Resposta inesperada: {type(registros).__name__}")
+    return registros
+
+
+def resumir_d1(
+    registros: dict[str, list[dict]], limite: float = LIMITE_PRAZO_D1
+) -> dict[str, dict[str, int]]:
+    """Resumo D-1 de vários contratos num único DataFrame.
+
+    Ocorrências, dentro do prazo (não vencidas por `util.oc_vencidas`) e
+    reincidências saem de um groupby por contrato. Registros sem duração
+    (ainda abertos ou com data inválida) não contam como dentro do prazo.
+    """
+    df = pd.concat(
+        [
+            pd.DataFrame.from_records(
+                lista,
+                columns=["data_ocorrencia", "data_ocorrencia_final", "reincidencia"],
+            ).assign(contrato=contrato)
+            for contrato, lista in registros.items()
+        ],
+        ignore_index=True,
+    )
+    duracao, vencidas = oc_vencidas(
+        df["data_ocorrencia"], df["data_ocorrencia_final"], limite
+    )
+    df["prazo"] = ~vencidas & ~np.isnan(duracao)
+    df["reincidencia"] = df["reincidencia"].fillna(False).astype(bool)
+    resumo = (
+        df.groupby("contrato")
+        .agg(
+            ocorrencias=("contrato", "size"),
+            prazo=("prazo", "sum"),
+            reincidencia=("reincidencia", "sum"),
+        )
+        .reindex(list(registros), fill_value=0)
+        .astype("int64")
+    )
+    return {c: dict(zip(CAMPOS_RESUMO, map(int, v))) for c, v in resumo.iterrows()}
+
+
+def dia_referencia() -> date:
+    """O D-1 de hoje: o dia anterior no fuso do processo."""
+    return date.today() - timedelta(days=1)
+
+
+class ResumosD1:
+    """Resumo D-1 de todos os contratos, calculado em lote e guardado por dia.
+
+    O primeiro pedido do dia busca os contratos em paralelo, calcula os seis
+    resumos de uma vez e grava em `resumo_d1`; os pedidos seguintes (e os
+    outros processos) leem da memória ou do banco, sem voltar à API. Só os
+    contratos que falharam são buscados de novo num pedido posterior.
+
+    A busca roda fora do lock: pedidos simultâneos do mesmo dia esperam a
+    busca em curso (um Future por dia) em vez de repeti-la, e os de dias já
+    calculados não esperam nada.
+    """
+
+    def __init__(self, url: str, contratos: Iterable[str]):
+        self.url = url
+        self.contratos = list(contratos)
+        self._dias: dict[date, dict[str, dict[str, int]]] = {}
+        self._em_curso: dict[date, Future] = {}
+        self._lock = threading.Lock()
+        # A tabela é nova: cria-a se o banco veio de uma versão anterior
+        ResumoD1.__table__.create(engine, checkfirst=True)
+
+    def _ler(self, dia: date) -> dict[str, dict[str, int]]:
+        with Session() as session:
+            linhas = session.scalars(select(ResumoD1).where(ResumoD1.dia == dia))
+            return {
+                r.contrato: {c: getattr(r, c) for c in CAMPOS_RESUMO} for r in linhas
+            }
+
+    def _gravar(self, dia: date, resumos: dict[str, dict[str, int]]) -> None:
+        comando = insert(ResumoD1).values(
+            [{"dia": dia, "contrato": c, **v} for c, v in resumos.items()]
+        )
+        # Outro processo pode ter gravado o mesmo dia antes: fica o primeiro
+        escritor.executar(lambda db: db.execute(comando.on_conflict_do_nothing()))
+
+    def _calcular(self, dia: date, contratos: list[str]) -> dict[str, dict[str, int]]:
+        if not self.url:
+            return {}
+        registros = {}
+        with ThreadPoolExecutor(max_workers=len(contratos)) as pool:
+            futuros = {
+                c: pool.submit(buscar_registros_d1, self.url, c) for c in contratos
+            }
+            for contrato, futuro in futuros.items():
+                try:
+                    registros[contrato] = futuro.result()
+                except Exception as e:
+                    logger.error(f"D-1 de {contrato} indisponível: {e}")
+        if not registros:
+            return {}
+        resumos = resumir_d1(registros)
+        self._gravar(dia, resumos)
+        logger.debug(f"D-1 de {dia} calculado para {sorted(resumos)}")
+        return resumos
+
+    def resumo(self, contrato: str, dia: date | None = None) -> dict[str, int] | None:
+        """Resumo D-1 do contrato (ocorrências, prazo, reincidência) ou None."""
+        dia = dia or dia_referencia()
+        try:
+            return self._resumo(contrato, dia)
+        except Exception as e:
+            logger.error(f"Erro ao obter o D-1 de {contrato}: {e}")
+            return None
+
+    def _resumo(self, contrato: str, dia: date) -> dict[str, int] | None:
+        with self._lock:
+            resumos = self._dias.get(dia)
+        if resumos is None:
+            lidos = self._ler(dia)
+            with self._lock:
+                resumos = self._dias.setdefault(dia, lidos)
+
+        with self._lock:
+            if contrato in resumos or contrato not in self.contratos:
+                return resumos.get(contrato)
+            futuro = self._em_curso.get(dia)
+            buscar = futuro is None
+            if buscar:
+                faltando = [c for c in self.contratos if c not in resumos]
+                futuro = self._em_curso[dia] = Future()
+
+        if not buscar:
+            # Outro pedido já busca este dia: espera por ele em vez de repetir
+            futuro.result()
+        else:
+            try:
+                novos = self._calcular(dia, faltando)
+                with self._lock:
+                    resumos.update(novos)
+                futuro.set_result(None)
+            except Exception as e:
+                futuro.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    del self._em_curso[dia]
+        with self._lock:
+            return resumos.get(contrato)
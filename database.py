@@ -1,7 +1,14 @@
 import bcrypt
-from datetime import datetime
-from sqlalchemy import ForeignKey, Text, create_engine, func, event, Engine
+import os
+import queue
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from datetime import date, datetime
+from typing import TypeVar
+from sqlalchemy import ForeignKey, Index, Text, create_engine, func, event, Engine
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.orm import (
     DeclarativeBase,
     Mapped,
@@ -11,7 +18,24 @@ from sqlalchemy.orm import (
     sessionmaker,
 )
 
-engine = create_engine("sqlite:///user.db")
+T = TypeVar("T")
+
+DB_PATH = os.environ.get("SIGMAOPS_DB_PATH", "user.db")
+
+
+def criar_engine(caminho: str) -> Engine:
+    """Engine SQLite com pool de conexões compartilhado entre as threads."""
+    return create_engine(
+        f"sqlite:///{caminho}",
+        poolclass=QueuePool,
+        pool_size=8,
+        max_overflow=8,
+        pool_pre_ping=True,
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+
+
+engine = criar_engine(DB_PATH)
 Session = sessionmaker(
     bind=engine, expire_on_commit=False, autocommit=False, autoflush=False
 )
@@ -21,9 +45,92 @@ Session = sessionmaker(
 def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
+    # WAL: leitores não bloqueiam o escritor e vice-versa
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.execute("PRAGMA mmap_size=134217728")
     cursor.close()
 
 
+class FilaEscrita:
+    """Serializa as escritas do banco numa única thread escritora.
+
+    O SQLite aceita um escritor por vez; enfileirar as transações evita que
+    sessões concorrentes disputem o lock e recebam "database is locked".
+    As leituras continuam a usar o pool diretamente.
+
+    A thread é própria, e não um ThreadPoolExecutor: o concurrent.futures
+    recusa tarefas novas antes de rodar os `atexit`, e é num `atexit` que o
+    sink de logs grava o que restou na fila.
+    """
+
+    def __init__(self, session_factory: sessionmaker):
+        self._session_factory = session_factory
+        self._fila: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _iniciar(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._consumir, name="sqlite-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _consumir(self) -> None:
+        while True:
+            tarefa, futuro = self._fila.get()
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                futuro.set_result(tarefa())
+            except Exception as e:
+                futuro.set_exception(e)
+
+    def _em_transacao(self, operacao: Callable[[Session], T]) -> T:
+        with self._session_factory() as session:
+            try:
+                resultado = operacao(session)
+                session.commit()
+                return resultado
+            except Exception:
+                session.rollback()
+                raise
+
+    def _script(self, sql: str) -> None:
+        with self._session_factory() as session:
+            conexao = session.get_bind().raw_connection()
+        try:
+            conexao.driver_connection.executescript(sql)
+        finally:
+            conexao.close()
+
+    def _enfileirar(self, tarefa: Callable[[], T]) -> T:
+        futuro: Future = Future()
+        self._iniciar()
+        self._fila.put((tarefa, futuro))
+        return futuro.result()
+
+    def executar(self, operacao: Callable[[Session], T]) -> T:
+        """Roda `operacao(session)` na thread escritora e commita."""
+        return self._enfileirar(lambda: self._em_transacao(operacao))
+
+    def executar_script(self, sql: str) -> None:
+        """Roda `sql` (PRAGMA, VACUUM) na thread escritora, fora de transação.
+
+        Usa uma conexão própria e o executescript do sqlite3, mas na vez da
+        fila: não disputa o lock com as escritas nem as bloqueia por fora.
+        """
+        self._enfileirar(lambda: self._script(sql))
+
+
+escritor = FilaEscrita(Session)
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -40,7 +147,8 @@ class User(Base):
     __tablename__ = "users"
     id_user: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(nullable=False)
-    approved: Mapped[bool] = mapped_column(nullable=False, default=False)
+    # Índice: a lista de pendentes filtra por aqui a cada execução do admin
+    approved: Mapped[bool] = mapped_column(nullable=False, default=False, index=True)
     contract: Mapped[str] = mapped_column(
         ForeignKey("contracts.id_contract"), nullable=False
     )
@@ -63,12 +171,35 @@ class Feedback(Base):
 
 class Log(Base):
     __tablename__ = "logs"
+    # Limpeza e consultas por período (e nível) sem varrer a tabela
+    __table_args__ = (Index("ix_logs_timestamp_level", "timestamp", "level"),)
     id_log: Mapped[int] = mapped_column(primary_key=True)
     timestamp: Mapped[datetime] = mapped_column(server_default=func.now())
     level: Mapped[str] = mapped_column(nullable=False)
     message: Mapped[str] = mapped_column(Text, nullable=False)
 
 
+class LogHora(Base):
+    """Quantidade de logs por hora (UTC) e nível; fica depois da limpeza."""
+
+    __tablename__ = "logs_hora"
+    hora: Mapped[datetime] = mapped_column(primary_key=True)
+    level: Mapped[str] = mapped_column(primary_key=True)
+    quantidade: Mapped[int] = mapped_column(nullable=False)
+
+
+class ResumoD1(Base):
+    """Resumo D-1 já calculado: um por (dia de referência, contrato)."""
+
+    __tablename__ = "resumo_d1"
+    dia: Mapped[date] = mapped_column(primary_key=True)
+    contrato: Mapped[str] = mapped_column(primary_key=True)
+    ocorrencias: Mapped[int] = mapped_column(nullable=False)
+    prazo: Mapped[int] = mapped_column(nullable=False)
+    reincidencia: Mapped[int] = mapped_column(nullable=False)
+    calculado_em: Mapped[datetime] = mapped_column(server_default=func.now())
+
+
 if __name__ == "__main__":
     Base.metadata.create_all(engine)
     with Session(bind=engine) as session:
@@ -0,0 +1,292 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import pandas as pd
+
+from renderizador import renderizar_cards, renderizar_pagina_lista
+from sla import formatar_exibicao, medidas_sla
+
+
+def gerar_cards(kpis, contrato, momento: datetime | None = None, formato="jpeg"):
+    """Resumo em imagem com os cards de KPI (ver renderizador.renderizar_cards)."""
+    return renderizar_cards(kpis, contrato, momento or datetime.now(), formato)
+
+
+ITENS_POR_PAGINA = 20
+COLUNAS_COR = ["horas_float", "B2B", "Afetação"]
+
+
+def preparar_lista(df_view, col_order):
+    """Colunas e rótulos da lista exportada, na ordem pedida, já como texto."""
+    cols = [
+        c
+        for c in col_order
+        if c not in ["horas_float", "Status SLA", "Criticidade EPS"]
+    ]
+
+    return formatar_exibicao(df_view, cols).rename(
+        columns={
+            "Ocorrência": "ID",
+            "Horas Corridas": "Tempo",
+            "Cond. Alto Valor": "A.V",
+            "Cabo/Primária": "Cabo/Prim.",
+            "Reincidência": "Reinc.",
+            "Afetação": "Afet.",
+            "Técnicos": "Téc.",
+        }
+    )
+
+
+def contar_paginas(total_linhas: int) -> int:
+    return (total_linhas + ITENS_POR_PAGINA - 1) // ITENS_POR_PAGINA
+
+
+def gerar_lista(
+    df_view,
+    col_order,
+    contrato,
+    momento: datetime | None = None,
+    pagina=None,
+    formato="jpeg",
+):
+    """Lista de ocorrências em imagem, uma por página (ou só `pagina`)."""
+    momento = momento or datetime.now()
+    df_p = preparar_lista(df_view, col_order)
+    df_cor = df_view[[c for c in COLUNAS_COR if c in df_view.columns]]
+
+    lista_imagens = []
+    total_linhas = len(df_p)
+    if total_linhas == 0:
+        return lista_imagens
+
+    num_paginas = contar_paginas(total_linhas)
+    paginas = range(num_paginas) if pagina is None else [pagina]
+
+    for i in paginas:
+        inicio = i * ITENS_POR_PAGINA
+        fim = inicio + ITENS_POR_PAGINA
+        lista_imagens.append(
+            renderizar_pagina_lista(
+                df_p.iloc[inicio:fim],
+                df_cor.iloc[inicio:fim],
+                contrato,
+                momento,
+                i,
+                num_paginas,
+                formato,
+            )
+        )
+    return lista_imagens
+
+
+_pool_paginas: ProcessPoolExecutor | None = None
+_lock_pool = threading.Lock()
+
+
+def pool_paginas() -> ProcessPoolExecutor:
+    """Pool de processos partilhado para renderizar páginas da lista.
+
+    O desenho das páginas segura o GIL, então threads não ajudam. Usa "spawn"
+    porque o servidor do Streamlit já tem várias threads a correr e fazer fork
+    nesse estado não é seguro.
+    """
+    global _pool_paginas
+    with _lock_pool:
+        if _pool_paginas is None:
+            _pool_paginas = ProcessPoolExecutor(
+                max_workers=max(1, min(4, (os.cpu_count() or 1))),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool_paginas
+
+
+def _descartar_pool() -> None:
+    """Esquece um pool quebrado (worker morto); o próximo pedido cria outro."""
+    global _pool_paginas
+    with _lock_pool:
+        if _pool_paginas is not None:
+            _pool_paginas.shutdown(wait=False, cancel_futures=True)
+            _pool_paginas = None
+
+
+def gerar_lista_paralela(
+    df_view, col_order, contrato, momento: datetime | None = None, formato="jpeg"
+) -> list[bytes]:
+    """Como gerar_lista, com as páginas renderizadas no pool.
+
+    Cada processo recebe só a fatia da página (e as colunas usadas nas cores)
+    e devolve os bytes da imagem; a ordem das páginas é preservada.
+    """
+    momento = momento or datetime.now()
+    df_p = preparar_lista(df_view, col_order)
+    num_paginas = contar_paginas(len(df_p))
+    if num_paginas <= 1:
+        return gerar_lista(df_view, col_order, contrato, momento, formato=formato)
+
+    df_cor = df_view[[c for c in COLUNAS_COR if c in df_view.columns]]
+    fatias = [
+        slice(i * ITENS_POR_PAGINA, (i + 1) * ITENS_POR_PAGINA)
+        for i in range(num_paginas)
+    ]
+    try:
+        return list(
+            pool_paginas().map(
+                renderizar_pagina_lista,
+                [df_p.iloc[f] for f in fatias],
+                [df_cor.iloc[f] for f in fatias],
+                [contrato] * num_paginas,
+                [momento] * num_paginas,
+                range(num_paginas),
+                [num_paginas] * num_paginas,
+                [formato] * num_paginas,
+            )
+        )
+    except BrokenProcessPool:
+        _descartar_pool()
+        return gerar_lista(df_view, col_order, contrato, momento, formato=formato)
+
+
+def empacotar_zip(imagens: list[bytes], prefixo: str, extensao: str = "jpg") -> bytes:
+    buf = io.BytesIO()
+    # As imagens já vêm comprimidas; ZIP_STORED evita gastar CPU à toa
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for i, img in enumerate(imagens, start=1):
+            zf.writestr(f"{prefixo}_p{i}.{extensao}", img)
+    return buf.getvalue()
+
+
+def empacotar_pdf(imagens: list[bytes]) -> bytes:
+    from PIL import Image
+
+    paginas = [Image.open(io.BytesIO(img)).convert("RGB") for img in imagens]
+    buf = io.BytesIO()
+    paginas[0].save(
+        buf, format="PDF", save_all=True, append_images=paginas[1:], resolution=100
+    )
+    return buf.getvalue()
+
+
+def gerar_dashboard_gerencial(
+    df_geral, contratos_list, momento: datetime | None = None
+):
+    import matplotlib.pyplot as plt
+
+    resumo = (
+        medidas_sla(df_geral)
+        .groupby(df_geral["Contrato_Padrao"])
+        .sum()
+        .drop(columns="Sem Técnico")
+        .rename(
+            columns={
+                "Grandes Vultos": "G. Vulto",
+                "Cond. Alto Valor": "Alto Valor",
+                "Críticos": "Críticos >24h",
+            }
+        )
+        .reset_index()
+        .sort_values("Total", ascending=False)
+    )
+
+    resumo.rename(columns={"Contrato_Padrao": "Contrato"}, inplace=True)
+
+    fig, ax = plt.subplots(figsize=(16, max(4, 3 + len(resumo) * 0.8)), dpi=200)
+    ax.axis("off")
+    fig.patch.set_facecolor("white")
+
+    hora = (momento or datetime.now()).strftime("%d/%m • %H:%M")
+    plt.title(
+        f"VISÃO CLUSTER\nConsolidado SigmaOPS • {hora}",
+        loc="center",
+        pad=40,
+        fontsize=28,
+        weight="black",
+        color="#1e293b",
+    )
+
+    tbl = ax.table(
+        cellText=resumo.values.tolist(),
+        colLabels=resumo.columns,
+        cellLoc="center",
+        loc="center",
+    )
+    tbl.auto_set_font_size(False)
+    tbl.set_fontsize(11)
+    tbl.scale(1.2, 3.0)
+
+    for (i, j), cell in tbl.get_celld().items():
+        if i == 0:
+            cell.set_facecolor("#7c3aed")
+            cell.set_text_props(color="white", weight="bold")
+        else:
+            cell.set_edgecolor("#e2e8f0")
+            cell.set_text_props(color="#1e293b", weight="bold")
+            if i % 2 == 0:
+                cell.set_facecolor("#f8fafc")
+
+    buf = io.BytesIO()
+    plt.savefig(buf, format="jpg", dpi=200, bbox_inches="tight", facecolor="white")
+    plt.close(fig)
+    return buf.getvalue()
+
+
+class CacheExportacao:
+    """Cache LRU, limitado em bytes, das imagens exportadas.
+
+    A chave é um hash do conteúdo (linhas, KPIs, contrato e horário do
+    snapshot), então pedidos repetidos e outros utilizadores a ver o mesmo
+    snapshot recebem os bytes já gerados. Guarda bytes ou listas de bytes
+    (as páginas de uma lista).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._itens: OrderedDict[str, bytes | list[bytes]] = OrderedDict()
+        self._tamanho = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _tamanho_de(dados: bytes | list[bytes]) -> int:
+        return len(dados) if isinstance(dados, bytes) else sum(map(len, dados))
+
+    def obter(self, chave: str, gerar: Callable[[], bytes | list[bytes]]):
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                return self._itens[chave]
+        dados = gerar()
+        tamanho = self._tamanho_de(dados)
+        with self._lock:
+            if chave not in self._itens and tamanho <= self.max_bytes:
+                self._itens[chave] = dados
+                self._tamanho += tamanho
+                while self._tamanho > self.max_bytes:
+                    _, antigo = self._itens.popitem(last=False)
+                    self._tamanho -= self._tamanho_de(antigo)
+        return dados
+
+
+def chave_exportacao(tipo: str, *partes) -> str:
+    """Hash de conteúdo: DataFrames entram pelo hash das linhas, o resto por repr."""
+    h = hashlib.sha256(tipo.encode())
+    for parte in partes:
+        if isinstance(parte, pd.DataFrame):
+            h.update(
+                pd.util.hash_pandas_object(parte, index=False).to_numpy().tobytes()
+            )
+            h.update(repr(list(parte.columns)).encode())
+        else:
+            h.update(repr(parte).encode())
+    return h.hexdigest()
+
+
+cache_exportacao = CacheExportacao()
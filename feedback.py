@@ -1,5 +1,5 @@
 from loguru import logger
-from database import Feedback, Session
+from database import Feedback, escritor
 
 
 def salvar_feedback(tipo: str, descricao: str, contato: str | None) -> None:
@@ -10,9 +10,7 @@ def salvar_feedback(tipo: str, descricao: str, contato: str | None) -> None:
         contato=contato,
     )
     try:
-        with Session() as session:
-            session.add(feedback)
-            session.commit()
+        escritor.executar(lambda session: session.add(feedback))
     except Exception as e:
         logger.error(f"Erro ao salvar feedback: {e}")
         raise
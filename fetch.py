@@ -0,0 +1,145 @@
+import threading
+import time
+
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from loguru import logger
+
+from d1 import ResumosD1
+from http_client import cliente
+from ofensores import RANGE_MAXIMO, TabelaOfensores
+
+
+def buscar_ofensores(url: str, contrato_ofensor: str, range: int = 30):
+    """Carrega a lista de ofensores da API e devolve (json, erro)."""
+    if not url:
+        return None, "URL de Ofensores não configurada no secrets.toml."
+    try:
+        response = cliente.get(
+            "ofensores",
+            url,
+            params={"contrato": contrato_ofensor, "range": range},
+            # headers=API_HEADERS,
+        )
+
+        if response.status_code == 200:
+            logger.debug(f"{len(response.json())} primárias encontradas.")
+            return response.json(), None
+        return None, f"Erro {response.status_code}"
+    except Exception as e:
+        logger.error(f"Erro ao carregar dados de ofensores: {str(e)}")
+        return None, str(e)
+
+
+def carregar_ofensores(url: str, contrato_ofensor: str, range: int = RANGE_MAXIMO):
+    """Busca os ofensores e já os achata numa TabelaOfensores: (tabela, erro).
+
+    Por padrão pede o range máximo; as janelas menores saem da própria tabela.
+    """
+    dados, erro = buscar_ofensores(url, contrato_ofensor, range)
+    if dados is None:
+        return None, erro
+    return TabelaOfensores.construir(dados), None
+
+
+def _falhou(futuro: Future) -> bool:
+    """Future terminado com exceção, None ou (None, erro)."""
+    if futuro.exception() is not None:
+        return True
+    resultado = futuro.result()
+    return resultado is None or (isinstance(resultado, tuple) and resultado[0] is None)
+
+
+class BuscadorAPIs:
+    """Camada de busca concorrente para as APIs de ofensores e D-1.
+
+    As chamadas são disparadas num pool de threads e guardadas como Future
+    num cache com TTL por (tipo, parâmetros). Chamadas repetidas enquanto a
+    primeira ainda está em andamento reutilizam o mesmo Future, então várias
+    sessões pedindo o mesmo contrato geram uma única requisição. O D-1 sai
+    de `ResumosD1`, que calcula todos os contratos juntos e guarda por dia.
+
+    Falhas (exceção, `None` ou `(None, erro)`) só ficam `ttl_falha` segundos
+    no cache, e `aguardar` espera no máximo `timeout` segundos: com a API
+    fora, a tela não trava nem fica cinco minutos presa ao erro.
+    """
+
+    def __init__(
+        self,
+        url_ofensores: str,
+        url_d_minus_one: str,
+        contratos: Iterable[str] = (),
+        ttl: float = 300,
+        ttl_falha: float = 30,
+        timeout: float = 20,
+        max_workers: int = 12,
+    ):
+        self.url_ofensores = url_ofensores
+        self.url_d_minus_one = url_d_minus_one
+        self.resumos_d1 = ResumosD1(url_d_minus_one, contratos)
+        self.ttl = ttl
+        self.ttl_falha = ttl_falha
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="fetch"
+        )
+        self._cache: dict[tuple, tuple[float, Future]] = {}
+        self._lock = threading.Lock()
+
+    def _submeter(self, chave: tuple, func: Callable, *args) -> Future:
+        chave = tuple(tuple(p) if isinstance(p, list) else p for p in chave)
+        agora = time.monotonic()
+        with self._lock:
+            item = self._cache.get(chave)
+            if item is not None:
+                criado_em, futuro = item
+                if not futuro.done():
+                    return futuro
+                ttl = self.ttl_falha if _falhou(futuro) else self.ttl
+                if agora - criado_em < ttl:
+                    return futuro
+            futuro = self._executor.submit(func, *args)
+            self._cache[chave] = (agora, futuro)
+        return futuro
+
+    def aguardar(self, futuro: Future, padrao=None):
+        """Resultado do Future, ou `padrao` se não chegar em `timeout` segundos.
+
+        A busca continua em segundo plano e fica no cache para a próxima
+        execução.
+        """
+        try:
+            return futuro.result(self.timeout)
+        except TimeoutError:
+            logger.warning(f"API sem resposta em {self.timeout} s; segue sem os dados")
+            return padrao
+
+    def ofensores(self, contrato: str, range: int = RANGE_MAXIMO) -> Future:
+        return self._submeter(
+            ("ofensores", contrato, range),
+            carregar_ofensores,
+            self.url_ofensores,
+            contrato,
+            range,
+        )
+
+    def d_minus_one(self, contrato: str) -> Future:
+        return self._submeter(("d1", contrato), self.resumos_d1.resumo, contrato)
+
+    def prefetch(
+        self, contratos: Iterable[str], range: int = RANGE_MAXIMO
+    ) -> list[Future]:
+        """Dispara, sem bloquear, ofensores e D-1 de todos os contratos."""
+        futuros = []
+        for contrato in contratos:
+            futuros.append(self.ofensores(contrato, range))
+            futuros.append(self.d_minus_one(contrato))
+        return futuros
+
+    def limpar(self, tipo: str | None = None) -> None:
+        """Invalida o cache ("ofensores", "d1" ou tudo)."""
+        with self._lock:
+            for chave in list(self._cache):
+                if tipo is None or chave[0] == tipo:
+                    del self._cache[chave]
@@ -0,0 +1,105 @@
+import pandas as pd
+
+from st_aggrid import AgGrid, JsCode
+
+from sla import LIMITE_B2B, LIMITE_CRITICO, LIMITE_PADRAO, formatar_exibicao
+
+LINHAS_POR_PAGINA = 100
+
+# Cor da linha calculada no navegador: faixa de SLA e, por cima, GV em azul
+COR_LINHA = JsCode(f"""
+function(params) {{
+    const d = params.data || {{}};
+    const h = Number(d.horas_float || 0);
+    const b2b = String(d.B2B || "").trim().toUpperCase() === "SIM";
+    const limite = b2b ? {LIMITE_B2B} : {LIMITE_PADRAO};
+    let cor = "#16a34a";
+    if (h > {LIMITE_CRITICO}) cor = "#dc2626";
+    else if (h > limite) cor = "#d97706";
+    if (Number(d["Afet."] || 0) >= 100) cor = "#2563eb";
+    return {{ color: cor, fontWeight: 700 }};
+}}
+""")
+
+
+def _badge(fundo: str, texto: str) -> JsCode:
+    return JsCode(f"""
+function(params) {{
+    if (String(params.value || "").trim().toUpperCase() === "SIM") {{
+        return {{ textAlign: "center", backgroundColor: "{fundo}", color: "{texto}" }};
+    }}
+    return {{ textAlign: "center" }};
+}}
+""")
+
+
+BADGES = {
+    "VIP": _badge("#f5d0fe", "#86198f"),
+    "A.V": _badge("#d9f99d", "#365314"),
+    "B2B": _badge("#ddd6fe", "#5b21b6"),
+}
+
+CSS_GRADE = {
+    ".ag-header-cell-label": {"justify-content": "center"},
+    ".ag-header-cell": {"background-color": "#f1f5f9", "color": "#475569"},
+    ".ag-root-wrapper": {"font-family": "Inter, sans-serif", "font-size": "12px"},
+}
+
+
+def opcoes_grade(colunas: list[str], ocultas: list[str]) -> dict:
+    """gridOptions da tabela operacional; as regras de cor rodam no cliente."""
+    return {
+        "columnDefs": [
+            {
+                "field": c,
+                "headerName": c,
+                "hide": c in ocultas,
+                **({"cellStyle": BADGES[c]} if c in BADGES else {}),
+            }
+            for c in colunas
+        ],
+        "defaultColDef": {
+            "sortable": True,
+            "resizable": True,
+            "filter": True,
+            "flex": 1,
+            "minWidth": 70,
+            "cellStyle": {"textAlign": "center"},
+        },
+        # "Afet." e "Cabo/Prim." têm ponto: sem isso o AG Grid lê como caminho
+        "suppressFieldDotNotation": True,
+        "getRowStyle": COR_LINHA,
+        "rowHeight": 34,
+        "animateRows": False,
+    }
+
+
+def exibir_grade(
+    df: pd.DataFrame,
+    colunas: list[str],
+    renomear: dict[str, str],
+    ocultas: list[str],
+    key: str,
+    pagina: int,
+):
+    """Mostra uma página de LINHAS_POR_PAGINA linhas numa grade virtualizada.
+
+    Só a página corrente é formatada para texto (`formatar_exibicao`) e vai
+    para o navegador, então o payload não cresce com o número de ocorrências
+    abertas; o AG Grid só desenha as linhas visíveis.
+    """
+    inicio = pagina * LINHAS_POR_PAGINA
+    df_tela = formatar_exibicao(
+        df.iloc[inicio : inicio + LINHAS_POR_PAGINA], colunas
+    ).rename(columns=lambda c: renomear.get(c, c))
+    AgGrid(
+        df_tela,
+        gridOptions=opcoes_grade(list(df_tela.columns), ocultas),
+        height=600,
+        allow_unsafe_jscode=True,
+        custom_css=CSS_GRADE,
+        update_on=[],
+        show_toolbar=False,
+        show_download_button=False,
+        key=key,
+    )
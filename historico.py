@@ -0,0 +1,390 @@
+import os
+import threading
+import time
+
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from loguru import logger
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    bindparam,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.orm import sessionmaker
+
+from cdc import CHAVE, calcular_hashes
+from database import FilaEscrita, criar_engine
+from ocorrencias import aplicar_tipos
+from sla import FLAGS, flag_sim, padronizar_texto, sigla_at
+
+HISTORICO_PATH = os.environ.get("SIGMAOPS_HISTORICO_PATH", "historico.db")
+# (idade em dias, resolução): após 7 dias, uma versão por ocorrência e hora;
+# após 30, uma por ocorrência e dia
+NIVEIS_DETALHE = ((7, "%Y-%m-%d %H"), (30, "%Y-%m-%d"))
+
+# Coluna do snapshot -> coluna do histórico; são as mesmas do hash do CDC
+COLUNAS_HISTORICO = {
+    "Abertura": "abertura",
+    "Contrato": "contrato",
+    "CNL": "cnl",
+    "AT": "at",
+    "Afetação": "afetacao",
+    "VIP": "vip",
+    "Cond. Alto Valor": "alto_valor",
+    "B2B": "b2b",
+    "Técnicos": "tecnicos",
+    "Origem": "origem",
+    "Cabo": "cabo",
+    "Primárias": "primarias",
+    "BD": "bd",
+    "Propensos - Anatel": "propensos_anatel",
+    "Reclamados - Anatel": "reclamados_anatel",
+    "Reincidência": "reincidencia",
+    "Cabo/Primária": "cabo_primaria",
+    "Cidade_Real": "cidade",
+}
+INTEIROS = {
+    "Afetação",
+    "Técnicos",
+    "Primárias",
+    "Propensos - Anatel",
+    "Reclamados - Anatel",
+    "Reincidência",
+}
+
+
+def _tipo(coluna: str):
+    if coluna == "Abertura":
+        return DateTime
+    if coluna in FLAGS:
+        return Boolean
+    return Integer if coluna in INTEIROS else String
+
+
+metadata = MetaData()
+
+# Uma linha por versão de ocorrência: o conteúdo (hash) ficou igual de
+# visto_de até visto_ate; visto_ate NULL = versão ainda aberta
+versoes = Table(
+    "versoes_ocorrencia",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("ocorrencia", BigInteger, nullable=False),
+    Column("hash", BigInteger, nullable=False),
+    Column("sigla_at", String),
+    *[Column(nome, _tipo(coluna)) for coluna, nome in COLUNAS_HISTORICO.items()],
+    Column("visto_de", DateTime, nullable=False),
+    Column("visto_ate", DateTime),
+)
+# Só as versões abertas: é por aqui que cada snapshot fecha as que mudaram
+Index(
+    "ix_versoes_abertas",
+    versoes.c.ocorrencia,
+    sqlite_where=versoes.c.visto_ate.is_(None),
+)
+Index("ix_versoes_contrato", versoes.c.contrato, versoes.c.visto_de)
+Index("ix_versoes_at", versoes.c.sigla_at, versoes.c.visto_de)
+Index("ix_versoes_visto_ate", versoes.c.visto_ate)
+
+# Quando cada snapshot foi gravado e quantas ocorrências tinha
+snapshots = Table(
+    "snapshots",
+    metadata,
+    Column("em", DateTime, primary_key=True),
+    Column("ocorrencias", Integer, nullable=False),
+    Column("versoes_novas", Integer, nullable=False),
+)
+
+
+def _hora_local(em: datetime) -> datetime:
+    """Instantes gravados como hora local sem fuso, como a Abertura da API."""
+    if em.tzinfo is not None:
+        em = em.astimezone().replace(tzinfo=None)
+    return em
+
+
+def _linhas_versao(df: pd.DataFrame, hashes: np.ndarray, em: datetime) -> list[dict]:
+    if df.empty:
+        return []
+    colunas = {"ocorrencia": df[CHAVE].astype("int64"), "hash": hashes}
+    for coluna, nome in COLUNAS_HISTORICO.items():
+        if coluna not in df.columns:
+            continue
+        valores = df[coluna]
+        if coluna == "Contrato":
+            # Gravado como o Contrato_Padrao: é por ele que `consultar` filtra
+            valores = padronizar_texto(valores)
+        if coluna == "Abertura":
+            valores = pd.to_datetime(valores, errors="coerce").dt.tz_localize(None)
+            valores = valores.astype(object).where(valores.notna(), None)
+        elif coluna in FLAGS:
+            valores = pd.Series(flag_sim(df, coluna), index=df.index)
+        elif coluna in INTEIROS:
+            valores = pd.to_numeric(valores, errors="coerce").astype("Int64")
+            valores = valores.astype(object).where(valores.notna(), None)
+        else:
+            valores = valores.astype(object).where(valores.notna(), None)
+        colunas[nome] = valores
+    if "AT" in df.columns:
+        colunas["sigla_at"] = sigla_at(df["AT"])
+    colunas["visto_de"] = em
+    return pd.DataFrame(colunas).to_dict("records")
+
+
+# Grupos (ocorrência, período) com mais de uma versão fechada antes do limite
+# de detalhe, todas começando e terminando no mesmo período (`formato` do
+# strftime: hora ou dia); fica a última (maior id), estendida até o início da
+# primeira
+_GRUPOS_CURTOS = """
+    WITH grupos AS (
+        SELECT ocorrencia, strftime(:formato, visto_de) AS periodo,
+               MIN(visto_de) AS de, MAX(id) AS manter
+        FROM versoes_ocorrencia
+        WHERE visto_ate < :detalhe
+          AND strftime(:formato, visto_ate) = strftime(:formato, visto_de)
+        GROUP BY ocorrencia, periodo
+        HAVING COUNT(*) > 1
+    )
+"""
+_FUNDIR_ESTENDER = text(
+    _GRUPOS_CURTOS
+    + """
+    UPDATE versoes_ocorrencia
+    SET visto_de = (SELECT de FROM grupos WHERE manter = versoes_ocorrencia.id)
+    WHERE id IN (SELECT manter FROM grupos)
+"""
+).bindparams(bindparam("detalhe", type_=DateTime), bindparam("formato"))
+_FUNDIR_APAGAR = text(
+    _GRUPOS_CURTOS
+    + """
+    DELETE FROM versoes_ocorrencia
+    WHERE visto_ate < :detalhe
+      AND strftime(:formato, visto_ate) = strftime(:formato, visto_de)
+      AND (ocorrencia, strftime(:formato, visto_de))
+          IN (SELECT ocorrencia, periodo FROM grupos)
+      AND id NOT IN (SELECT manter FROM grupos)
+"""
+).bindparams(bindparam("detalhe", type_=DateTime), bindparam("formato"))
+
+
+class HistoricoOcorrencias:
+    """Histórico de snapshots de ocorrências num SQLite próprio.
+
+    Cada snapshot grava só o que mudou: uma versão nova para cada ocorrência
+    nova ou com hash de conteúdo diferente e o fechamento (`visto_ate`) das
+    versões que mudaram ou saíram. Snapshots repetidos não acrescentam
+    linhas, então o custo cresce com as mudanças e não com a frequência.
+
+    `consultar` faz varreduras por período, contrato e AT pelos índices;
+    `compactar` apaga o que passou da retenção, funde versões antigas de
+    vida curta (uma por ocorrência e hora, depois por dia) e devolve o
+    espaço ao disco.
+    """
+
+    def __init__(
+        self,
+        caminho: str = HISTORICO_PATH,
+        retencao_dias: int = 180,
+        niveis_detalhe: Iterable[tuple[int, str]] = NIVEIS_DETALHE,
+        compactar_a_cada: float = 3600,
+    ):
+        self.retencao_dias = retencao_dias
+        self.niveis_detalhe = tuple(niveis_detalhe)
+        self.compactar_a_cada = compactar_a_cada
+        self.engine = criar_engine(caminho)
+        self._Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.escritor = FilaEscrita(self._Session)
+        with self.engine.connect() as conn:
+            modo_vacuum = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+        if modo_vacuum != 2:
+            # auto_vacuum só muda com um VACUUM, barato com o banco ainda vazio
+            self.escritor.executar_script("PRAGMA auto_vacuum=INCREMENTAL; VACUUM;")
+        metadata.create_all(self.engine)
+        # Versões gravadas antes de o contrato ser padronizado na escrita
+        self.escritor.executar(
+            lambda db: db.execute(
+                update(versoes)
+                .where(versoes.c.contrato != func.upper(func.trim(versoes.c.contrato)))
+                .values(contrato=func.upper(func.trim(versoes.c.contrato)))
+            )
+        )
+        self._lock = threading.Lock()
+        self._ultima_compactacao = time.monotonic()
+        with self.engine.connect() as conn:
+            abertas = conn.execute(
+                select(versoes.c.ocorrencia, versoes.c.hash).where(
+                    versoes.c.visto_ate.is_(None)
+                )
+            ).all()
+            self._ultimo = conn.execute(select(func.max(snapshots.c.em))).scalar()
+        # Última versão aberta de cada ocorrência: {ocorrência: hash}
+        self._abertas = pd.Series(
+            [h for _, h in abertas],
+            index=pd.Index([o for o, _ in abertas], name=CHAVE),
+            dtype="int64",
+        )
+
+    def registrar(
+        self, df: pd.DataFrame, em: datetime, hashes: pd.Series | None = None
+    ) -> int:
+        """Acrescenta um snapshot; devolve quantas versões novas foram gravadas."""
+        hashes = hashes if hashes is not None else calcular_hashes(df)
+        if hashes is None:
+            return 0
+        em = _hora_local(em)
+        atuais = pd.Series(hashes.to_numpy().view("int64"), index=hashes.index)
+        with self._lock:
+            anteriores = self._abertas
+            comuns = atuais.index.intersection(anteriores.index)
+            mudou = comuns[
+                atuais.loc[comuns].to_numpy() != anteriores.loc[comuns].to_numpy()
+            ]
+            gravar = atuais.index.difference(anteriores.index).union(mudou)
+            fechar = anteriores.index.difference(atuais.index).union(mudou)
+
+            # `hashes` vem de calcular_hashes(df): mesma ordem das linhas
+            novas = df[CHAVE].isin(gravar).to_numpy()
+            linhas = _linhas_versao(df[novas], atuais.to_numpy()[novas], em)
+
+            def operacao(db) -> None:
+                if len(fechar):
+                    db.execute(
+                        update(versoes)
+                        .where(versoes.c.ocorrencia == bindparam("oc"))
+                        .where(versoes.c.visto_ate.is_(None))
+                        .values(visto_ate=em),
+                        [{"oc": int(oc)} for oc in fechar],
+                    )
+                if linhas:
+                    db.execute(insert(versoes), linhas)
+                db.execute(
+                    insert(snapshots)
+                    .prefix_with("OR REPLACE")
+                    .values(em=em, ocorrencias=len(atuais), versoes_novas=len(linhas))
+                )
+
+            self.escritor.executar(operacao)
+            self._abertas = atuais[~atuais.index.duplicated(keep="last")]
+            self._ultimo = em
+
+        if time.monotonic() - self._ultima_compactacao > self.compactar_a_cada:
+            self.compactar()
+        return len(linhas)
+
+    def consultar(
+        self,
+        inicio: datetime,
+        fim: datetime | None = None,
+        contratos: Iterable[str] | None = None,
+        ats: Iterable[str] | None = None,
+    ) -> pd.DataFrame:
+        """Versões que estiveram abertas em algum instante de [inicio, fim].
+
+        Volta com as colunas e os tipos do snapshot (Ocorrência, Contrato,
+        AT, ...) mais `visto_de`/`visto_ate`; versões ainda abertas contam até
+        `fim` e vêm com `visto_ate` igual ao último snapshot gravado. O
+        Contrato vem padronizado (sem espaços nas pontas, em maiúsculas).
+        """
+        inicio, fim = _hora_local(inicio), _hora_local(fim or datetime.now())
+        consulta = select(
+            versoes.c.ocorrencia.label(CHAVE),
+            *[versoes.c[nome].label(col) for col, nome in COLUNAS_HISTORICO.items()],
+            versoes.c.visto_de,
+            func.coalesce(versoes.c.visto_ate, self._ultimo or fim).label("visto_ate"),
+        ).where(
+            versoes.c.visto_de <= fim,
+            or_(versoes.c.visto_ate.is_(None), versoes.c.visto_ate >= inicio),
+        )
+        if contratos:
+            contratos = [c.strip().upper() for c in contratos]
+            consulta = consulta.where(versoes.c.contrato.in_(contratos))
+        if ats:
+            siglas = [a.strip().upper() for a in ats]
+            consulta = consulta.where(versoes.c.sigla_at.in_(siglas))
+        with self.engine.connect() as conn:
+            df = pd.read_sql(
+                consulta.order_by(versoes.c.visto_de),
+                conn,
+                parse_dates=["Abertura", "visto_de", "visto_ate"],
+            )
+        return aplicar_tipos(df)
+
+    def estado_em(self, momento: datetime, **filtros) -> pd.DataFrame:
+        """As ocorrências abertas num instante, como o snapshot daquela hora."""
+        return self.consultar(momento, momento, **filtros)
+
+    def compactar(self) -> dict[str, int]:
+        """Aplica a retenção, funde versões antigas e libera espaço.
+
+        Para cada nível de `niveis_detalhe`, as versões fechadas há mais dos
+        dias do nível que começaram e terminaram no mesmo período (hora, dia)
+        de uma ocorrência são trocadas por uma só, com o conteúdo da última e
+        o intervalo somado.
+        """
+        self._ultima_compactacao = time.monotonic()
+        agora = datetime.now()
+        retencao = agora - timedelta(days=self.retencao_dias)
+        niveis = [
+            {"detalhe": agora - timedelta(days=dias), "formato": formato}
+            for dias, formato in self.niveis_detalhe
+        ]
+
+        def operacao(db) -> dict[str, int]:
+            apagadas = db.execute(
+                delete(versoes).where(versoes.c.visto_ate < retencao)
+            ).rowcount
+            db.execute(delete(snapshots).where(snapshots.c.em < retencao))
+            fundidas = 0
+            for nivel in niveis:
+                db.execute(_FUNDIR_ESTENDER, nivel)
+                db.execute(_FUNDIR_APAGAR, nivel)
+                # rowcount não conta DELETE que começa por WITH no sqlite3
+                fundidas += db.execute(text("SELECT changes()")).scalar()
+            return {"apagadas": apagadas, "fundidas": fundidas}
+
+        resultado = self.escritor.executar(operacao)
+        # Devolve ao disco as páginas livres; pelo execute do sqlite3 o pragma
+        # daria um passo só, liberando uma única página
+        self.escritor.executar_script("PRAGMA incremental_vacuum;")
+        logger.info(f"Histórico compactado: {resultado}")
+        return resultado
+
+    def tamanho_bytes(self) -> int:
+        with self.engine.connect() as conn:
+            paginas = conn.execute(text("PRAGMA page_count")).scalar()
+            livres = conn.execute(text("PRAGMA freelist_count")).scalar()
+            pagina = conn.execute(text("PRAGMA page_size")).scalar()
+        return (paginas - livres) * pagina
+
+    def resumo(self) -> dict[str, object]:
+        with self.engine.connect() as conn:
+            n_versoes = conn.execute(select(func.count()).select_from(versoes)).scalar()
+            n_snapshots, primeiro = conn.execute(
+                select(func.count(), func.min(snapshots.c.em))
+            ).one()
+        return {
+            "versoes": n_versoes,
+            "abertas": len(self._abertas),
+            "snapshots": n_snapshots,
+            "desde": primeiro,
+            "ultimo": self._ultimo,
+            "tamanho_mb": round(self.tamanho_bytes() / 2**20, 1),
+        }
@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+
+from dataclasses import dataclass, field
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+
+class CircuitoAberto(Exception):
+    """O endpoint falhou repetidamente e está temporariamente bloqueado."""
+
+
+@dataclass(frozen=True)
+class ConfigEndpoint:
+    timeout: tuple[float, float] = (5, 25)  # (conexão, leitura) em segundos
+    tentativas: int = 3
+    backoff: float = 0.5  # base do backoff exponencial, em segundos
+    limite_falhas: int = 5  # falhas consecutivas até abrir o circuito
+    tempo_aberto: float = 30  # segundos até permitir uma nova tentativa
+
+
+ENDPOINTS = {
+    "ocorrencias": ConfigEndpoint(timeout=(5, 25)),
+    "ofensores": ConfigEndpoint(timeout=(5, 25)),
+    "d_minus_one": ConfigEndpoint(timeout=(5, 15)),
+}
+
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class MetricasEndpoint:
+    chamadas: int = 0
+    erros: int = 0
+    retentativas: int = 0
+    rejeitadas: int = 0
+    latencia_total: float = 0.0
+    latencia_max: float = 0.0
+    ultima_latencia: float = 0.0
+    ultimo_erro: str | None = None
+    falhas_seguidas: int = 0
+    aberto_ate: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def estado(self) -> str:
+        if self.aberto_ate == 0:
+            return "fechado"
+        return "aberto" if time.monotonic() < self.aberto_ate else "meio-aberto"
+
+
+class ClienteHTTP:
+    """Cliente HTTP compartilhado pelos carregadores das APIs.
+
+    Mantém conexões keep-alive num pool, aplica timeout por endpoint, refaz
+    chamadas com backoff exponencial e jitter e, após falhas seguidas, abre
+    um circuit breaker que falha imediatamente até o endpoint se recuperar.
+    """
+
+    def __init__(self, endpoints: dict[str, ConfigEndpoint], pool: int = 16):
+        self.endpoints = endpoints
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(endpoints), pool_maxsize=pool)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._metricas = {nome: MetricasEndpoint() for nome in endpoints}
+
+    def get(self, endpoint: str, url: str, **kwargs) -> requests.Response:
+        """GET com retentativas; levanta CircuitoAberto ou o último erro de rede."""
+        config = self.endpoints[endpoint]
+        m = self._metricas[endpoint]
+
+        with m.lock:
+            if m.estado == "aberto":
+                m.rejeitadas += 1
+                raise CircuitoAberto(f"API {endpoint} indisponível, tente mais tarde.")
+
+        for tentativa in range(config.tentativas):
+            if tentativa:
+                espera = random.uniform(0, config.backoff * 2**tentativa)
+                time.sleep(espera)
+                with m.lock:
+                    m.retentativas += 1
+            inicio = time.perf_counter()
+            try:
+                response = self._session.get(url, timeout=config.timeout, **kwargs)
+                erro = None
+                if response.status_code in STATUS_RETENTAVEIS:
+                    erro = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                response, erro = None, str(e)
+            self._registrar(endpoint, time.perf_counter() - inicio, erro)
+            if erro is None:
+                return response
+            logger.warning(f"Falha na API {endpoint} ({tentativa + 1}): {erro}")
+            if self._metricas[endpoint].estado == "aberto":
+                break
+
+        if response is not None:
+            return response
+        raise requests.ConnectionError(erro)
+
+    def _registrar(self, endpoint: str, latencia: float, erro: str | None) -> None:
+        config = self.endpoints[endpoint]
+        m = self._metricas[endpoint]
+        with m.lock:
+            m.chamadas += 1
+            m.latencia_total += latencia
+            m.ultima_latencia = latencia
+            m.latencia_max = max(m.latencia_max, latencia)
+            if erro is None:
+                m.falhas_seguidas = 0
+                m.aberto_ate = 0.0
+                return
+            m.erros += 1
+            m.ultimo_erro = erro
+            m.falhas_seguidas += 1
+            if m.falhas_seguidas >= config.limite_falhas or m.estado == "meio-aberto":
+                m.aberto_ate = time.monotonic() + config.tempo_aberto
+                logger.error(f"Circuito aberto para a API {endpoint}: {erro}")
+
+    def metricas(self) -> list[dict]:
+        """Contadores por endpoint, para o painel de administração."""
+        linhas = []
+        for nome, m in self._metricas.items():
+            with m.lock:
+                linhas.append(
+                    {
+                        "Endpoint": nome,
+                        "Circuito": m.estado,
+                        "Chamadas": m.chamadas,
+                        "Erros": m.erros,
+                        "Retentativas": m.retentativas,
+                        "Rejeitadas": m.rejeitadas,
+                        "Latência média (ms)": round(
+                            1000 * m.latencia_total / m.chamadas if m.chamadas else 0
+                        ),
+                        "Latência máx. (ms)": round(1000 * m.latencia_max),
+                        "Último erro": m.ultimo_erro or "",
+                    }
+                )
+        return linhas
+
+
+cliente = ClienteHTTP(ENDPOINTS)
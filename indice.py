@@ -0,0 +1,147 @@
+import copy
+
+from collections.abc import Iterable
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cdc import DiffSnapshot
+from sla import aplicar_horas, medidas_sla, processar_dados
+
+# Faceta -> coluna do snapshot processado
+FACETAS = {
+    "Contrato": "Contrato_Padrao",
+    "Area": "Area",
+    "Status SLA": "Status SLA",
+    "AT": "AT",
+    "VIP": "VIP",
+    "B2B": "B2B",
+    "Cond. Alto Valor": "Cond. Alto Valor",
+}
+
+
+class IndiceSnapshot:
+    """Índice de bitmaps por faceta, construído uma vez por snapshot.
+
+    Cada valor de cada faceta guarda um bitmap (máscara booleana compactada
+    com np.packbits) sobre o snapshot já processado. Qualquer combinação de
+    filtros é resolvida por OR dentro da faceta e AND entre facetas, sem
+    copiar o DataFrame; só a seleção final materializa as linhas.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.n = len(df)
+        self._bitmaps: dict[str, dict[object, np.ndarray]] = {}
+        for faceta, coluna in FACETAS.items():
+            if coluna in df.columns:
+                self._bitmaps[faceta] = self._indexar(df[coluna])
+        medidas = medidas_sla(df)
+        self._bitmaps["Sem Técnico"] = {True: self._compactar(medidas["Sem Técnico"])}
+        self._bitmaps["Grande Vulto"] = {
+            True: self._compactar(medidas["Grandes Vultos"])
+        }
+        self._todos = self._compactar(np.ones(self.n, dtype=bool))
+        # (minuto, índice com as horas até esse minuto), partilhado pelas sessões
+        self._por_minuto: tuple[datetime, IndiceSnapshot] | None = None
+
+    @classmethod
+    def construir(
+        cls,
+        df_raw: pd.DataFrame,
+        anterior: "IndiceSnapshot | None" = None,
+        diff: DiffSnapshot | None = None,
+    ) -> "IndiceSnapshot":
+        """Processa o snapshot completo (todos os contratos) e indexa.
+
+        O `diff` só decide entre reaproveitar e reconstruir: se desde o
+        snapshot do índice `anterior` nenhuma ocorrência entrou, saiu ou
+        mudou, o índice anterior é reaproveitado e só as horas andam. Com
+        qualquer mudança, reconstrói tudo: os bitmaps são posicionais sobre
+        o DataFrame ordenado por horas, e uma linha a entrar ou sair desloca
+        todos eles.
+        """
+        if anterior is not None and diff is not None and diff.mesmo_conteudo():
+            return anterior.no_instante(datetime.now())
+        return cls(processar_dados(df_raw, []))
+
+    def no_instante(self, agora: datetime) -> "IndiceSnapshot":
+        """O mesmo índice com as horas contadas até `agora`.
+
+        O snapshot pode ficar minutos sem ser reconstruído (API fora ou sem
+        mudanças); só as colunas que dependem do relógio e os bitmaps de
+        "Status SLA" são refeitos. A ordem por horas não muda: todas andam
+        juntas.
+        """
+        novo = copy.copy(self)
+        novo.df = aplicar_horas(self.df.copy(deep=False), agora.replace(tzinfo=None))
+        novo._bitmaps = {
+            **self._bitmaps,
+            "Status SLA": novo._indexar(novo.df["Status SLA"]),
+        }
+        novo._por_minuto = None
+        return novo
+
+    def no_minuto(self, agora: datetime) -> "IndiceSnapshot":
+        """`no_instante` arredondado ao minuto e guardado neste índice.
+
+        O painel chama isto a cada rerun: só o primeiro de cada minuto paga
+        o recálculo (O(n)); os outros, de qualquer sessão, reaproveitam-no.
+        """
+        minuto = agora.replace(second=0, microsecond=0)
+        guardado = self._por_minuto
+        if guardado is not None and guardado[0] == minuto:
+            return guardado[1]
+        novo = self.no_instante(minuto)
+        self._por_minuto = (minuto, novo)
+        return novo
+
+    def _compactar(self, mascara) -> np.ndarray:
+        return np.packbits(np.asarray(mascara, dtype=bool))
+
+    def _indexar(self, coluna: pd.Series) -> dict[object, np.ndarray]:
+        codigos, valores = pd.factorize(coluna, use_na_sentinel=True)
+        return {valor: self._compactar(codigos == i) for i, valor in enumerate(valores)}
+
+    def bitmap(self, filtros: dict[str, object]) -> np.ndarray:
+        """Bitmap da interseção dos filtros {faceta: valor ou lista de valores}.
+
+        Filtros vazios ou None são ignorados.
+        """
+        resultado = self._todos.copy()
+        for faceta, valores in filtros.items():
+            if valores is None:
+                continue
+            if isinstance(valores, (str, bool)) or not isinstance(valores, Iterable):
+                valores = [valores]
+            valores = list(valores)
+            if not valores:
+                continue
+            por_valor = self._bitmaps.get(faceta, {})
+            uniao = np.zeros_like(self._todos)
+            for valor in valores:
+                if valor in por_valor:
+                    uniao |= por_valor[valor]
+            resultado &= uniao
+        return resultado
+
+    def contar(self, bitmap: np.ndarray, filtros: dict | None = None) -> int:
+        """Quantidade de linhas em `bitmap` que também atendem aos filtros."""
+        if filtros:
+            bitmap = bitmap & self.bitmap(filtros)
+        return int(np.bitwise_count(bitmap).sum())
+
+    def valores(self, faceta: str, bitmap: np.ndarray | None = None) -> list:
+        """Valores da faceta presentes nas linhas do bitmap, na ordem do snapshot."""
+        por_valor = self._bitmaps.get(faceta, {})
+        if bitmap is None:
+            return list(por_valor)
+        return [v for v, b in por_valor.items() if np.bitwise_and(b, bitmap).any()]
+
+    def mascara(self, bitmap: np.ndarray) -> np.ndarray:
+        return np.unpackbits(bitmap, count=self.n).astype(bool)
+
+    def selecionar(self, bitmap: np.ndarray) -> pd.DataFrame:
+        """Materializa as linhas do bitmap, preservando a ordenação por horas."""
+        return self.df[self.mascara(bitmap)]
@@ -1,13 +1,323 @@
-from database import Log, Session
+import atexit
+import queue
+import sys
+import threading
+import time
 
+from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
 
-def salvar_log_no_sqlite(message):
-    record = message.record
-    with Session() as db:
+from loguru import logger
+from sqlalchemy import Engine, delete, exists, func, select, text
+from sqlalchemy.dialects.sqlite import insert
+
+from database import FilaEscrita, Log, LogHora, Session, engine, escritor
+
+logs = Log.__table__
+logs_hora = LogHora.__table__
+
+
+def _agora_utc() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _hora(momento: datetime) -> datetime:
+    return momento.replace(minute=0, second=0, microsecond=0)
+
+
+def somar_por_hora(db, lote: list[dict]) -> None:
+    """Soma os registros do lote em `logs_hora`, um upsert por (hora, nível)."""
+    contagem = Counter((_hora(r["timestamp"]), r["level"]) for r in lote)
+    if not contagem:
+        return
+    comando = insert(logs_hora).values(
+        [{"hora": h, "level": n, "quantidade": q} for (h, n), q in contagem.items()]
+    )
+    db.execute(
+        comando.on_conflict_do_update(
+            index_elements=[logs_hora.c.hora, logs_hora.c.level],
+            set_={"quantidade": logs_hora.c.quantidade + comando.excluded.quantidade},
+        )
+    )
+
+
+# Mesmo texto que o SQLAlchemy grava num DateTime: as horas do backfill e as
+# do sink caem na mesma chave
+_PREENCHER_HORAS = text(
+    """
+INSERT INTO logs_hora (hora, level, quantidade)
+SELECT strftime('%Y-%m-%d %H:00:00.000000', timestamp), level, count(*)
+  FROM logs
+ GROUP BY 1, 2
+"""
+)
+
+
+class RetencaoLogs:
+    """Retenção da tabela `logs` do user.db.
+
+    Os logs crus ficam `retencao_dias`; as contagens por hora e nível em
+    `logs_hora` (somadas pelo sink a cada lote) ficam `retencao_horas_dias`
+    e respondem às consultas de volume sem ler `logs`. A limpeza apaga em
+    lotes de `lote` linhas pelo índice (timestamp, level), cada lote numa
+    transação curta, e devolve ao disco no máximo `paginas_vacuum` páginas
+    livres por rodada (auto_vacuum incremental). Num banco de uma versão
+    anterior, o VACUUM completo que liga o auto_vacuum incremental só roda
+    por `compactar`, a pedido do admin.
+    """
+
+    def __init__(
+        self,
+        engine: Engine = engine,
+        escritor: FilaEscrita = escritor,
+        retencao_dias: int = 30,
+        retencao_horas_dias: int = 400,
+        lote: int = 5000,
+        paginas_vacuum: int = 2000,
+    ):
+        self.engine = engine
+        self.escritor = escritor
+        self.retencao_dias = retencao_dias
+        self.retencao_horas_dias = retencao_horas_dias
+        self.lote = lote
+        self.paginas_vacuum = paginas_vacuum
+
+    def preparar(self) -> None:
+        """Cria o índice e `logs_hora` num banco de uma versão anterior.
+
+        Com `logs_hora` vazia, as contagens saem dos logs já gravados. Tem de
+        rodar antes do primeiro lote do sink, senão ele conta em dobro.
+        """
+
+        def operacao(db) -> None:
+            conexao = db.connection()
+            logs.create(conexao, checkfirst=True)
+            for indice in logs.indexes:
+                indice.create(conexao, checkfirst=True)
+            logs_hora.create(conexao, checkfirst=True)
+            if not db.execute(select(exists().select_from(logs_hora))).scalar():
+                db.execute(_PREENCHER_HORAS)
+
+        self.escritor.executar(operacao)
+
+    def aplicar(self, agora: datetime | None = None) -> dict[str, int]:
+        """Apaga o que passou da retenção e devolve parte do espaço ao disco."""
+        agora = agora or _agora_utc()
+        limite = agora - timedelta(days=self.retencao_dias)
+        limite_horas = agora - timedelta(days=self.retencao_horas_dias)
+        apagar_lote = delete(logs).where(
+            logs.c.id_log.in_(
+                select(logs.c.id_log).where(logs.c.timestamp < limite).limit(self.lote)
+            )
+        )
+        apagar_horas = delete(logs_hora).where(logs_hora.c.hora < limite_horas)
+        apagados = 0
+        while True:
+            # Um lote por transação: os logs novos entram entre um e outro
+            n = self.escritor.executar(lambda db: db.execute(apagar_lote).rowcount)
+            apagados += n
+            if n < self.lote:
+                break
+        horas = self.escritor.executar(lambda db: db.execute(apagar_horas).rowcount)
+        resultado = {"logs": apagados, "horas": horas}
+        self._devolver_espaco()
+        if apagados or horas:
+            logger.info(f"Retenção de logs aplicada: {resultado}")
+        return resultado
+
+    def _modo_vacuum(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(text("PRAGMA auto_vacuum")).scalar()
+
+    def _devolver_espaco(self) -> None:
+        # Sem auto_vacuum incremental, as páginas livres ficam para o
+        # `compactar`: um VACUUM completo não roda sozinho a cada hora
+        if self._modo_vacuum() == 2:
+            self.escritor.executar_script(
+                f"PRAGMA incremental_vacuum({self.paginas_vacuum});"
+            )
+        # As páginas movidas passam pelo WAL; sem o checkpoint ele fica grande
+        self.escritor.executar_script("PRAGMA wal_checkpoint(TRUNCATE);")
+
+    def compactar(self) -> None:
+        """VACUUM completo que liga o auto_vacuum incremental, uma vez por banco.
+
+        Reescreve o user.db inteiro e segura a fila de escrita até acabar:
+        é uma ação do admin, fora do horário de pico.
+        """
+        self.escritor.executar_script(
+            "PRAGMA auto_vacuum=INCREMENTAL; VACUUM; PRAGMA wal_checkpoint(TRUNCATE);"
+        )
+        logger.info("user.db compactado; auto_vacuum incremental ligado")
+
+    def resumo(self) -> dict[str, object]:
+        with self.engine.connect() as conn:
+            n_logs, primeiro = conn.execute(
+                select(func.count(), func.min(logs.c.timestamp))
+            ).one()
+            paginas = conn.execute(text("PRAGMA page_count")).scalar()
+            livres = conn.execute(text("PRAGMA freelist_count")).scalar()
+            pagina = conn.execute(text("PRAGMA page_size")).scalar()
+        return {
+            "logs": n_logs,
+            "desde": str(primeiro) if primeiro else None,
+            "retencao_dias": self.retencao_dias,
+            "tamanho_mb": round(paginas * pagina / 1024 / 1024, 1),
+            "livre_mb": round(livres * pagina / 1024 / 1024, 1),
+            "auto_vacuum_incremental": self._modo_vacuum() == 2,
+        }
+
+
+def contagem_por_hora(desde: datetime) -> list[tuple[datetime, str, int]]:
+    """(hora UTC, nível, quantidade) desde `desde` (UTC), lidas de `logs_hora`."""
+    with Session() as session:
+        return session.execute(
+            select(logs_hora.c.hora, logs_hora.c.level, logs_hora.c.quantidade)
+            .where(logs_hora.c.hora >= _hora(desde))
+            .order_by(logs_hora.c.hora)
+        ).all()
+
+
+def ultimos_logs(
+    niveis: Iterable[str], limite: int = 50
+) -> list[tuple[datetime, str, str]]:
+    """Os `limite` logs mais recentes dos níveis dados, pelo índice."""
+    with Session() as session:
+        return session.execute(
+            select(logs.c.timestamp, logs.c.level, logs.c.message)
+            .where(logs.c.level.in_(list(niveis)))
+            .order_by(logs.c.timestamp.desc())
+            .limit(limite)
+        ).all()
+
+
+class SinkSQLiteEmLote:
+    """Sink do loguru que grava os logs no SQLite em lotes, fora da thread do pedido.
+
+    Os registros vão para uma fila limitada; uma thread em segundo plano os
+    grava com um único INSERT em lote por transação, quando o lote enche ou
+    quando `intervalo` segundos se passam. Com a fila cheia o registro é
+    descartado (e contado) em vez de bloquear quem está a logar. A mesma
+    transação soma o lote em `logs_hora`, e a cada `reter_a_cada` segundos a
+    thread aplica a `retencao`.
+    """
+
+    def __init__(
+        self,
+        tamanho_lote: int = 200,
+        intervalo: float = 1.0,
+        limite: int = 10_000,
+        retencao: RetencaoLogs | None = None,
+        reter_a_cada: float = 3600,
+    ):
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.descartados = 0
+        self.retencao = retencao or RetencaoLogs()
+        self.reter_a_cada = reter_a_cada
+        self._fila: queue.Queue = queue.Queue(maxsize=limite)
+        self._parar = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def __call__(self, message) -> None:
+        record = message.record
+        self._iniciar()
+        try:
+            self._fila.put_nowait(
+                {
+                    "timestamp": record["time"]
+                    .astimezone(timezone.utc)
+                    .replace(tzinfo=None),
+                    "level": record["level"].name,
+                    "message": record["message"],
+                }
+            )
+        except queue.Full:
+            self.descartados += 1
+
+    def _iniciar(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._executar, name="log-sqlite", daemon=True
+                )
+                self._thread.start()
+
+    def _proximo_lote(self) -> list[dict]:
+        lote = []
+        try:
+            lote.append(self._fila.get(timeout=self.intervalo))
+            while len(lote) < self.tamanho_lote:
+                lote.append(self._fila.get_nowait())
+        except queue.Empty:
+            pass
+        return lote
+
+    def _gravar(self, lote: list[dict]) -> None:
+        def operacao(db) -> None:
+            db.execute(insert(logs), lote)
+            somar_por_hora(db, lote)
+
+        try:
+            self.retencao.escritor.executar(operacao)
+        except Exception as e:
+            sys.stderr.write(f"Erro ao gravar {len(lote)} logs no SQLite: {e}\n")
+
+    def _preparar(self) -> bool:
+        try:
+            self.retencao.preparar()
+            return True
+        except Exception as e:
+            sys.stderr.write(f"Erro ao preparar a tabela de logs: {e}\n")
+            return False
+
+    def _reter(self) -> None:
         try:
-            novo_log = Log(level=record["level"].name, message=record["message"])
-            db.add(novo_log)
-            db.commit()
-        except Exception:
-            db.rollback()
-            raise
+            self.retencao.aplicar()
+        except Exception as e:
+            sys.stderr.write(f"Erro ao aplicar a retenção dos logs: {e}\n")
+
+    def _executar(self) -> None:
+        preparado = False
+        proxima_retencao = time.monotonic()
+        while not self._parar.is_set():
+            # O schema vem antes do primeiro lote; sem ele o lote falharia.
+            # Enquanto não sai, os registros esperam na fila
+            preparado = preparado or self._preparar()
+            if not preparado:
+                self._parar.wait(self.intervalo)
+                continue
+            if lote := self._proximo_lote():
+                self._gravar(lote)
+            if time.monotonic() >= proxima_retencao:
+                proxima_retencao = time.monotonic() + self.reter_a_cada
+                self._reter()
+        # Esvazia o que restou na fila antes de encerrar
+        if not (preparado or self._preparar()):
+            sys.stderr.write(f"{self._fila.qsize()} logs não gravados no SQLite\n")
+            return
+        while lote := self._proximo_lote_sem_espera():
+            self._gravar(lote)
+
+    def _proximo_lote_sem_espera(self) -> list[dict]:
+        lote = []
+        try:
+            while len(lote) < self.tamanho_lote:
+                lote.append(self._fila.get_nowait())
+        except queue.Empty:
+            pass
+        return lote
+
+    def parar(self, timeout: float | None = 5) -> None:
+        """Grava os registros pendentes e encerra a thread."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+salvar_log_no_sqlite = SinkSQLiteEmLote()
+atexit.register(salvar_log_no_sqlite.parar)
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+from loguru import logger
+
+from http_client import cliente
+from sla import FLAGS
+
+# Colunas de poucos valores distintos, guardadas como categoria
+CATEGORICAS = ["Contrato", "CNL", "AT", "Origem", "Cabo", "BD", "Cidade_Real"]
+# Contagens que podem faltar: inteiros anuláveis (<NA> em vez de "")
+CONTAGENS = ["Reincidência", "Primárias", "Propensos - Anatel", "Reclamados - Anatel"]
+_VERDADEIROS = ["TRUE", "SIM", "S", "YES"]
+
+
+def carregar_dados_api(url: str) -> tuple[pd.DataFrame | None, str | None]:
+    """Busca as ocorrências em aberto na API e devolve (DataFrame, erro)."""
+    df_api = pd.DataFrame()
+    erro_msg = None
+
+    if url:
+        try:
+            response = cliente.get("ocorrencias", url)
+            if response.status_code == 200:
+                data = response.json()
+                if "ocorrencias" in data:
+                    df_api = pd.DataFrame(data["ocorrencias"])
+            else:
+                erro_msg = f"Erro API: {response.status_code}"
+        except Exception as e:
+            logger.error(f"Erro ao carregar dados da API: {str(e)}")
+            erro_msg = str(e)
+
+    if df_api.empty:
+        return None, erro_msg or "Sem dados disponíveis."
+
+    return normalizar_ocorrencias(df_api), None
+
+
+def _flag(valores: pd.Series) -> pd.Series:
+    """SIM/TRUE/S/YES ou número positivo -> True; o resto (e nulos) -> False."""
+    if pd.api.types.is_numeric_dtype(valores):
+        return valores.fillna(0).gt(0)
+    texto = valores.astype(str).str.strip().str.upper()
+    positivo = pd.to_numeric(valores, errors="coerce").gt(0)
+    return (texto.isin(_VERDADEIROS) | positivo) & valores.notna()
+
+
+def _contagem(valores: pd.Series) -> pd.Series:
+    """Inteiro anulável (truncado); vazio, "nan" e "None" viram <NA>.
+
+    Se sobrar texto que não é número, a coluna fica como veio da API.
+    """
+    numeros = pd.to_numeric(valores, errors="coerce")
+    falhas = numeros.isna() & valores.notna()
+    if falhas.any():
+        texto = valores[falhas].astype(str).str.strip()
+        if not texto.isin(["", "nan", "None"]).all():
+            return valores
+    numeros = numeros.to_numpy(dtype=np.float64, na_value=np.nan)
+    nulos = np.isnan(numeros)
+    inteiros = np.where(nulos, 0, numeros).astype(np.int32)
+    return pd.Series(pd.arrays.IntegerArray(inteiros, nulos), index=valores.index)
+
+
+def _categoria(valores: pd.Series) -> pd.Series:
+    """Categoria na ordem em que os valores aparecem (sem ordenar o texto)."""
+    codigos, distintos = pd.factorize(valores)
+    return pd.Series(pd.Categorical.from_codes(codigos, distintos), index=valores.index)
+
+
+def aplicar_tipos(df: pd.DataFrame) -> pd.DataFrame:
+    """Esquema compacto do snapshot, aplicado ao próprio DataFrame.
+
+    Flags como bool, colunas repetitivas como categoria, contagens como Int32
+    anulável e a abertura como datetime64 sem fuso. O texto de tela (SIM/NÃO,
+    "" para contagem vazia) só é gerado em `sla.formatar_exibicao`.
+    """
+    for coluna in FLAGS:
+        if coluna in df.columns and not pd.api.types.is_bool_dtype(df[coluna]):
+            df[coluna] = _flag(df[coluna])
+    for coluna in CONTAGENS:
+        if coluna in df.columns:
+            df[coluna] = _contagem(df[coluna])
+    for coluna in ["Afetação", "Técnicos"]:
+        if coluna in df.columns:
+            valores = pd.to_numeric(df[coluna], errors="coerce")
+            df[coluna] = valores.fillna(0).astype("int32")
+    for coluna in CATEGORICAS:
+        if coluna in df.columns and df[coluna].dtype != "category":
+            df[coluna] = _categoria(df[coluna])
+    if "Abertura" in df.columns:
+        abertura = df["Abertura"]
+        if abertura.dtype.kind != "M":
+            abertura = pd.to_datetime(abertura, errors="coerce")
+        if abertura.dt.tz is not None:
+            abertura = abertura.dt.tz_localize(None)
+        df["Abertura"] = abertura
+    return df
+
+
+def normalizar_ocorrencias(df_api: pd.DataFrame) -> pd.DataFrame:
+    """Renomeia as colunas cruas da API de ocorrências e aplica `aplicar_tipos`."""
+    if "ocorrencia" in df_api.columns:
+        df_api["ocorrencia"] = df_api["ocorrencia"].astype(int)
+        df_api = df_api.drop_duplicates(subset=["ocorrencia"], keep="last")
+
+    rename_map = {
+        "ocorrencia": "Ocorrência",
+        "data_abertura": "Abertura",
+        "contrato": "Contrato",
+        "cnl": "CNL",
+        "at": "AT",
+        "afetacao": "Afetação",
+        "vip": "VIP",
+        "cond_alto_valor": "Cond. Alto Valor",
+        "b2b_avancado": "B2B",
+        "tecnicos": "Técnicos",
+        "origem": "Origem",
+        "cabo": "Cabo",
+        "primarias": "Primárias",
+        "bd": "BD",
+        "propenso_anatel": "Propensos - Anatel",
+        "reclamado_anatel": "Reclamados - Anatel",
+        "reincidencia": "Reincidência",
+        "municipio": "Cidade_Real",
+    }
+    df_api = df_api.rename(columns=rename_map)
+
+    if "Reincidência" not in df_api.columns:
+        df_api["Reincidência"] = pd.NA
+
+    # Só o primeiro equipamento é usado: as listas não ficam no snapshot
+    if "equipamentos" in df_api.columns:
+        df_api["Cabo/Primária"] = [
+            str(x[0]).strip() if isinstance(x, list) and len(x) > 0 else "-"
+            for x in df_api.pop("equipamentos")
+        ]
+    else:
+        df_api["Cabo/Primária"] = "-"
+
+    if "Técnicos" in df_api.columns:
+        df_api["Técnicos"] = [
+            len(x) if isinstance(x, list) else 0 for x in df_api["Técnicos"]
+        ]
+
+    return aplicar_tipos(df_api)
@@ -0,0 +1,210 @@
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_RANKING = ["Primária", "AT", "Município", "Volume (Falhas)", "Ocorrências"]
+# Linhas do ranking mostradas na tela; o resto só entra nas agregações
+LIMITE_RANKING = 500
+# Maior range do slider: é o único pedido à API, os menores saem dele
+RANGE_MAXIMO = 365
+
+
+def normalizar_ats(ats: Iterable[str] | None) -> list[str]:
+    """Siglas do filtro de AT em maiúsculas, sem vazios ("SJ, ,tt" -> SJ, TT)."""
+    return [a.strip().upper() for a in ats or [] if a and a.strip()]
+
+
+@dataclass(frozen=True)
+class JanelaOfensores:
+    """Ranking de uma janela de dias: volumes, fim das ocorrências e índice."""
+
+    volumes: np.ndarray
+    fim: np.ndarray
+    ordem: np.ndarray
+    por_at: dict[str, np.ndarray]
+
+    @classmethod
+    def construir(
+        cls,
+        volumes: np.ndarray,
+        fim: np.ndarray,
+        at_codigo: np.ndarray,
+        siglas: np.ndarray,
+    ) -> "JanelaOfensores":
+        # Ranking estável: volume desc., empates na ordem da API; sem volume, fora
+        ordem = np.argsort(-volumes, kind="stable")
+        ordem = ordem[volumes[ordem] > 0]
+        # Índice invertido: postos agrupados por AT, cada grupo já em ordem
+        codigos = at_codigo[ordem]
+        agrupado = np.argsort(codigos, kind="stable")
+        cortes = np.cumsum(np.bincount(codigos, minlength=len(siglas)))[:-1]
+        return cls(
+            volumes=volumes,
+            fim=fim,
+            ordem=ordem,
+            por_at=dict(zip(map(str, siglas), np.split(agrupado, cortes))),
+        )
+
+
+@dataclass(frozen=True)
+class TabelaOfensores:
+    """Payload de ofensores achatado em arrays, com índice invertido por AT.
+
+    Há uma linha por primária (`primarias`, `ats`, `municipios`, `contagens`)
+    e uma por (primária, ocorrência) em `oc_*`; `inicio` é o offset de cada
+    primária nas colunas de ocorrência, que ficam ordenadas por idade (dias
+    desde `carregado_em`) dentro da primária. Assim o volume de uma janela
+    de N dias é só o número de ocorrências antes do corte em cada segmento,
+    achado por busca binária, e a API é chamada uma vez com o range máximo.
+    Cada janela pedida é ranqueada uma vez e guardada em `_janelas`.
+    """
+
+    primarias: np.ndarray
+    ats: np.ndarray
+    siglas: np.ndarray
+    at_codigo: np.ndarray
+    municipios: np.ndarray
+    contagens: np.ndarray
+    inicio: np.ndarray
+    oc_id: np.ndarray
+    oc_at: np.ndarray
+    oc_idade: np.ndarray
+    carregado_em: datetime
+    tem_datas: bool
+    _janelas: dict = field(default_factory=dict, repr=False, compare=False)
+
+    @classmethod
+    def construir(
+        cls, dados_json: list[dict], carregado_em: datetime | None = None
+    ) -> "TabelaOfensores":
+        carregado_em = carregado_em or datetime.now()
+        primarias, ats, municipios, contagens, tamanhos = [], [], [], [], []
+        oc_id, oc_at, oc_data = [], [], []
+        for item in dados_json:
+            ocorrencias = item.get("ocorrencias") or []
+            primeira = ocorrencias[0] if ocorrencias else {}
+            primarias.append(item.get("primaria", ""))
+            # A AT da primária é a da primeira ocorrência, como no filtro antigo
+            ats.append(str(primeira.get("at") or "").strip().upper())
+            municipios.append(primeira.get("municipio", ""))
+            contagens.append(item.get("count", 0))
+            tamanhos.append(len(ocorrencias))
+            for oc in ocorrencias:
+                oc_id.append(str(oc.get("id_ocorrencia")))
+                oc_at.append(str(oc.get("at") or "").strip().upper())
+                oc_data.append(oc.get("data_ocorrencia"))
+
+        ats = np.asarray(ats, dtype=object)
+        siglas, at_codigo = np.unique(ats, return_inverse=True)
+        tamanhos = np.asarray(tamanhos, dtype=np.int64)
+        oc_primaria = np.repeat(np.arange(len(tamanhos)), tamanhos)
+        datas = pd.to_datetime(pd.Series(oc_data, dtype=object), errors="coerce")
+        if datas.dt.tz is not None:
+            datas = datas.dt.tz_convert(None)
+        idade = ((pd.Timestamp(carregado_em) - datas) / pd.Timedelta(days=1)).to_numpy(
+            dtype=np.float64, na_value=np.nan
+        )
+        tem_datas = bool(np.isfinite(idade).any())
+        # Sem data a ocorrência conta em qualquer janela
+        idade = np.clip(np.nan_to_num(idade, nan=0.0), 0.0, None)
+        # Ocorrências de cada primária da mais recente para a mais antiga
+        ordem_oc = np.lexsort((idade, oc_primaria))
+
+        return cls(
+            primarias=np.asarray(primarias, dtype=object),
+            ats=ats,
+            siglas=siglas,
+            at_codigo=at_codigo,
+            municipios=np.asarray(municipios, dtype=object),
+            contagens=np.asarray(contagens, dtype=np.int64),
+            inicio=np.concatenate(([0], np.cumsum(tamanhos))),
+            oc_id=np.asarray(oc_id, dtype=object)[ordem_oc],
+            oc_at=np.asarray(oc_at, dtype=object)[ordem_oc],
+            oc_idade=idade[ordem_oc],
+            carregado_em=carregado_em,
+            tem_datas=tem_datas,
+        )
+
+    def __len__(self) -> int:
+        return len(self.primarias)
+
+    def janela(self, dias: int | None = None) -> JanelaOfensores:
+        """Ranking das ocorrências dos últimos `dias` (None: o `count` da API)."""
+        chave = dias if self.tem_datas else None
+        janela = self._janelas.get(chave)
+        if janela is None:
+            if chave is None:
+                volumes, fim = self.contagens, self.inicio[1:]
+            else:
+                # Chave composta (primária, idade) é crescente no array inteiro
+                escala = float(max(self.oc_idade.max(initial=0.0), chave) + 1)
+                oc_primaria = np.repeat(np.arange(len(self)), np.diff(self.inicio))
+                fim = np.searchsorted(
+                    oc_primaria * escala + self.oc_idade,
+                    np.arange(len(self)) * escala + chave,
+                    side="left",
+                )
+                volumes = fim - self.inicio[:-1]
+            janela = JanelaOfensores.construir(
+                volumes, fim, self.at_codigo, self.siglas
+            )
+            self._janelas[chave] = janela
+        return janela
+
+    def selecionar(
+        self,
+        ats: Iterable[str] | None = None,
+        top: int | None = None,
+        dias: int | None = None,
+    ) -> np.ndarray:
+        """Índices das primárias das ATs pedidas (todas, se vazio), por ranking."""
+        janela = self.janela(dias)
+        filtro = normalizar_ats(ats)
+        if not filtro:
+            postos = np.arange(len(janela.ordem))
+        else:
+            vazio = np.empty(0, dtype=np.int64)
+            postos = np.concatenate([janela.por_at.get(a, vazio) for a in filtro])
+            if len(filtro) > 1:
+                postos = np.unique(postos)
+        if top is not None and len(postos) > top:
+            postos = np.sort(np.partition(postos, top - 1)[:top])
+        return janela.ordem[postos]
+
+    def ranking(
+        self,
+        ats: Iterable[str] | None = None,
+        top: int | None = None,
+        dias: int | None = None,
+    ) -> pd.DataFrame:
+        """Ranking de primárias ofensoras; as ocorrências só são juntadas no top-k."""
+        idx = self.selecionar(ats, top, dias)
+        if len(idx) == 0:
+            return pd.DataFrame()
+        janela = self.janela(dias)
+        return pd.DataFrame(
+            {
+                "Primária": self.primarias[idx],
+                "AT": self.ats[idx],
+                "Município": self.municipios[idx],
+                "Volume (Falhas)": janela.volumes[idx],
+                "Ocorrências": [
+                    ", ".join(self.oc_id[self.inicio[i] : janela.fim[i]]) for i in idx
+                ],
+            },
+            columns=COLUNAS_RANKING,
+        )
+
+    def falhas_por_at(
+        self, ats: Iterable[str] | None = None, dias: int | None = None
+    ) -> pd.Series:
+        """Soma do volume das primárias selecionadas, por AT."""
+        idx = self.selecionar(ats, dias=dias)
+        volumes = self.janela(dias).volumes[idx]
+        return pd.Series(volumes, index=self.ats[idx]).groupby(level=0).sum()
+
+    def total(self, ats: Iterable[str] | None = None, dias: int | None = None) -> int:
+        return len(self.selecionar(ats, dias=dias))
@@ -0,0 +1,122 @@
+import builtins
+import os
+import sys
+import threading
+import time
+
+from collections import deque
+from datetime import datetime
+
+
+class PerfilImportacao:
+    """Cronometra importações (à moda do `python -X importtime`) dentro do processo.
+
+    Só mede com SIGMAOPS_PERFIL_IMPORTACAO=1 no ambiente: sem isso o
+    `__import__` do processo fica intocado e os registros ficam vazios.
+
+    `instalar()` troca `builtins.__import__` por uma versão que só mede
+    módulos ainda ausentes de `sys.modules`; importações já em cache seguem
+    direto para o original. O tempo de cada módulo novo é somado à execução
+    do script corrente (uma por rerun, por thread), então o primeiro registro
+    é o arranque a frio e os seguintes mostram o que cada rerun ainda paga.
+    """
+
+    def __init__(self, historico: int = 50):
+        self.execucoes: deque[dict] = deque(maxlen=historico)
+        self._modulos: dict[str, tuple[float, float]] = {}  # (próprio, acumulado)
+        self._arranque: dict | None = None
+        self._arranque_iniciado = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._original = None
+
+    @property
+    def instalado(self) -> bool:
+        return self._original is not None
+
+    def instalar(self) -> None:
+        with self._lock:
+            if self._original is not None:
+                return
+            self._original = builtins.__import__
+            builtins.__import__ = self._importar
+        # Tudo o que a thread importar até o primeiro iniciar_execucao() é arranque
+        self._arranque = self._novo_registro()
+        self._local.execucao = self._arranque
+
+    def _novo_registro(self) -> dict:
+        registro = {"inicio": datetime.now(), "importacao_s": 0.0, "modulos": 0}
+        with self._lock:
+            self.execucoes.append(registro)
+        return registro
+
+    def iniciar_execucao(self) -> None:
+        """Abre o registro do rerun; chamado no topo do app.py, após os imports."""
+        if not self.instalado:
+            return
+        execucao = getattr(self._local, "execucao", None)
+        if execucao is self._arranque and not self._arranque_iniciado:
+            # Primeira execução do script: continua somando no registro de arranque
+            self._arranque_iniciado = True
+            return
+        self._local.execucao = self._novo_registro()
+
+    def _importar(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+
+        pilha = getattr(self._local, "pilha", None)
+        if pilha is None:
+            pilha = self._local.pilha = []
+        pilha.append(0.0)  # tempo gasto nos imports aninhados
+        inicio = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - inicio
+            filhos = pilha.pop()
+            if pilha:
+                pilha[-1] += total
+            if name in sys.modules:
+                with self._lock:
+                    self._modulos[name] = (total - filhos, total)
+                registro = getattr(self._local, "execucao", None)
+                if registro is not None:
+                    registro["modulos"] += 1
+                    if not pilha:
+                        registro["importacao_s"] += total
+
+    @property
+    def arranque_ms(self) -> float | None:
+        return None if self._arranque is None else 1000 * self._arranque["importacao_s"]
+
+    def modulos(self, top: int = 15) -> list[dict]:
+        """Módulos mais caros por tempo acumulado, para o painel de administração."""
+        with self._lock:
+            itens = sorted(self._modulos.items(), key=lambda i: i[1][1], reverse=True)
+        return [
+            {
+                "Módulo": nome,
+                "Próprio (ms)": round(1000 * proprio, 1),
+                "Acumulado (ms)": round(1000 * acumulado, 1),
+            }
+            for nome, (proprio, acumulado) in itens[:top]
+        ]
+
+    def historico(self) -> list[dict]:
+        """Custo de importação de cada execução do script, da mais recente para trás."""
+        with self._lock:
+            registros = list(self.execucoes)
+        return [
+            {
+                "Início": r["inicio"].strftime("%H:%M:%S"),
+                "Importações (ms)": round(1000 * r["importacao_s"], 1),
+                "Módulos novos": r["modulos"],
+            }
+            for r in reversed(registros)
+        ]
+
+
+perfil = PerfilImportacao()
+if os.environ.get("SIGMAOPS_PERFIL_IMPORTACAO") == "1":
+    perfil.instalar()
@@ -0,0 +1,158 @@
+import threading
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import pandas as pd
+from loguru import logger
+
+from cdc import DiffSnapshot, calcular_hashes, comparar_snapshots
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Última fotografia válida das ocorrências, compartilhada entre sessões."""
+
+    df: pd.DataFrame | None
+    erro: str | None
+    atualizado_em: datetime | None
+    versao: int = 0
+    hashes: pd.Series | None = None
+    diff: DiffSnapshot | None = None
+    indice: object | None = None
+
+    def idade_segundos(self) -> float | None:
+        if self.atualizado_em is None:
+            return None
+        return (datetime.now(timezone.utc) - self.atualizado_em).total_seconds()
+
+
+class SnapshotPoller:
+    """Atualiza o snapshot em segundo plano (stale-while-revalidate).
+
+    Uma única thread por processo chama `buscar` a cada `intervalo` segundos e
+    troca atomicamente a referência do snapshot. Os leitores recebem sempre o
+    último snapshot válido, sem esperar pela API; em caso de falha o dado
+    anterior é mantido e apenas o erro é registrado. Se informado, `preparar`
+    roda na mesma thread sobre cada snapshot novo, com o que preparou para o
+    snapshot anterior e o diff entre os dois (o índice só é reaproveitado
+    quando nada mudou), e `registrar` recebe (df, instante, hashes) para
+    guardar o histórico.
+    """
+
+    def __init__(
+        self,
+        buscar: Callable[[], tuple[pd.DataFrame | None, str | None]],
+        intervalo: float = 60,
+        preparar: Callable[[pd.DataFrame, object, DiffSnapshot | None], object]
+        | None = None,
+        registrar: Callable[[pd.DataFrame, datetime, pd.Series], object] | None = None,
+    ):
+        self._buscar = buscar
+        self._preparar = preparar
+        self._registrar = registrar
+        self.intervalo = intervalo
+        self._snapshot = Snapshot(df=None, erro=None, atualizado_em=None)
+        self._primeira_carga = threading.Event()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def iniciar(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._executar, name="snapshot-poller", daemon=True
+        )
+        self._thread.start()
+
+    def parar(self, timeout: float | None = None) -> None:
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def atualizar_agora(self) -> None:
+        """Antecipa a próxima atualização sem bloquear quem pediu."""
+        self._acordar.set()
+
+    def snapshot(self, timeout: float | None = 30) -> Snapshot:
+        """Devolve o snapshot atual; só espera na primeira carga do processo."""
+        self._primeira_carga.wait(timeout)
+        return self._snapshot
+
+    def _atualizar(self) -> None:
+        atual = self._snapshot
+        try:
+            df, erro = self._buscar()
+        except Exception as e:
+            logger.error(f"Erro no poller de ocorrências: {e}")
+            df, erro = None, str(e)
+
+        if df is not None:
+            agora = datetime.now(timezone.utc)
+            hashes, diff = self._comparar(atual, df, agora)
+            indice = None
+            if self._preparar is not None:
+                try:
+                    indice = self._preparar(df, atual.indice, diff)
+                except Exception as e:
+                    logger.error(f"Erro ao preparar snapshot: {e}")
+            if self._registrar is not None:
+                try:
+                    self._registrar(df, agora, hashes)
+                except Exception as e:
+                    logger.error(f"Erro ao gravar o histórico de snapshots: {e}")
+            self._snapshot = Snapshot(
+                df=df,
+                erro=None,
+                atualizado_em=agora,
+                versao=atual.versao + 1,
+                hashes=hashes,
+                diff=diff,
+                indice=indice,
+            )
+        else:
+            # Mantém o último dado válido e apenas registra o erro
+            self._snapshot = Snapshot(
+                df=atual.df,
+                erro=erro,
+                atualizado_em=atual.atualizado_em,
+                versao=atual.versao,
+                hashes=atual.hashes,
+                indice=atual.indice,
+            )
+
+    def _comparar(
+        self, atual: Snapshot, df: pd.DataFrame, agora: datetime
+    ) -> tuple[pd.Series | None, DiffSnapshot | None]:
+        """Hashes do snapshot novo e o diff para o atual (None se falharem)."""
+        try:
+            hashes = calcular_hashes(df)
+        except Exception as e:
+            logger.error(f"Erro ao calcular os hashes do snapshot: {e}")
+            return None, None
+        if atual.hashes is None or hashes is None:
+            return hashes, None
+        try:
+            diff = comparar_snapshots(
+                atual.df, atual.hashes, atual.atualizado_em, df, hashes, agora
+            )
+        except Exception as e:
+            logger.error(f"Erro ao comparar snapshots: {e}")
+            return hashes, None
+        logger.debug(f"Mudanças no snapshot: {diff.resumo()}")
+        return hashes, diff
+
+    def _executar(self) -> None:
+        while not self._parar.is_set():
+            try:
+                self._atualizar()
+            except Exception as e:
+                # A thread não pode morrer: o painel ficaria congelado
+                logger.error(f"Erro inesperado no poller de ocorrências: {e}")
+            # Mesmo com erro, quem espera a primeira carga não fica preso
+            self._primeira_carga.set()
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
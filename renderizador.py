@@ -0,0 +1,234 @@
+import io
+
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from PIL import Image, ImageDraw, ImageFont
+
+from sla import LIMITE_B2B, LIMITE_CRITICO, LIMITE_PADRAO, flag_sim
+
+C_BG, C_BORDER, C_TEXT, C_LABEL = "#ffffff", "#e2e8f0", "#1e293b", "#64748b"
+C_RED, C_YELLOW, C_GREEN, C_GV = "#dc2626", "#d97706", "#16a34a", "#2563eb"
+C_ROXO, C_SUBTITULO = "#7c3aed", "#475569"
+
+# Formato -> (opções do Pillow, mime, extensão). WebP fica bem menor para o WhatsApp.
+FORMATOS = {
+    "jpeg": (
+        {"format": "JPEG", "quality": 85, "optimize": True, "progressive": True},
+        "image/jpeg",
+        "jpg",
+    ),
+    "webp": ({"format": "WEBP", "quality": 80, "method": 2}, "image/webp", "webp"),
+}
+
+# Cards: mesmas coordenadas (eixo 0-100) do antigo layout em matplotlib
+LARGURA_CARDS = 1200
+ESCALA_X, ESCALA_Y = LARGURA_CARDS / 100, 11
+CARDS_FIXOS = [
+    ((2, 68, 46, 18), "Total", "total", C_TEXT),
+    ((52, 68, 46, 18), "S/ Técnico", "sem_tec", C_TEXT),
+    ((2, 42, 30, 18), "Crítico", "critico", C_RED),
+    ((35, 42, 30, 18), "Fora do Prazo", "fora", C_YELLOW),
+    ((68, 42, 30, 18), "No Prazo", "no_prazo", C_GREEN),
+]
+CARDS_REGIOES = [
+    ((2, 16, 46, 18), "Litoral", "lit", C_TEXT),
+    ((52, 16, 46, 18), "Vale", "vale", C_TEXT),
+]
+
+# Lista: 100 px por polegada da figura original (17 pol. de largura)
+LARGURA_LISTA = 1700
+ALTURA_TITULO, ALTURA_LINHA, MARGEM = 130, 46, 20
+
+
+@lru_cache(maxsize=16)
+def fonte(tamanho: int, negrito: bool = True) -> ImageFont.FreeTypeFont:
+    # A DejaVu vem com o matplotlib; só o caminho é usado, sem carregar o pyplot
+    import matplotlib
+
+    nome = "DejaVuSans-Bold.ttf" if negrito else "DejaVuSans.ttf"
+    caminho = Path(matplotlib.get_data_path()) / "fonts" / "ttf" / nome
+    return ImageFont.truetype(str(caminho), tamanho)
+
+
+def codificar(img: Image.Image, formato: str = "jpeg") -> bytes:
+    opcoes, _, _ = FORMATOS[formato]
+    buf = io.BytesIO()
+    img.save(buf, **opcoes)
+    return buf.getvalue()
+
+
+def _caixa(x, y, w, h, y_topo, sobre=1):
+    """Converte (x, y, w, h) do eixo 0-100 (y para cima) em pixels."""
+    return (
+        x * ESCALA_X * sobre,
+        (y_topo - y - h) * ESCALA_Y * sobre,
+        (x + w) * ESCALA_X * sobre,
+        (y_topo - y) * ESCALA_Y * sobre,
+    )
+
+
+def _cards(com_regioes: bool):
+    return CARDS_FIXOS + (CARDS_REGIOES if com_regioes else [])
+
+
+@lru_cache(maxsize=2)
+def _template_cards(com_regioes: bool) -> Image.Image:
+    """Fundo, caixas e rótulos dos cards, desenhados uma vez em 2x e reduzidos."""
+    y_min = 14 if com_regioes else 40
+    sobre = 2
+    img = Image.new(
+        "RGB",
+        (LARGURA_CARDS * sobre, int((100 - y_min) * ESCALA_Y * sobre)),
+        C_BG,
+    )
+    draw = ImageDraw.Draw(img)
+    draw.text(
+        (50 * ESCALA_X * sobre, 4 * ESCALA_Y * sobre),
+        "SIGMA OPS",
+        fill=C_ROXO,
+        font=fonte(44 * sobre),
+        anchor="ms",
+    )
+    for (x, y, w, h), rotulo, _, _ in _cards(com_regioes):
+        x0, y0, x1, y1 = _caixa(x, y, w, h, 100, sobre)
+        draw.rounded_rectangle(
+            (x0, y0, x1, y1),
+            radius=24 * sobre,
+            fill="white",
+            outline=C_BORDER,
+            width=3 * sobre,
+        )
+        draw.text(
+            ((x0 + x1) / 2, (100 - y - h * 0.8) * ESCALA_Y * sobre),
+            rotulo.upper(),
+            fill=C_LABEL,
+            font=fonte(25 * sobre),
+            anchor="ms",
+        )
+    return img.resize((img.width // sobre, img.height // sobre), Image.LANCZOS)
+
+
+def renderizar_cards(
+    kpis: dict, contrato: str, momento: datetime, formato: str = "jpeg"
+) -> bytes:
+    """Cards de KPI: carimba contrato, horário e valores sobre o template."""
+    com_regioes = contrato == "ABILITY_SJ"
+    img = _template_cards(com_regioes).copy()
+    draw = ImageDraw.Draw(img)
+    draw.text(
+        (50 * ESCALA_X, 8 * ESCALA_Y),
+        f"{contrato} • {momento.strftime('%H:%M')}",
+        fill=C_SUBTITULO,
+        font=fonte(31),
+        anchor="ms",
+    )
+    for (x, y, w, h), _, chave, cor in _cards(com_regioes):
+        draw.text(
+            ((x + w / 2) * ESCALA_X, (100 - y - h * 0.4) * ESCALA_Y),
+            str(kpis[chave]),
+            fill=cor,
+            font=fonte(76),
+            anchor="ms",
+        )
+    return codificar(img, formato)
+
+
+def cores_linhas(df_cor: pd.DataFrame) -> np.ndarray:
+    """Cor do texto de cada linha da lista: faixa de SLA, com GV por cima."""
+    n = len(df_cor)
+    horas = (
+        df_cor["horas_float"].to_numpy(dtype=float)
+        if "horas_float" in df_cor
+        else np.zeros(n)
+    )
+    limite = np.where(flag_sim(df_cor, "B2B"), LIMITE_B2B, LIMITE_PADRAO)
+    cores = np.select(
+        [horas > LIMITE_CRITICO, horas > limite], [C_RED, C_YELLOW], C_GREEN
+    ).astype(object)
+    if "Afetação" in df_cor:
+        cores[df_cor["Afetação"].to_numpy() >= 100] = C_GV
+    return cores
+
+
+def _ajustar(texto: str, largura: float, f: ImageFont.FreeTypeFont) -> str:
+    if f.getlength(texto) <= largura:
+        return texto
+    while texto and f.getlength(texto + "…") > largura:
+        texto = texto[:-1]
+    return texto + "…"
+
+
+@lru_cache(maxsize=32)
+def _template_lista(colunas: tuple[str, ...], linhas: int) -> Image.Image:
+    """Cabeçalho roxo e grelha da tabela para `linhas` linhas."""
+    largura_col = (LARGURA_LISTA - 2 * MARGEM) / len(colunas)
+    altura = ALTURA_TITULO + ALTURA_LINHA * (linhas + 1) + MARGEM
+    img = Image.new("RGB", (LARGURA_LISTA, altura), C_BG)
+    draw = ImageDraw.Draw(img)
+    topo = ALTURA_TITULO
+    draw.rectangle(
+        (MARGEM, topo, LARGURA_LISTA - MARGEM, topo + ALTURA_LINHA), fill=C_ROXO
+    )
+    for j, nome in enumerate(colunas):
+        cx = MARGEM + largura_col * (j + 0.5)
+        draw.text(
+            (cx, topo + ALTURA_LINHA / 2),
+            _ajustar(nome, largura_col - 8, fonte(16)),
+            fill="white",
+            font=fonte(16),
+            anchor="mm",
+        )
+    for i in range(1, linhas + 2):
+        y = topo + ALTURA_LINHA * i
+        draw.line((MARGEM, y, LARGURA_LISTA - MARGEM, y), fill=C_BORDER, width=1)
+    for j in range(len(colunas) + 1):
+        x = MARGEM + largura_col * j
+        draw.line(
+            (x, topo + ALTURA_LINHA, x, topo + ALTURA_LINHA * (linhas + 1)),
+            fill=C_BORDER,
+            width=1,
+        )
+    return img
+
+
+def renderizar_pagina_lista(
+    df_chunk: pd.DataFrame,
+    df_cor: pd.DataFrame,
+    contrato: str,
+    momento: datetime,
+    i: int,
+    num_paginas: int,
+    formato: str = "jpeg",
+) -> bytes:
+    """Uma página da lista: título e células carimbados sobre o template."""
+    colunas = tuple(str(c) for c in df_chunk.columns)
+    img = _template_lista(colunas, len(df_chunk)).copy()
+    draw = ImageDraw.Draw(img)
+
+    subtitulo = momento.strftime("%d/%m • %H:%M")
+    if num_paginas > 1:
+        subtitulo += f" (Pág {i + 1}/{num_paginas})"
+    for y, texto in ((55, f"SIGMA OPS: {contrato}"), (100, subtitulo)):
+        draw.text(
+            (LARGURA_LISTA / 2, y), texto, fill=C_TEXT, font=fonte(38), anchor="ms"
+        )
+
+    largura_col = (LARGURA_LISTA - 2 * MARGEM) / len(colunas)
+    f = fonte(15)
+    valores = df_chunk.to_numpy(dtype=object)
+    for r, (linha, cor) in enumerate(zip(valores, cores_linhas(df_cor))):
+        cy = ALTURA_TITULO + ALTURA_LINHA * (r + 1.5)
+        for j, texto in enumerate(linha):
+            draw.text(
+                (MARGEM + largura_col * (j + 0.5), cy),
+                _ajustar(str(texto), largura_col - 8, f),
+                fill=cor,
+                font=f,
+                anchor="mm",
+            )
+    return codificar(img, formato)
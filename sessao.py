@@ -0,0 +1,44 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+
+def _b64(dados: bytes) -> str:
+    return base64.urlsafe_b64encode(dados).rstrip(b"=").decode("ascii")
+
+
+def _de_b64(texto: str) -> bytes:
+    return base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4))
+
+
+def _assinar(corpo: str, segredo: str) -> str:
+    return _b64(hmac.new(segredo.encode(), corpo.encode(), hashlib.sha256).digest())
+
+
+def gerar_token(claims: dict, segredo: str, validade_s: int = 1800) -> str:
+    """Token de sessão assinado (HMAC-SHA256) com as claims e a expiração."""
+    agora = int(time.time())
+    payload = {**claims, "iat": agora, "exp": agora + validade_s}
+    corpo = _b64(json.dumps(payload, separators=(",", ":")).encode())
+    return f"{corpo}.{_assinar(corpo, segredo)}"
+
+
+def validar_token(token: str, segredo: str) -> dict | None:
+    """Devolve as claims se a assinatura confere e o token não expirou."""
+    try:
+        corpo, assinatura = token.split(".")
+        if not hmac.compare_digest(assinatura, _assinar(corpo, segredo)):
+            return None
+        claims = json.loads(_de_b64(corpo))
+    except (ValueError, AttributeError):
+        return None
+    if claims.get("exp", 0) <= time.time():
+        return None
+    return claims
+
+
+def precisa_renovar(claims: dict, margem_s: int = 600) -> bool:
+    """True quando faltam menos de `margem_s` segundos para o token expirar."""
+    return claims["exp"] - time.time() < margem_s
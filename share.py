@@ -0,0 +1,140 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from loguru import logger
+
+from sla import sigla_at
+
+# Nomes em que a base de share já foi entregue, por ordem de preferência
+ARQUIVOS_SHARE = [
+    "share_at_sj.csv",
+    "SHARE_AT_SJ.csv",
+    "SHARE_AT_SJC_JAI.xlsx",
+    "SHARE_AT_SJC_JAI.xlsx - SHARE_AT_SJ.csv",
+    "SHARE_AT_SJC_JAI.xlsx - SHARE_AT _JAI.csv",
+]
+COLUNAS_SHARE = ["num_MesAno", "nom_AreaTelefonica", "qtd_Acessos"]
+
+
+def localizar_share(diretorio: Path | None = None) -> tuple[Path, int] | None:
+    """Primeiro ficheiro de share existente e o seu mtime (chave do cache)."""
+    diretorio = diretorio or Path.cwd()
+    for nome in ARQUIVOS_SHARE:
+        caminho = diretorio / nome
+        if caminho.is_file():
+            return caminho, caminho.stat().st_mtime_ns
+    return None
+
+
+def _acessos_inteiros(serie: pd.Series) -> pd.Series:
+    # No CSV o ponto é separador de milhar ("2.030" = 2030); no xlsx já vem número
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.fillna(0).round().astype("int64")
+    texto = serie.astype(str).str.strip().str.replace(".", "", regex=False)
+    return pd.to_numeric(texto, errors="coerce").fillna(0).astype("int64")
+
+
+@dataclass(frozen=True)
+class IndiceShare:
+    """Acessos por (mês, AT) num array denso, com posições em dicionários.
+
+    `meses` (AAAAMM, crescente) e `ats` são os eixos da matriz `acessos`;
+    a busca de um par é O(1) e a de várias ATs é um único fancy indexing.
+    """
+
+    meses: np.ndarray
+    ats: np.ndarray
+    acessos: np.ndarray
+    _pos_mes: dict[int, int] = field(repr=False)
+    _pos_at: dict[str, int] = field(repr=False)
+
+    @classmethod
+    def construir(cls, df: pd.DataFrame) -> "IndiceShare":
+        df = df.rename(columns=lambda c: str(c).strip()).dropna(subset=COLUNAS_SHARE)
+        mes_ano = pd.to_numeric(df["num_MesAno"], errors="coerce").astype("Int64")
+        # num_MesAno vem como MAAAA/MMAAAA (12025 = jan/2025)
+        mes = (mes_ano % 10000) * 100 + mes_ano // 10000
+        base = pd.DataFrame(
+            {
+                "mes": mes,
+                "at": sigla_at(df["nom_AreaTelefonica"]),
+                "acessos": _acessos_inteiros(df["qtd_Acessos"]),
+            }
+        ).dropna()
+        tabela = base.pivot_table(
+            index="mes", columns="at", values="acessos", aggfunc="sum", fill_value=0
+        ).sort_index()
+        meses = tabela.index.to_numpy(dtype=np.int64)
+        ats = tabela.columns.to_numpy(dtype=object)
+        return cls(
+            meses=meses,
+            ats=ats,
+            acessos=tabela.to_numpy(dtype=np.int64),
+            _pos_mes={int(m): i for i, m in enumerate(meses)},
+            _pos_at={str(a): j for j, a in enumerate(ats)},
+        )
+
+    @classmethod
+    def ler(cls, caminho: Path) -> "IndiceShare":
+        if caminho.suffix.lower() == ".xlsx":
+            df = pd.read_excel(caminho)
+        else:
+            df = pd.read_csv(caminho, sep=";", dtype=str)
+        indice = cls.construir(df)
+        logger.info(
+            f"Share carregado de {caminho.name}: {len(indice.ats)} ATs, "
+            f"{len(indice.meses)} meses (mais recente {indice.mes_recente})"
+        )
+        return indice
+
+    @property
+    def mes_recente(self) -> int | None:
+        return int(self.meses[-1]) if len(self.meses) else None
+
+    @property
+    def rotulo_mes_recente(self) -> str:
+        mes = self.mes_recente
+        return f"{mes % 100:02d}/{mes // 100}" if mes else "-"
+
+    def acessos_at(self, at: str, mes: int | None = None) -> int:
+        """Acessos de uma AT no mês (por padrão, o mais recente); 0 se não houver."""
+        i = self._pos_mes.get(mes if mes is not None else self.mes_recente)
+        j = self._pos_at.get(at)
+        if i is None or j is None:
+            return 0
+        return int(self.acessos[i, j])
+
+    def por_mil_acessos(
+        self, contagem: pd.Series, rotulo: str, mes: int | None = None
+    ) -> pd.DataFrame:
+        """Junta contagens por sigla de AT aos acessos e calcula a taxa por 1.000.
+
+        ATs sem acessos na base ficam com a taxa vazia em vez de infinita.
+        """
+        i = self._pos_mes.get(mes if mes is not None else self.mes_recente)
+        pos = np.array(
+            [self._pos_at.get(str(a), -1) for a in contagem.index], dtype=np.int64
+        )
+        acessos = np.zeros(len(pos), dtype=np.int64)
+        if i is not None:
+            achou = pos >= 0
+            acessos[achou] = self.acessos[i, pos[achou]]
+        qtd = contagem.to_numpy(dtype=np.int64)
+        taxa = np.divide(
+            1000 * qtd, acessos, out=np.full(len(qtd), np.nan), where=acessos > 0
+        )
+        return (
+            pd.DataFrame(
+                {
+                    "AT": contagem.index.astype(str),
+                    rotulo: qtd,
+                    "Acessos": acessos,
+                    "Por 1.000 acessos": np.round(taxa, 2),
+                }
+            )
+            .sort_values("Por 1.000 acessos", ascending=False, na_position="last")
+            .reset_index(drop=True)
+        )
@@ -0,0 +1,244 @@
+from collections.abc import Iterable
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Limites de SLA (em horas)
+LIMITE_B2B = 4
+LIMITE_PADRAO = 8
+LIMITE_CRITICO = 24
+
+# Faixas de escalonamento da EPS (em horas), da mais alta para a mais baixa
+FAIXAS_EPS = [
+    (7, "🚨 E-MAIL(EPS)"),
+    (6, "🟠 GERÊNCIA(EPS)"),
+    (4, "🟡 COORDENADOR (EPS)"),
+]
+EPS_PADRAO = "🟢 SUPERVISOR (EPS)"
+
+# Categorias fixas das colunas calculadas (mesmos códigos em todo snapshot)
+STATUS_SLA = ("No Prazo", "Fora do Prazo", "Crítico")
+NIVEIS_EPS = (EPS_PADRAO, *[nivel for _, nivel in reversed(FAIXAS_EPS)])
+AREAS = ("Geral", "Litoral", "Vale")
+
+# Flags do snapshot, guardadas como bool e mostradas como SIM/NÃO
+FLAGS = ("VIP", "Cond. Alto Valor", "B2B")
+
+ATS_LITORAL = {
+    "TG", "PG", "LZ", "MK", "MG", "PN", "AA", "BV", "FM", "RP", "AC",
+    "FP", "BA", "TQ", "BO", "BU", "BC", "PJ", "PB", "MR", "MA",
+}  # fmt: skip
+
+# Indicadores do painel gerencial (Cluster), contados por ocorrência
+MEDIDAS_SLA = (
+    "Total",
+    "No Prazo",
+    "Fora Prazo",
+    "Grandes Vultos",
+    "VIPs",
+    "Cond. Alto Valor",
+    "B2B",
+    "Críticos",
+    "Sem Técnico",
+)
+
+_DOIS_DIGITOS = np.array([f"{i:02d}" for i in range(60)], dtype=object)
+
+
+def formatar_hms_vetorizado(segundos: pd.Series) -> pd.Series:
+    """Formata uma série de segundos em HH:MM:SS (nulos viram 00:00:00)."""
+    seg = segundos.fillna(0).to_numpy(dtype=np.float64).astype(np.int64)
+    h, resto = np.divmod(seg, 3600)
+    m, s = np.divmod(resto, 60)
+    if len(h):
+        horas = np.array([f"{i:02d}" for i in range(int(h.max()) + 1)], dtype=object)
+    else:
+        horas = np.array([], dtype=object)
+    texto = horas[h] + ":" + _DOIS_DIGITOS[m] + ":" + _DOIS_DIGITOS[s]
+    return pd.Series(texto, index=segundos.index, dtype=str)
+
+
+def flag_sim(df: pd.DataFrame, coluna: str) -> np.ndarray:
+    """Máscara booleana das linhas em que a flag é verdadeira (ou "SIM")."""
+    if coluna not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    serie = df[coluna]
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.to_numpy(dtype=bool, na_value=False)
+    return serie.astype(str).str.upper().eq("SIM").to_numpy()
+
+
+def padronizar_texto(valores: pd.Series) -> pd.Series:
+    """Texto sem espaços nas pontas e em maiúsculas, como categoria.
+
+    Cada valor distinto é tratado uma vez; nulos continuam nulos.
+    """
+    codigos, distintos = pd.factorize(valores)
+    texto = pd.Series(distintos, dtype=object).astype(str).str.strip().str.upper()
+    categorias, posicao = np.unique(texto.to_numpy(dtype=object), return_inverse=True)
+    codigos = np.append(posicao, -1)[codigos]
+    return pd.Series(
+        pd.Categorical.from_codes(codigos, categorias.tolist()), index=valores.index
+    )
+
+
+def formatar_exibicao(df: pd.DataFrame, colunas: Iterable[str]) -> pd.DataFrame:
+    """As `colunas` do snapshot como texto de tela, só para as linhas dadas.
+
+    Flags viram "SIM"/"NÃO", contagens nulas viram "", categorias voltam a
+    texto e "Horas Corridas" sai de "diff_s". Colunas ausentes são ignoradas;
+    números e datas passam como estão.
+    """
+    saida = {}
+    for coluna in colunas:
+        if coluna == "Horas Corridas" and "diff_s" in df.columns:
+            saida[coluna] = formatar_hms_vetorizado(df["diff_s"])
+            continue
+        if coluna not in df.columns:
+            continue
+        serie = df[coluna]
+        if pd.api.types.is_bool_dtype(serie):
+            serie = pd.Series(
+                np.where(flag_sim(df, coluna), "SIM", "NÃO"), index=df.index, dtype=str
+            )
+        elif isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.astype(object)
+        elif isinstance(serie.dtype, pd.Int32Dtype | pd.Int64Dtype):
+            serie = serie.astype("string").fillna("").astype(str)
+        saida[coluna] = serie
+    return pd.DataFrame(saida, index=df.index)
+
+
+def _codigos_status_sla(horas: np.ndarray, is_b2b: np.ndarray) -> np.ndarray:
+    """Posição de cada linha em STATUS_SLA."""
+    limite_fora = np.where(is_b2b, LIMITE_B2B, LIMITE_PADRAO)
+    return np.select([horas > LIMITE_CRITICO, horas > limite_fora], [2, 1], default=0)
+
+
+def calcular_status_sla(horas: np.ndarray, is_b2b: np.ndarray) -> np.ndarray:
+    return np.array(STATUS_SLA)[_codigos_status_sla(horas, is_b2b)]
+
+
+def medidas_sla(df: pd.DataFrame) -> pd.DataFrame:
+    """Uma coluna 0/1 por indicador de `MEDIDAS_SLA`, linha a linha do snapshot.
+
+    Espera o snapshot já processado ("Status SLA"); somar por grupo dá o
+    resumo do painel gerencial.
+    """
+    status = df["Status SLA"]
+    medidas = pd.DataFrame(
+        {
+            "Total": np.ones(len(df), dtype=bool),
+            "No Prazo": status.eq("No Prazo"),
+            "Fora Prazo": status.eq("Fora do Prazo"),
+            "Grandes Vultos": df["Afetação"] >= 100,
+            "VIPs": flag_sim(df, "VIP"),
+            "Cond. Alto Valor": flag_sim(df, "Cond. Alto Valor"),
+            "B2B": flag_sim(df, "B2B"),
+            "Críticos": status.eq("Crítico"),
+            "Sem Técnico": df["Técnicos"] == 0,
+        },
+        index=df.index,
+    )
+    return medidas.astype("int64")
+
+
+def _codigos_criticidade_eps(horas: np.ndarray) -> np.ndarray:
+    """Posição de cada linha em NIVEIS_EPS (a faixa mais alta é a última)."""
+    return np.select(
+        [horas >= limite for limite, _ in FAIXAS_EPS],
+        [NIVEIS_EPS.index(nivel) for _, nivel in FAIXAS_EPS],
+        default=0,
+    )
+
+
+def calcular_criticidade_eps(horas: np.ndarray) -> np.ndarray:
+    return np.array(NIVEIS_EPS)[_codigos_criticidade_eps(horas)]
+
+
+def sigla_at(at: pd.Series) -> pd.Series:
+    """Sigla da área telefónica ("TG-01" -> "TG"), como na base de share.
+
+    O texto é tratado uma vez por AT distinta e espalhado pelos códigos;
+    AT nula dá sigla vazia.
+    """
+    codigos, valores = pd.factorize(at)
+    siglas = pd.Series(valores, dtype=object).astype(str)
+    siglas = siglas.str.split("-", n=1).str[0].str.strip().str.upper()
+    siglas = np.append(siglas.to_numpy(dtype=object), "")
+    return pd.Series(siglas[codigos], index=at.index, dtype=str)
+
+
+def _codigos_area(df: pd.DataFrame) -> np.ndarray:
+    """Posição de cada linha em AREAS."""
+    area = np.zeros(len(df), dtype=np.int8)
+    if "AT" not in df.columns:
+        return area
+    sj = df["Contrato_Padrao"].eq("ABILITY_SJ") & df["AT"].notna()
+    if sj.any():
+        prefixo = sigla_at(df.loc[sj, "AT"])
+        area[sj.to_numpy()] = np.where(prefixo.isin(ATS_LITORAL), 1, 2)
+    return area
+
+
+def calcular_area(df: pd.DataFrame) -> np.ndarray:
+    return np.array(AREAS, dtype=object)[_codigos_area(df)]
+
+
+def aplicar_horas(df: pd.DataFrame, agora) -> pd.DataFrame:
+    """Recalcula as colunas que dependem do relógio, contadas até `agora`.
+
+    Espera "Abertura_dt" (sem fuso) e atualiza "diff_s", "horas_float",
+    "Status SLA" e "Criticidade EPS" no próprio DataFrame.
+    """
+    df["diff_s"] = (agora - df["Abertura_dt"]).dt.total_seconds().clip(lower=0)
+    df["horas_float"] = df["diff_s"] / 3600
+
+    horas = df["horas_float"].to_numpy(dtype=np.float64)
+    df["Status SLA"] = pd.Categorical.from_codes(
+        _codigos_status_sla(horas, flag_sim(df, "B2B")), STATUS_SLA
+    )
+    df["Criticidade EPS"] = pd.Categorical.from_codes(
+        _codigos_criticidade_eps(horas), NIVEIS_EPS
+    )
+    return df
+
+
+def aplicar_sla(df: pd.DataFrame, agora) -> pd.DataFrame:
+    """Calcula, numa única passagem colunar, as colunas de SLA do snapshot.
+
+    Espera as colunas "Abertura_dt" (sem fuso) e "Contrato_Padrao" e adiciona
+    "diff_s", "horas_float" e as categorias "Status SLA", "Criticidade EPS" e
+    "Area" ao próprio DataFrame. "Horas Corridas" só é formatada na tela
+    (`formatar_exibicao`).
+    """
+    aplicar_horas(df, agora)
+    df["Area"] = pd.Categorical.from_codes(_codigos_area(df), AREAS)
+    return df
+
+
+def processar_dados(
+    df_raw: pd.DataFrame, filtros_contrato, agora: datetime | None = None
+) -> pd.DataFrame:
+    """Filtra o snapshot pelos contratos e calcula as colunas de SLA.
+
+    As horas corridas contam até `agora` (por padrão, o relógio atual).
+    """
+    agora = (agora or datetime.now()).replace(tzinfo=None)
+
+    df = df_raw.copy()
+
+    df["Contrato_Padrao"] = padronizar_texto(df["Contrato"])
+    if isinstance(filtros_contrato, str):
+        df = df[df["Contrato_Padrao"] == filtros_contrato.upper()].copy()
+    elif isinstance(filtros_contrato, list) and filtros_contrato:
+        df = df[
+            df["Contrato_Padrao"].isin([c.upper() for c in filtros_contrato])
+        ].copy()
+
+    abertura = pd.to_datetime(df["Abertura"], errors="coerce")
+    df["Abertura_dt"] = abertura.dt.tz_localize(None)
+    df = aplicar_sla(df, agora)
+
+    return df.sort_values("horas_float", ascending=False)
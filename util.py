@@ -1,13 +1,76 @@
-from datetime import datetime
+import re
+
+import numpy as np
+import pandas as pd
+
+_COM_FUSO = re.compile(r"(?:Z|[+-]\d\d:?\d\d)$")
+
+
+def _tem_fuso(valor) -> bool:
+    if isinstance(valor, str):
+        return bool(_COM_FUSO.search(valor))
+    return getattr(valor, "tzinfo", None) is not None
+
+
+def _algum_com_fuso(lista: list) -> bool:
+    """True se qualquer valor (e não só o primeiro) traz fuso horário.
+
+    Listas grandes de texto passam pela regex vetorizada do pandas; as
+    pequenas (uma chamada de `oc_vencida`) ficam no laço simples.
+    """
+    if len(lista) > 64 and pd.api.types.infer_dtype(lista, skipna=True) == "string":
+        textos = pd.Series(lista, dtype="str")
+        return bool(textos.str.contains(_COM_FUSO.pattern, na=False).any())
+    return any(_tem_fuso(v) for v in lista)
+
+
+def _datetime64(valores, erros: str) -> np.ndarray:
+    """Strings ISO, datetimes ou datetime64 num array datetime64[ns].
+
+    Valores sem fuso vão direto pelo parser do numpy. Se algum traz fuso (ou
+    há inválidos), todos passam pelo pandas e são convertidos para UTC, para
+    não misturar horas locais com horas com fuso.
+    """
+    if isinstance(valores, (pd.Series, pd.Index)) and valores.dtype.kind == "M":
+        datas = pd.Series(valores)
+        if datas.dt.tz is not None:
+            datas = datas.dt.tz_convert(None)
+        return datas.to_numpy(dtype="datetime64[ns]")
+    if isinstance(valores, np.ndarray) and valores.dtype.kind == "M":
+        return valores.astype("datetime64[ns]")
+    lista = valores.tolist() if hasattr(valores, "tolist") else list(valores)
+    if not _algum_com_fuso(lista):
+        try:
+            return np.array(lista, dtype="datetime64[ns]")
+        except (TypeError, ValueError):
+            pass
+    datas = pd.to_datetime(
+        pd.Series(lista, dtype=object), errors=erros, format="ISO8601", utc=True
+    )
+    return datas.dt.tz_convert(None).to_numpy(dtype="datetime64[ns]")
+
+
+def oc_vencidas(
+    start, end, limit=8, erros: str = "coerce"
+) -> tuple[np.ndarray, np.ndarray]:
+    """Versão em lote de `oc_vencida`: (duração em horas, vencida) por linha.
+
+    `start` e `end` são arrays/Series do mesmo tamanho; `limit` pode ser um
+    escalar ou um limite por linha. A duração volta sem arredondar. Datas
+    inválidas dão duração NaN e não contam como vencidas.
+    """
+    duracao = _datetime64(end, erros) - _datetime64(start, erros)
+    total_hour = duracao / np.timedelta64(1, "s") / 3600
+    expired = total_hour > np.asarray(limit, dtype=np.float64)
+    return total_hour, expired
 
 
 def oc_vencida(start: str, end: str, limit: int = 8) -> dict[str, float | bool]:
-    d_start = datetime.fromisoformat(start)
-    d_end = datetime.fromisoformat(end)
-    duration = d_end - d_start
-    total_hour = duration.total_seconds() / 3600
-    expired = total_hour > limit
-    return {"duration": round(total_hour, 2), "expired": expired}
+    total_hour, expired = oc_vencidas([start], [end], limit, erros="raise")
+    if np.isnan(total_hour[0]):
+        # Como o fromisoformat de antes: data ausente (None) também é erro
+        raise ValueError(f"Datas inválidas: {start!r}, {end!r}")
+    return {"duration": round(float(total_hour[0]), 2), "expired": bool(expired[0])}
 
 
 if __name__ == "__main__":